@@ -1,8 +1,32 @@
 from __future__ import annotations
 
 from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR, ChangeList
+from django.db.models import Q, QuerySet
+from django.http import HttpRequest, HttpResponse
 
-from request_logger.models import RequestLog
+from request_logger.models import (
+    CompactRequestLog,
+    NormalisedRequestLog,
+    RequestLog,
+    RequestLogRollup,
+)
+from request_logger.paginator import EstimatedCountPaginator
+
+# querystring param used to page through logs older than a given log (id)
+BEFORE_VAR = "before"
+
+
+class KeysetChangeList(ChangeList):
+    """ChangeList that links to the page of logs older than the current page."""
+
+    def get_results(self, request: HttpRequest) -> None:
+        super().get_results(request)
+        self.older_url = ""
+        # a partial page means that there are no older logs
+        if len(self.result_list) == self.list_per_page:
+            last_id = self.result_list[len(self.result_list) - 1].pk
+            self.older_url = self.get_query_string({BEFORE_VAR: last_id}, [PAGE_VAR])
 
 
 @admin.register(RequestLog)
@@ -38,9 +62,100 @@ class RequestLogAdmin(admin.ModelAdmin):
         "content_length",
         "redirect_to",
         "duration",
+        "render_duration",
+        "stream_duration",
+        "log_duration",
+        "query_count",
+        "query_duration",
+        "slowest_query",
+        "sample_rate",
     )
-    list_filter = (
+    list_filter: tuple[str, ...] = (
         "source",
         "timestamp",
     )
-    exclude = ("request_uri",)
+    exclude: tuple[str, ...] = ("request_uri",)
+    list_select_related = ("user",)
+    # logs are paged using the (timestamp, id) keyset, so columns cannot be
+    # sorted - and date_hierarchy is not used, as it scans the table
+    ordering = ("-timestamp", "-id")
+    sortable_by = ()
+    change_list_template = "admin/request_logger/keyset_change_list.html"
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request: HttpRequest, **kwargs: object) -> type:
+        return KeysetChangeList
+
+    def changelist_view(
+        self, request: HttpRequest, extra_context: dict | None = None
+    ) -> HttpResponse:
+        # the ChangeList rejects unknown querystring params, so the keyset
+        # param is removed from the request, and applied in get_queryset.
+        if BEFORE_VAR in request.GET:
+            request.GET = request.GET.copy()
+            request.request_log_before = request.GET.pop(BEFORE_VAR)[-1]
+        return super().changelist_view(request, extra_context)
+
+    def get_queryset(self, request: HttpRequest) -> QuerySet:
+        queryset = super().get_queryset(request)
+        if before := getattr(request, "request_log_before", None):
+            queryset = filter_before(queryset, before)
+        return queryset
+
+
+def filter_before(queryset: QuerySet, before: str) -> QuerySet:
+    """Filter logs older than the given log id, using (timestamp, id) order."""
+    model = queryset.model
+    try:
+        timestamp = model.objects.values_list("timestamp", flat=True).get(pk=before)
+    except (model.DoesNotExist, ValueError):
+        return queryset.none()
+    return queryset.filter(
+        Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, pk__lt=before)
+    )
+
+
+@admin.register(NormalisedRequestLog, CompactRequestLog)
+class NormalisedRequestLogAdmin(RequestLogAdmin):
+    # the source value is stored in a lookup table
+    list_filter = ("timestamp",)
+    # the values are displayed (read only) using the model properties - the
+    # lookup table is unbounded, so the relations cannot be edited as selects
+    exclude = (
+        "request_uri",
+        "source_ref",
+        "view_func_ref",
+        "request_accepts_ref",
+        "http_user_agent_ref",
+        "response_class_ref",
+        "response_content_type_ref",
+    )
+
+
+@admin.register(RequestLogRollup)
+class RequestLogRollupAdmin(admin.ModelAdmin):
+    list_display = (
+        "bucket",
+        "period",
+        "http_method",
+        "view_func",
+        "status_class",
+        "count",
+        "duration_mean",
+        "duration_max",
+        "source",
+    )
+    list_filter = ("period", "status_class", "source")
+    date_hierarchy = "bucket"
+    ordering = ("-bucket",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request: HttpRequest) -> bool:
+        return False
+
+    def has_change_permission(
+        self, request: HttpRequest, obj: RequestLogRollup | None = None
+    ) -> bool:
+        return False
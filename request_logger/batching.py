@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import time
+from typing import Callable, Iterator
+
+from django.db import router, transaction
+from django.db.models import Q, QuerySet
+
+
+def pk_batches(
+    queryset: QuerySet, batch_size: int, start_pk: int | None = None
+) -> Iterator[QuerySet]:
+    """
+    Yield querysets covering consecutive primary key ranges of the queryset.
+
+    Each batch contains (up to) `batch_size` rows, and is filtered on a pk
+    range, so that updating or deleting the batch does not require the
+    original filter to be re-evaluated against the whole table. Batches are
+    fetched lazily, so rows may be deleted or updated between batches.
+
+    """
+    last_pk = start_pk
+    while True:
+        qs = queryset.order_by("pk")
+        if last_pk is not None:
+            qs = qs.filter(pk__gt=last_pk)
+        pks = list(qs.values_list("pk", flat=True)[:batch_size])
+        if not pks:
+            return
+        yield queryset.filter(pk__gte=pks[0], pk__lte=pks[-1])
+        last_pk = pks[-1]
+
+
+def keyset_batches(
+    queryset: QuerySet, fields: list[str], batch_size: int
+) -> Iterator[list[tuple]]:
+    """
+    Yield the queryset values, ordered by (timestamp, id), in batches.
+
+    Each batch is fetched using keyset pagination - filtering on the last
+    (timestamp, id) fetched, rather than using an OFFSET - so every batch is
+    fetched using the timestamp index, and memory use is bounded by the
+    batch size. Each row is a tuple of the `fields` values.
+
+    """
+    rows = queryset.order_by("timestamp", "pk").values_list(*fields, "timestamp", "pk")
+    last: tuple | None = None
+    while True:
+        qs = rows
+        if last:
+            timestamp, pk = last
+            qs = qs.filter(
+                Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, pk__gt=pk)
+            )
+        batch = list(qs[:batch_size])
+        if not batch:
+            return
+        yield [row[:-2] for row in batch]
+        last = batch[-1][-2:]
+
+
+def run_in_batches(
+    queryset: QuerySet,
+    func: Callable[[QuerySet], int],
+    *,
+    batch_size: int,
+    sleep: float = 0,
+    max_runtime: float = 0,
+    log: Callable[[str], None] | None = None,
+) -> tuple[int, bool]:
+    """
+    Apply func to the queryset in batches, each committed separately.
+
+    `func` is called with each batch (see `pk_batches`), and must return the
+    number of rows processed. Processing stops once `max_runtime` seconds
+    have elapsed (if set) - as each batch is committed the process can be
+    resumed by running it again.
+
+    Batches are read from, and committed on, the database that the model is
+    written to (see routers.py) - not a read replica - so that any writes
+    made by `func` are committed in the same transaction as the batch.
+
+    Returns the total number of rows processed, and whether all batches
+    were processed.
+
+    """
+    total = 0
+    start = time.monotonic()
+    alias = router.db_for_write(queryset.model)
+    for batch in pk_batches(queryset.using(alias), batch_size):
+        with transaction.atomic(using=alias):
+            total += func(batch)
+        elapsed = time.monotonic() - start
+        if log:
+            # a fast batch can complete within the clock resolution
+            rate = total / max(elapsed, 1e-9)
+            log(f"Processed {total} rows ({rate:.0f} rows/sec)")
+        if max_runtime and elapsed >= max_runtime:
+            return total, False
+        if sleep:
+            time.sleep(sleep)
+    return total, True
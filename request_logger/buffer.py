@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.db import close_old_connections, connections, models
+
+from .settings import BUFFER_FLUSH_INTERVAL, BUFFER_MAX_RECORDS, BUFFER_SIZE
+from .sinks import write_records
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLogBuffer:
+    """
+    Write-behind buffer used to store log records in batches.
+
+    Parsed records are added from the request thread, and written to the
+    sink (see sinks.py - by default using `bulk_create`) from a background
+    thread - either when the buffer holds `max_size` records, or every
+    `flush_interval` seconds, whichever comes first. Outstanding records are
+    written when the process exits.
+
+    If the records cannot be written as fast as they are added (e.g. while
+    the database is slow) the buffer holds at most `max_records` - further
+    records are dropped, and counted in `dropped`.
+
+    """
+
+    def __init__(
+        self,
+        max_size: int = BUFFER_SIZE,
+        flush_interval: float = BUFFER_FLUSH_INTERVAL,
+        max_records: int = BUFFER_MAX_RECORDS,
+    ) -> None:
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.max_records = max_records
+        self.dropped = 0
+        self._dropping = False
+        self._records: list[tuple[type[models.Model], dict]] = []
+        self._lock = threading.Lock()
+        self._thread_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._atexit_registered = False
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def add(self, model: type[models.Model], record: dict) -> None:
+        """
+        Add a record to the buffer.
+
+        The record is a dict of field values (see RequestLogManager.parse) for
+        the model - which is usually a RequestLogBase subclass.
+
+        """
+        with self._lock:
+            if len(self._records) >= self.max_records:
+                self.dropped += 1
+                if not self._dropping:
+                    logger.warning("RequestLog buffer is full - dropping records.")
+                    self._dropping = True
+                return
+            self._records.append((model, record))
+            is_full = len(self._records) >= self.max_size
+        self.start()
+        if is_full:
+            self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the background writer thread if it is not already running."""
+        if self._thread and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            if not self._atexit_registered:
+                atexit.register(self.stop)
+                self._atexit_registered = True
+            self._stopping.clear()
+            self._thread = threading.Thread(
+                target=self._run, name="request-logger-buffer", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop the background thread and write any outstanding records."""
+        self._stopping.set()
+        self._wakeup.set()
+        with self._thread_lock:
+            if self._thread:
+                self._thread.join(timeout)
+                self._thread = None
+        self.flush()
+
+    def flush(self) -> int:
+        """Write all buffered records to the database, returning the count."""
+        with self._lock:
+            records, self._records = self._records, []
+            self._dropping = False
+        batches: dict[type[models.Model], list[dict]] = defaultdict(list)
+        for model, record in records:
+            batches[model].append(record)
+        for model, batch in batches.items():
+            try:
+                write_records(model, batch)
+            except Exception:  # noqa: B902
+                logger.exception("Error storing %i RequestLog records.", len(batch))
+        return len(records)
+
+    def _run(self) -> None:
+        try:
+            while not self._stopping.is_set():
+                self._wakeup.wait(self.flush_interval)
+                self._wakeup.clear()
+                # this thread has its own connection, which must be recycled
+                # in the same way that request threads recycle theirs.
+                close_old_connections()
+                self.flush()
+        finally:
+            connections.close_all()
+
+
+# Process-wide buffer used by the log_request decorator.
+buffer = RequestLogBuffer()
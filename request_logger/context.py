@@ -0,0 +1,166 @@
+"""
+Time-boxed execution of the REQUEST_LOGGER_CONTEXT_EXTRACTOR.
+
+Extractors may make expensive lookups, so each call can be limited to
+REQUEST_LOGGER_CONTEXT_TIMEOUT seconds - the extractor is run in a worker
+thread, and if it has not returned in time the context is stored as the
+TIMED_OUT marker (the call itself cannot be cancelled, and completes in
+the background). At most MAX_WORKERS calls are run at once - if every
+worker is busy (e.g. with calls that have timed out) the extractor is not
+called, and the context is stored as TIMED_OUT. Errors are logged, and the
+context stored as the FAILED marker, so that a broken extractor does not
+prevent the log being stored.
+
+If REQUEST_LOGGER_CONTEXT_DEFERRED is True, the extractor is not called
+when the record is parsed - the record holds a DeferredContext, which is
+resolved by `write_records` after the response has been sent (or in the
+buffer thread).
+
+The cumulative cost of the extractor is recorded in `extractor_stats`.
+
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import functools
+import logging
+import threading
+import time
+from typing import Any, Callable
+
+from django.db import close_old_connections
+from django.http import HttpRequest
+
+from .settings import CONTEXT_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+ContextExtractor = Callable[[HttpRequest], dict[str, Any]]
+
+# values stored in place of the context if the extractor times out / fails
+TIMED_OUT = {"_error": "timeout"}
+FAILED = {"_error": "exception"}
+
+# max number of extractors run concurrently in worker threads
+MAX_WORKERS = 4
+
+# held by each call submitted to the executor, so that work never queues
+_workers = threading.BoundedSemaphore(MAX_WORKERS)
+
+
+class ExtractorStats:
+    """Cumulative (per-process) count and duration of extractor calls."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.duration = 0.0
+        self.max_duration = 0.0
+
+    def record(self, duration: float, error: bool = False) -> None:
+        with self._lock:
+            self.calls += 1
+            self.errors += error
+            self.duration += duration
+            self.max_duration = max(self.max_duration, duration)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def as_dict(self) -> dict[str, float]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "timeouts": self.timeouts,
+                "errors": self.errors,
+                "duration": self.duration,
+                "max_duration": self.max_duration,
+            }
+
+
+extractor_stats = ExtractorStats()
+
+
+@functools.cache
+def get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    return concurrent.futures.ThreadPoolExecutor(
+        max_workers=MAX_WORKERS, thread_name_prefix="request-logger-context"
+    )
+
+
+def _call(extractor: ContextExtractor, request: HttpRequest) -> dict[str, Any]:
+    start = time.perf_counter()
+    try:
+        context = extractor(request)
+    except Exception:
+        extractor_stats.record(time.perf_counter() - start, error=True)
+        raise
+    extractor_stats.record(time.perf_counter() - start)
+    return context
+
+
+def _call_in_worker(extractor: ContextExtractor, request: HttpRequest) -> dict:
+    # worker threads have their own connections, which must be recycled
+    close_old_connections()
+    try:
+        return _call(extractor, request)
+    finally:
+        close_old_connections()
+
+
+def _submit(
+    extractor: ContextExtractor, request: HttpRequest
+) -> concurrent.futures.Future:
+    """Run the extractor in a free worker thread, else raise TimeoutError."""
+    if not _workers.acquire(blocking=False):
+        raise concurrent.futures.TimeoutError
+    try:
+        future = get_executor().submit(_call_in_worker, extractor, request)
+    except BaseException:
+        _workers.release()
+        raise
+    future.add_done_callback(lambda future: _workers.release())
+    return future
+
+
+def extract_context(
+    extractor: ContextExtractor, request: HttpRequest, timeout: float | None = None
+) -> dict[str, Any]:
+    """Call the extractor, limited to `timeout` (default CONTEXT_TIMEOUT) secs."""
+    timeout = CONTEXT_TIMEOUT if timeout is None else timeout
+    try:
+        if not timeout:
+            return _call(extractor, request)
+        return _submit(extractor, request).result(timeout)
+    except concurrent.futures.TimeoutError:
+        extractor_stats.record_timeout()
+        logger.warning("Request context extractor timed out after %ss.", timeout)
+        return dict(TIMED_OUT)
+    except Exception:  # noqa: B902
+        logger.exception("Error extracting request context.")
+        return dict(FAILED)
+
+
+class DeferredContext:
+    """Placeholder for a context that is extracted when the record is written."""
+
+    def __init__(self, extractor: ContextExtractor, request: HttpRequest) -> None:
+        self.extractor = extractor
+        self.request = request
+
+    def resolve(self) -> dict[str, Any]:
+        return extract_context(self.extractor, self.request)
+
+
+def resolve_context(records: list[dict]) -> None:
+    """Extract the context of any records with a DeferredContext (in place)."""
+    for record in records:
+        if isinstance(context := record.get("context"), DeferredContext):
+            record["context"] = context.resolve()
@@ -1,16 +1,42 @@
 from __future__ import annotations
 
 import logging
+import time
+from contextlib import ExitStack
 from functools import wraps
 from types import TracebackType
-from typing import Callable, TypeAlias
+from typing import Any, Awaitable, Callable, TypeAlias
 
-from django.db import transaction
-from django.http import HttpRequest, HttpResponse
-from django.utils import timezone
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.db import models
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.http.response import HttpResponseBase
+from django.template.response import SimpleTemplateResponse
+from django.utils.timezone import now as tz_now
 
-from request_logger.models import RequestLog
-from request_logger.settings import DEFAULT_EXCLUDE_FUNC, DEFAULT_INCLUDE_FUNC
+from request_logger.buffer import buffer
+from request_logger.context import DeferredContext
+from request_logger.models import get_request_log_model
+from request_logger.queries import QueryCounter
+from request_logger.sampling import SamplingPolicy, sample_request
+from request_logger.settings import (
+    BUFFER_ENABLED,
+    CAPTURE_QUERIES,
+    CONTEXT_DEFERRED,
+    DEFAULT_EXCLUDE_FUNC,
+    DEFAULT_INCLUDE_FUNC,
+    REQUEST_CONTEXT_EXTRACTOR,
+    STREAMING_ENABLED,
+    _exclude,
+    _include,
+)
+from request_logger.sinks import write_records
+from request_logger.sketches import record_latency
+from request_logger.streaming import (
+    StreamCounter,
+    is_unstreamed,
+    wrap_streaming_content,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -19,12 +45,15 @@ ReferenceFunc: TypeAlias = Callable[[HttpRequest], str]
 # functions used to filter in/out request to log
 RequestFilterFunc: TypeAlias = Callable[[HttpRequest], bool]
 
+# request attribute set when a request is handled by a decorated view
+LOGGED_BY_VIEW_ATTR = "_request_logger_view"
+
 
 class Timer:
-    """Context manager used to time a function call."""
+    """Context manager used to time a function call, using a monotonic clock."""
 
     def __enter__(self) -> Timer:
-        self.start_ts = timezone.now()
+        self.start_ns = time.perf_counter_ns()
         return self
 
     def __exit__(
@@ -33,17 +62,262 @@ class Timer:
         exc_value: Exception | None,
         traceback: TracebackType | None,
     ) -> None:
-        self.end_ts = timezone.now()
+        self.end_ns = time.perf_counter_ns()
+
+    @property
+    def duration_ns(self) -> int:
+        return self.end_ns - self.start_ns
 
     @property
     def duration(self) -> float:
-        return (self.end_ts - self.start_ts).total_seconds()
+        return self.duration_ns / 1e9
+
+
+def is_logged_by_view(request: HttpRequest) -> bool:
+    """Return True if the request was handled by a log_request view."""
+    return getattr(request, LOGGED_BY_VIEW_ATTR, False)
+
+
+def is_unrendered(response: HttpResponse) -> bool:
+    """Return True if the response is a template response yet to be rendered."""
+    return isinstance(response, SimpleTemplateResponse) and not response.is_rendered
+
+
+def store_when_rendered(
+    request: HttpRequest, response: SimpleTemplateResponse, **kwargs: Any
+) -> None:
+    """
+    Store a new RequestLog once the response has been rendered.
+
+    Template responses are rendered after the view (and any response
+    middleware) returns, so the log is stored from a post-render callback,
+    recording the time taken to render the response as `render_duration`.
+
+    """
+    view_end_ns = time.perf_counter_ns()
+
+    def callback(response: HttpResponse) -> None:
+        kwargs["render_duration"] = (time.perf_counter_ns() - view_end_ns) / 1e9
+        try:
+            store_request_log(request, response, **kwargs)
+        except Exception:  # noqa: B902
+            logger.exception("Error storing RequestLog.")
+
+    response.add_post_render_callback(callback)
+
+
+def count_until_rendered(response: SimpleTemplateResponse, queries: ExitStack) -> None:
+    """
+    Keep counting SQL queries until the template response has been rendered.
+
+    Templates are rendered after the view returns, and are a common source of
+    (N+1) queries, so the counter is closed from a post-render callback - this
+    is registered before the log is stored (see `store_when_rendered`), so the
+    queries are all counted by the time the log is stored. If the response is
+    never rendered the counter is closed with the response.
+
+    """
+
+    def callback(response: HttpResponse) -> None:
+        queries.close()
+
+    response.add_post_render_callback(callback)
+    add_response_closer(response, queries.close)
+
+
+def store_when_streamed(
+    request: HttpRequest, response: StreamingHttpResponse, **kwargs: Any
+) -> None:
+    """
+    Store a new RequestLog once the streaming response has been sent.
+
+    The response content is wrapped so that the number of bytes streamed
+    (`content_length`) and the time taken to stream them, from the view
+    returning to the last byte (`stream_duration`), can be recorded. The log
+    is stored when the response is closed by the server - whether the stream
+    completed or was aborted.
+
+    """
+
+    def callback(stream: StreamCounter) -> None:
+        kwargs["content_length"] = stream.content_length
+        kwargs["stream_duration"] = stream.duration
+        try:
+            store_request_log(request, response, **kwargs)
+        except Exception:  # noqa: B902
+            logger.exception("Error storing RequestLog.")
+
+    wrap_streaming_content(response, callback)
+
+
+def add_response_closer(response: HttpResponseBase, closer: Callable) -> None:
+    """
+    Call closer when the response is closed by the server.
+
+    NB this relies on the private `HttpResponseBase._resource_closers` list,
+    which Django uses to close file-like content - the closers are called
+    (once) by `HttpResponseBase.close()`. There is no public per-response
+    hook: the request_finished signal is not sent with the response, so it
+    cannot be tied back to the request under ASGI.
+
+    """
+    response._resource_closers.append(closer)
+
+
+def write_when_closed(
+    response: HttpResponse, model: type[models.Model], record: dict
+) -> None:
+    """Write the record once the response has been sent, and closed."""
+
+    def callback() -> None:
+        try:
+            write_records(model, [record])
+        except Exception:  # noqa: B902
+            logger.exception("Error storing RequestLog.")
+
+    add_response_closer(response, callback)
+
+
+def store_request_log(
+    request: HttpRequest,
+    response: HttpResponse,
+    queries: QueryCounter | None = None,
+    **kwargs: object,
+) -> None:
+    """
+    Store a new RequestLog for the request-response.
+
+    If REQUEST_LOGGER_BUFFER_ENABLED is True the record is parsed here (as the
+    request and response may not outlive the request thread) and handed to
+    the write-behind buffer, else it is written to the sink (by default the
+    database - see REQUEST_LOGGER_SINK) immediately.
+    The time taken to parse the record is stored as `log_duration`.
+
+    If queries is set the SQL queries it counted are stored - the counts are
+    read once the response has been rendered.
+
+    If REQUEST_LOGGER_CONTEXT_DEFERRED is True the context is extracted when
+    the record is written - in the buffer thread, or (if the buffer is not
+    enabled) once the response has been sent and closed by the server.
+
+    """
+    if is_unrendered(response):
+        store_when_rendered(request, response, queries=queries, **kwargs)
+        return
+    if queries:
+        kwargs.update(queries.log_kwargs())
+    if STREAMING_ENABLED and is_unstreamed(request, response):
+        store_when_streamed(request, response, **kwargs)
+        return
+    if CONTEXT_DEFERRED:
+        kwargs.setdefault(
+            "context", DeferredContext(REQUEST_CONTEXT_EXTRACTOR, request)
+        )
+    with Timer() as t:
+        model = get_request_log_model()
+        record = model.objects.parse(request=request, response=response, **kwargs)
+    record["log_duration"] = t.duration
+    # buffered and deferred records are written later
+    record.setdefault("timestamp", tz_now())
+    if BUFFER_ENABLED:
+        buffer.add(model, record)
+    elif CONTEXT_DEFERRED:
+        write_when_closed(response, model, record)
+    else:
+        write_records(model, [record])
+
+
+async def astore_request_log(
+    request: HttpRequest, response: HttpResponse, **kwargs: Any
+) -> None:
+    """Store a new RequestLog for the request-response from an async view."""
+    if is_unrendered(response):
+        # the post-render callback is called from a sync context
+        store_when_rendered(request, response, **kwargs)
+        return
+    if STREAMING_ENABLED and is_unstreamed(request, response):
+        # the response is closed from a sync context
+        store_when_streamed(request, response, **kwargs)
+        return
+    # parsing may resolve the lazy request.user, which hits the database, so
+    # parsing and storing the record are run together in a single thread hop.
+    await sync_to_async(store_request_log)(request, response, **kwargs)
+
+
+def _wrap_view(
+    func: Callable,
+    should_log: RequestFilterFunc,
+    sampling: SamplingPolicy | None,
+    capture_queries: bool,
+) -> Callable:
+    @wraps(func)
+    def inner_func(
+        request: HttpRequest, *args: object, **kwargs: object
+    ) -> HttpResponse:
+        setattr(request, LOGGED_BY_VIEW_ATTR, True)
+        queries = QueryCounter() if capture_queries else None
+        with ExitStack() as stack:
+            if queries:
+                stack.enter_context(queries)
+            with Timer() as t:
+                response = func(request, *args, **kwargs)
+            if queries and is_unrendered(response):
+                count_until_rendered(response, stack.pop_all())
+        record_latency(request, t.duration)
+        if not should_log(request):
+            return response
+        sample_rate = sample_request(request, response, t.duration, sampling)
+        if sample_rate is None:
+            return response
+        try:
+            store_request_log(
+                request,
+                response,
+                duration=t.duration,
+                sample_rate=sample_rate,
+                queries=queries,
+            )
+        except Exception:  # noqa: B902
+            logger.exception("Error storing RequestLog.")
+        return response
+
+    return inner_func
+
+
+def _wrap_async_view(
+    func: Callable,
+    should_log: Callable[[HttpRequest], Awaitable[bool]],
+    sampling: SamplingPolicy | None,
+) -> Callable:
+    @wraps(func)
+    async def inner_func(
+        request: HttpRequest, *args: object, **kwargs: object
+    ) -> HttpResponse:
+        setattr(request, LOGGED_BY_VIEW_ATTR, True)
+        with Timer() as t:
+            response = await func(request, *args, **kwargs)
+        record_latency(request, t.duration)
+        if not await should_log(request):
+            return response
+        sample_rate = sample_request(request, response, t.duration, sampling)
+        if sample_rate is None:
+            return response
+        try:
+            await astore_request_log(
+                request, response, duration=t.duration, sample_rate=sample_rate
+            )
+        except Exception:  # noqa: B902
+            logger.exception("Error storing RequestLog.")
+        return response
+
+    return inner_func
 
 
-@transaction.atomic
 def log_request(
     include: RequestFilterFunc = DEFAULT_INCLUDE_FUNC,
     exclude: RequestFilterFunc = DEFAULT_EXCLUDE_FUNC,
+    sampling: SamplingPolicy | None = None,
+    capture_queries: bool | None = None,
 ) -> Callable:
     """
     Decorate view function to log a request-response.
@@ -58,30 +332,48 @@ def log_request(
         def view(request):
             pass
 
+    The sampling argument is used to log a sample of requests, rather than all
+    of them. If it is not set, the policy configured for the view function in
+    REQUEST_LOGGER_SAMPLING_POLICIES (if any) is used:
+
+        @log_request(sampling=SamplingPolicy(rate=0.01, slow_threshold=1.0))
+        def healthcheck(request):
+            pass
+
+    The decorator supports both sync and async (`async def`) views - async
+    views are awaited directly, and the log is written without blocking the
+    event loop. The include & exclude functions of async views are run in a
+    thread (via `sync_to_async`), as they may use the ORM - e.g. to load
+    `request.user` - unless they are both the built-in defaults.
+
+    If capture_queries is True (default: REQUEST_LOGGER_CAPTURE_QUERIES) the
+    number of SQL queries executed by the view, the time spent executing
+    them, and the slowest query, are logged - including the queries made while
+    a template response is rendered. This is not supported for async views
+    (passing capture_queries=True raises ValueError, and the setting is
+    ignored) - database connections are per-thread, and the queries made by
+    an async view are run in other threads (via `sync_to_async`).
+
     """
 
-    def decorator(func: Callable) -> Callable:
-        @wraps(func)
-        def inner_func(
-            request: HttpRequest, *args: object, **kwargs: object
-        ) -> HttpResponse:
-            with Timer() as t:
-                response = func(request, *args, **kwargs)
-            duration = t.duration
-            if not include(request):
-                return response
-            if exclude(request):
-                return response
-            try:
-                RequestLog.objects.create(
-                    request=request,
-                    response=response,
-                    duration=duration,
-                )
-            except Exception:  # noqa: B902
-                logger.exception("Error storing RequestLog.")
-            return response
+    def should_log(request: HttpRequest) -> bool:
+        return include(request) and not exclude(request)
 
-        return inner_func
+    async def ashould_log(request: HttpRequest) -> bool:
+        if include is _include and exclude is _exclude:
+            return True
+        return await sync_to_async(should_log)(request)
+
+    def decorator(func: Callable) -> Callable:
+        if iscoroutinefunction(func):
+            if capture_queries:
+                raise ValueError("capture_queries is not supported for async views.")
+            return _wrap_async_view(func, ashould_log, sampling)
+        return _wrap_view(
+            func,
+            should_log,
+            sampling,
+            CAPTURE_QUERIES if capture_queries is None else capture_queries,
+        )
 
     return decorator
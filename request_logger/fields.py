@@ -0,0 +1,105 @@
+"""Compact model fields used by CompactRequestLog."""
+
+from __future__ import annotations
+
+import ipaddress
+
+from django.db import models
+
+# HTTP methods stored as their (1-based) position - 0 is any other method
+HTTP_METHODS = (
+    "GET",
+    "POST",
+    "PUT",
+    "PATCH",
+    "DELETE",
+    "HEAD",
+    "OPTIONS",
+    "TRACE",
+    "CONNECT",
+)
+OTHER_METHOD = "OTHER"
+
+
+def encode_http_method(method: str) -> int:
+    try:
+        return HTTP_METHODS.index(method.upper()) + 1
+    except ValueError:
+        return 0
+
+
+def decode_http_method(code: int) -> str:
+    return HTTP_METHODS[code - 1] if 0 < code <= len(HTTP_METHODS) else OTHER_METHOD
+
+
+class HttpMethodField(models.PositiveSmallIntegerField):
+    """
+    Store an HTTP method as a small integer code.
+
+    Values are read and written (and filtered on) as method names, e.g.
+    `filter(http_method="GET")`. Methods that are not in HTTP_METHODS are
+    stored as 0, and read as "OTHER". A missing method ("", the default) is
+    stored as NULL, and read as "" - so it is not mistaken for a real one.
+
+    """
+
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        kwargs["null"] = kwargs["blank"] = True
+        kwargs.setdefault("default", "")
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self) -> tuple:
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs["null"], kwargs["blank"]
+        if kwargs.get("default") == "":
+            del kwargs["default"]
+        return name, path, args, kwargs
+
+    def from_db_value(self, value: int | None, *args: object) -> str:
+        return "" if value is None else decode_http_method(value)
+
+    def to_python(self, value: object) -> object:
+        if value is None:
+            return ""
+        if isinstance(value, int):
+            return decode_http_method(value)
+        return value
+
+    def get_prep_value(self, value: object) -> object:
+        if isinstance(value, str):
+            value = encode_http_method(value) if value else None
+        return super().get_prep_value(value)
+
+
+def parse_ip_address(value: str | None) -> str | None:
+    """Return the first address in a (X-Forwarded-For) list, or None."""
+    if not value:
+        return None
+    try:
+        return str(ipaddress.ip_address(value.split(",")[0].strip()))
+    except ValueError:
+        return None
+
+
+class RemoteAddrField(models.GenericIPAddressField):
+    """
+    Store a client IP address using the native type (inet on PostgreSQL).
+
+    Only the first (client) address of an X-Forwarded-For list is stored, and
+    values that are not valid addresses are stored as NULL.
+
+    """
+
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        kwargs["null"] = kwargs["blank"] = True
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self) -> tuple:
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs["null"], kwargs["blank"]
+        return name, path, args, kwargs
+
+    def get_prep_value(self, value: object) -> object:
+        if isinstance(value, str):
+            value = parse_ip_address(value)
+        return super().get_prep_value(value)
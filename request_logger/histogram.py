@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import math
+
+# values at or below this are counted as zero
+MIN_VALUE = 1e-9
+
+
+class LatencyHistogram:
+    """
+    Mergeable histogram used to calculate latency percentiles.
+
+    Values are counted in logarithmically sized buckets, such that any
+    quantile is accurate to within `relative_accuracy` of the true value (as
+    per the DDSketch algorithm). Histograms with the same accuracy can be
+    merged, so histograms recorded by different processes, or over different
+    time windows, can be combined before quantiles are calculated.
+
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("Relative accuracy must be between 0 and 1.")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins: dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min: float | None = None
+        self.max: float | None = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def add(self, value: float) -> None:
+        if value <= MIN_VALUE:
+            self.zero_count += 1
+        else:
+            key = math.ceil(math.log(value) / self.log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: LatencyHistogram) -> None:
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge histograms with different accuracy.")
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> float | None:
+        """Return the (approximate) value at quantile q (0-1)."""
+        if not 0 <= q <= 1:
+            raise ValueError("Quantile must be between 0 and 1.")
+        if not self.count:
+            return None
+        # the extremes are known exactly
+        if q == 0:
+            return self.min
+        if q == 1:
+            return self.max
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                # the bucket midpoint, clamped to the observed range
+                value = 2 * self.gamma**key / (self.gamma + 1)
+                return max(self.min or 0.0, min(self.max or value, value))
+        return self.max
+
+    @property
+    def mean(self) -> float | None:
+        return self.sum / self.count if self.count else None
+
+    def to_dict(self) -> dict:
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            # JSON object keys must be strings
+            "bins": {str(k): v for k, v in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> LatencyHistogram:
+        histogram = cls(data["relative_accuracy"])
+        histogram.bins = {int(k): v for k, v in data["bins"].items()}
+        histogram.zero_count = data["zero_count"]
+        histogram.count = data["count"]
+        histogram.sum = data["sum"]
+        histogram.min = data["min"]
+        histogram.max = data["max"]
+        return histogram
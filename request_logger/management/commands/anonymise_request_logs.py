@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+from typing import cast
+
+from django.core.management import BaseCommand, CommandError
+from django.core.management.base import CommandParser
+from django.db.models import QuerySet
+
+from request_logger.batching import run_in_batches
+from request_logger.management.commands.truncate_request_logs import get_cutoff
+from request_logger.models import ANONYMISED, get_request_log_model
+
+
+def anonymise_batch(batch: QuerySet) -> int:
+    return batch.anonymise()
+
+
+class Command(BaseCommand):
+    help = "Remove personal data from request logs, in committed batches."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--older-than",
+            type=int,
+            metavar="DAYS",
+            help="Anonymise logs older than this many days.",
+        )
+        parser.add_argument(
+            "--user", type=int, metavar="ID", help="Anonymise logs of this user."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Number of logs anonymised per transaction.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=0,
+            help="Stop after this many seconds - re-run the command to resume.",
+        )
+        return super().add_arguments(parser)
+
+    def handle(self, *args: object, **options: object) -> None:
+        if options["older_than"] is None and options["user"] is None:
+            raise CommandError("One of --older-than or --user is required.")
+        # logs that have already been anonymised are skipped
+        logs = get_request_log_model().objects.exclude(session_key=ANONYMISED)
+        if options["older_than"] is not None:
+            cutoff = get_cutoff(cast(int, options["older_than"]))
+            logs = logs.filter(timestamp__lt=cutoff)
+        if options["user"] is not None:
+            logs = logs.filter(user_id=options["user"])
+        count, complete = run_in_batches(
+            logs,
+            anonymise_batch,
+            batch_size=cast(int, options["batch_size"]),
+            sleep=cast(float, options["sleep"]),
+            max_runtime=cast(float, options["max_runtime"]),
+            log=self.stdout.write,
+        )
+        self.stdout.write(f"Anonymised {count} records")
+        if not complete:
+            self.stdout.write("Max runtime exceeded - re-run to anonymise the rest")
@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import cast
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+from django.db.models import QuerySet
+
+from request_logger.batching import run_in_batches
+from request_logger.models import get_request_log_model, parse_url
+
+URL_FIELDS = ["hostname", "path", "query"]
+
+
+def backfill_batch(batch: QuerySet) -> int:
+    logs = list(batch.only("pk", "request_uri"))
+    for log in logs:
+        for field, value in parse_url(log.request_uri).items():
+            setattr(log, field, value)
+    return batch.model.objects.bulk_update(logs, URL_FIELDS, batch_size=1000)
+
+
+class Command(BaseCommand):
+    help = (
+        "Populate the hostname, path and query of logs created before they were stored."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Number of logs updated per transaction.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=0,
+            help="Stop after this many seconds - re-run the command to resume.",
+        )
+        return super().add_arguments(parser)
+
+    def handle(self, *args: object, **options: object) -> None:
+        # logs that have been backfilled (or logged since) have a path
+        logs = get_request_log_model().objects.filter(path="").exclude(request_uri="")
+        count, complete = run_in_batches(
+            logs,
+            backfill_batch,
+            batch_size=cast(int, options["batch_size"]),
+            sleep=cast(float, options["sleep"]),
+            max_runtime=cast(float, options["max_runtime"]),
+            log=self.stdout.write,
+        )
+        self.stdout.write(f"Updated {count} records")
+        if not complete:
+            self.stdout.write("Max runtime exceeded - re-run to update the rest")
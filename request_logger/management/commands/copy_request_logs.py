@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+from typing import Callable, cast
+
+from django.apps import apps
+from django.core.management import BaseCommand, CommandError
+from django.core.management.base import CommandParser
+from django.db.models import QuerySet
+
+from request_logger.batching import run_in_batches
+from request_logger.models import RequestLogBase, RequestLogCheckpoint
+from request_logger.serializers import LOG_FIELDS
+from request_logger.settings import REQUEST_LOG_MODEL
+
+
+def get_log_model(label: str) -> type[RequestLogBase]:
+    try:
+        model = apps.get_model(label)
+    except (LookupError, ValueError) as ex:
+        raise CommandError(f"Invalid model: {label}") from ex
+    if not issubclass(model, RequestLogBase):
+        raise CommandError(f"{label} is not a RequestLogBase subclass")
+    return model
+
+
+def copy_batch(
+    target: type[RequestLogBase], checkpoint: RequestLogCheckpoint
+) -> Callable[[QuerySet], int]:
+    """Return a function that copies a batch of logs to the target model."""
+
+    def func(batch: QuerySet) -> int:
+        logs = list(batch.order_by("pk"))
+        # written using the batch's connection, in the same transaction
+        target.objects.db_manager(batch.db).bulk_create(
+            # properties are used to read and write normalised values
+            [target(**{f: getattr(log, f) for f in LOG_FIELDS}) for log in logs]
+        )
+        # committed in the same transaction as the batch
+        checkpoint.position = logs[-1].pk
+        checkpoint.save(update_fields=["position", "updated_at"])
+        return len(logs)
+
+    return func
+
+
+class Command(BaseCommand):
+    help = (
+        "Copy request logs from one model to another (e.g. CompactRequestLog) "
+        "in resumable batches."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--source",
+            default="request_logger.RequestLog",
+            help="Model to copy logs from.",
+        )
+        parser.add_argument(
+            "--target",
+            default=REQUEST_LOG_MODEL,
+            help="Model to copy logs to (default: REQUEST_LOGGER_MODEL).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Number of logs copied per transaction.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=0,
+            help="Stop after this many seconds - re-run the command to resume.",
+        )
+        return super().add_arguments(parser)
+
+    def handle(self, *args: object, **options: object) -> None:
+        source = get_log_model(cast(str, options["source"]))
+        target = get_log_model(cast(str, options["target"]))
+        if source is target:
+            raise CommandError("Source and target models must be different.")
+        # the id of the last log copied, so the copy can be resumed
+        checkpoint, _ = RequestLogCheckpoint.objects.get_or_create(
+            name=f"copy:{source._meta.label}:{target._meta.label}"
+        )
+        self.stdout.write(
+            f"Copying {source._meta.label} records to {target._meta.label} "
+            f"(after id {checkpoint.position})"
+        )
+        count, complete = run_in_batches(
+            source.objects.filter(pk__gt=checkpoint.position),
+            copy_batch(target, checkpoint),
+            batch_size=cast(int, options["batch_size"]),
+            sleep=cast(float, options["sleep"]),
+            max_runtime=cast(float, options["max_runtime"]),
+            log=self.stdout.write,
+        )
+        self.stdout.write(f"Copied {count} records")
+        if not complete:
+            self.stdout.write("Max runtime exceeded - re-run to copy the rest")
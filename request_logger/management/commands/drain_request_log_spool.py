@@ -0,0 +1,70 @@
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import cast
+
+from django.apps import apps
+from django.core.management import BaseCommand, CommandError
+from django.core.management.base import CommandParser
+from django.db import router, transaction
+
+from request_logger.models import RequestLogCheckpoint
+from request_logger.sinks import clear_deleted_users, get_spool
+from request_logger.spool import RequestLogSpool
+
+
+def drain_batch(spool: RequestLogSpool, batch_size: int) -> int:
+    """
+    Load a batch of spooled records into the database.
+
+    The id of the last record loaded is stored as a checkpoint, in the same
+    transaction as the records, so a record is never loaded twice - even if
+    the command fails before the records are deleted from the spool. The
+    checkpoint row is locked while the batch is loaded, so overlapping runs
+    of the command wait for each other.
+
+    """
+    name = f"spool:{spool.spool_id}"
+    using = router.db_for_write(RequestLogCheckpoint)
+    checkpoints = RequestLogCheckpoint.objects.db_manager(using)
+    checkpoints.get_or_create(name=name)
+    with transaction.atomic(using=using):
+        # locked, so that concurrent drains do not read the same position
+        checkpoint = checkpoints.select_for_update().get(name=name)
+        rows = spool.read(checkpoint.position, batch_size)
+        if not rows:
+            return 0
+        records = defaultdict(list)
+        for _, label, record in rows:
+            records[label].append(record)
+        for label, batch in records.items():
+            model = apps.get_model(label)
+            # a spooled user may have been deleted since
+            clear_deleted_users(model, batch)
+            model.objects.db_manager(using).bulk_create([model(**r) for r in batch])
+        checkpoint.position = rows[-1][0]
+        checkpoint.save(update_fields=["position", "updated_at"])
+    spool.delete(checkpoint.position)
+    return len(rows)
+
+
+class Command(BaseCommand):
+    help = "Load request logs from the local spool into the database."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1_000,
+            help="Number of logs loaded per transaction.",
+        )
+        return super().add_arguments(parser)
+
+    def handle(self, *args: object, **options: object) -> None:
+        if (spool := get_spool()) is None:
+            raise CommandError("REQUEST_LOGGER_SPOOL_PATH is not set.")
+        total = 0
+        while count := drain_batch(spool, cast(int, options["batch_size"])):
+            total += count
+            self.stdout.write(f"Loaded {total} records")
+        self.stdout.write(f"Drained {total} records ({len(spool)} remaining)")
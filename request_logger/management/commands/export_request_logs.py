@@ -0,0 +1,180 @@
+from __future__ import annotations
+
+import csv
+import datetime
+import gzip
+import io
+from pathlib import Path
+from typing import IO, Any, cast
+
+from django.core.management import BaseCommand, CommandError
+from django.core.management.base import CommandParser
+from django.db.models import QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from request_logger.batching import keyset_batches
+from request_logger.management.commands.copy_request_logs import get_log_model
+from request_logger.serializers import (
+    EXPORT_FIELDS,
+    get_field_lookups,
+    to_csv_row,
+    to_json,
+)
+from request_logger.settings import REQUEST_LOG_MODEL
+
+FORMATS = ("jsonl", "csv")
+COMPRESSION = ("none", "gzip", "zstd")
+
+
+def parse_timestamp(value: str) -> datetime.datetime:
+    """Parse a date or datetime option, in the current timezone if naive."""
+    parsed = parse_datetime(value)
+    if parsed is None:
+        if (date := parse_date(value)) is None:
+            raise CommandError(f"Invalid date/time: {value}")
+        parsed = datetime.datetime.combine(date, datetime.time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def open_compressed(raw: IO[bytes], compression: str) -> IO[bytes]:
+    """Wrap a (binary) file with a compressing writer."""
+    if compression == "gzip":
+        return cast(IO[bytes], gzip.GzipFile(fileobj=raw, mode="wb"))
+    if compression == "zstd":
+        try:
+            import zstandard
+        except ImportError as ex:
+            raise CommandError("zstd compression requires `zstandard`.") from ex
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=False)
+    return raw
+
+
+def part_path(path: Path, number: int) -> Path:
+    """Return the path of a numbered file - logs.jsonl.gz -> logs-0001.jsonl.gz."""
+    stem, _, suffixes = path.name.partition(".")
+    return path.with_name(f"{stem}-{number:04d}.{suffixes}".rstrip("."))
+
+
+class ExportWriter:
+    """
+    Write records to (optionally compressed, and size-bounded) files.
+
+    If `max_size` is set, a new file is started once the current file is
+    larger than `max_size` bytes (after compression), and the files are
+    numbered (see `part_path`).
+
+    """
+
+    def __init__(
+        self, path: Path, fmt: str, compression: str, max_size: int = 0
+    ) -> None:
+        self.path = path
+        self.fmt = fmt
+        self.compression = compression
+        self.max_size = max_size
+        self.paths: list[Path] = []
+        self._raw: IO[bytes] | None = None
+        self._stream: IO[bytes] | None = None
+        self._text: io.TextIOWrapper | None = None
+        self._csv: Any = None
+
+    def _open(self) -> None:
+        path = part_path(self.path, len(self.paths) + 1) if self.max_size else self.path
+        self.paths.append(path)
+        self._raw = path.open("wb")
+        self._stream = open_compressed(self._raw, self.compression)
+        if self.fmt == "csv":
+            self._text = io.TextIOWrapper(self._stream, encoding="utf-8", newline="")
+            self._csv = csv.writer(self._text)
+            self._csv.writerow(EXPORT_FIELDS)
+
+    def close(self) -> None:
+        if self._text:
+            self._text.close()
+        elif self._stream and self._stream is not self._raw:
+            self._stream.close()
+        if self._raw:
+            self._raw.close()
+        self._raw = self._stream = self._text = None
+
+    def write(self, records: list[dict[str, Any]]) -> None:
+        if self._raw is None:
+            self._open()
+        if self._csv:
+            self._csv.writerows(to_csv_row(r, EXPORT_FIELDS) for r in records)
+        else:
+            self._stream.write(b"".join(to_json(r) for r in records))  # type: ignore[union-attr]
+        # the size is approximate, as the compressor buffers its output
+        if self.max_size and self._raw.tell() >= self.max_size:  # type: ignore[union-attr]
+            self.close()
+
+
+class Command(BaseCommand):
+    help = "Export request logs to (compressed) JSONL or CSV files."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("output", help="Output file path, e.g. logs.jsonl.gz")
+        parser.add_argument("--model", default=REQUEST_LOG_MODEL)
+        parser.add_argument("--format", choices=FORMATS, default="jsonl")
+        parser.add_argument("--compression", choices=COMPRESSION, default="gzip")
+        parser.add_argument(
+            "--start", help="Export logs from this date/time (inclusive)."
+        )
+        parser.add_argument("--end", help="Export logs before this date/time.")
+        parser.add_argument("--source", help="Filter logs by source.")
+        parser.add_argument("--view-func", help="Filter logs by view function.")
+        parser.add_argument("--path", help="Filter logs by request path.")
+        parser.add_argument(
+            "--status-code", type=int, help="Filter logs by HTTP status code."
+        )
+        parser.add_argument(
+            "--max-file-size",
+            type=int,
+            default=0,
+            help="Split the output into files of (approximately) this many bytes.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5_000,
+            help="Number of logs fetched per query.",
+        )
+        return super().add_arguments(parser)
+
+    def get_queryset(self, options: dict[str, Any]) -> QuerySet:
+        model = get_log_model(options["model"])
+        logs = model.objects.all()
+        if options["start"]:
+            logs = logs.filter(timestamp__gte=parse_timestamp(options["start"]))
+        if options["end"]:
+            logs = logs.filter(timestamp__lt=parse_timestamp(options["end"]))
+        filters = {
+            "source": options["source"],
+            "view_func": options["view_func"],
+            "path": options["path"],
+            "http_status_code": options["status_code"],
+        }
+        filters = {k: v for k, v in filters.items() if v is not None}
+        lookups = get_field_lookups(model, list(filters))
+        return logs.filter(**dict(zip(lookups, filters.values())))
+
+    def handle(self, *args: object, **options: Any) -> None:
+        logs = self.get_queryset(options)
+        lookups = get_field_lookups(logs.model, EXPORT_FIELDS)
+        writer = ExportWriter(
+            Path(options["output"]),
+            options["format"],
+            options["compression"],
+            options["max_file_size"],
+        )
+        count = 0
+        try:
+            for batch in keyset_batches(logs, lookups, options["batch_size"]):
+                writer.write([dict(zip(EXPORT_FIELDS, row)) for row in batch])
+                count += len(batch)
+        finally:
+            writer.close()
+        self.stdout.write(f"Exported {count} records to {len(writer.paths)} file(s)")
@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import gzip
+import io
+import itertools
+import json
+import multiprocessing
+import time
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator, cast
+
+from django.core.management import BaseCommand, CommandError
+from django.core.management.base import CommandParser
+from django.db import connections, router
+
+from request_logger.management.commands.copy_request_logs import get_log_model
+from request_logger.models import RequestLogBase
+from request_logger.serializers import LOG_FIELDS, from_json, get_field_lookups
+from request_logger.settings import REQUEST_LOG_MODEL
+
+
+def open_input(path: Path) -> IO[bytes]:
+    """Open a (possibly gzip or zstd compressed) file for reading."""
+    if path.suffix == ".gz":
+        return cast(IO[bytes], gzip.open(path, "rb"))
+    if path.suffix in (".zst", ".zstd"):
+        try:
+            import zstandard
+        except ImportError as ex:
+            raise CommandError("zstd decompression requires `zstandard`.") from ex
+        return zstandard.open(path, "rb")
+    return path.open("rb")
+
+
+def read_batches(paths: Iterable[Path], batch_size: int) -> Iterator[list[bytes]]:
+    """Yield the non-empty lines of the files in batches."""
+    for path in paths:
+        with open_input(path) as f:
+            lines = (line for line in f if line.strip())
+            while batch := list(itertools.islice(lines, batch_size)):
+                yield batch
+
+
+def parse_batch(lines: list[bytes]) -> list[dict[str, Any]]:
+    """Parse a batch of JSON lines into log records (ignoring unknown keys)."""
+    records = []
+    for line in lines:
+        data = from_json(line)
+        records.append({f: data[f] for f in LOG_FIELDS if f in data})
+    return records
+
+
+def copy_value(value: object) -> str:
+    """Format a value for a PostgreSQL COPY (text format)."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = json.dumps(value)
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_rows(model: type[RequestLogBase], records: list[dict[str, Any]]) -> str:
+    """Return the records as COPY data, prepared as for an INSERT."""
+    fields = [model._meta.get_field(f) for f in LOG_FIELDS]
+    rows = []
+    for record in records:
+        obj = model(**record)
+        values = [f.get_prep_value(getattr(obj, f.attname)) for f in fields]
+        rows.append("\t".join(copy_value(v) for v in values) + "\n")
+    return "".join(rows)
+
+
+def copy_records(model: type[RequestLogBase], records: list[dict[str, Any]]) -> None:
+    """Insert the records using COPY FROM STDIN (PostgreSQL only)."""
+    connection = connections[router.db_for_write(model)]
+    qn = connection.ops.quote_name
+    columns = ", ".join(qn(model._meta.get_field(f).column) for f in LOG_FIELDS)
+    sql = f"COPY {qn(model._meta.db_table)} ({columns}) FROM STDIN"
+    data = copy_rows(model, records)
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, "copy"):
+            # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                copy.write(data)
+        else:
+            # psycopg2
+            raw_cursor.copy_expert(sql, io.StringIO(data))
+
+
+class Command(BaseCommand):
+    help = "Import request logs from JSONL files (as written by export_request_logs)."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "paths", nargs="+", type=Path, help="JSONL files (.gz, .zst supported)."
+        )
+        parser.add_argument("--model", default=REQUEST_LOG_MODEL)
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5_000,
+            help="Number of logs inserted per query.",
+        )
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="Insert logs using COPY FROM STDIN (PostgreSQL only).",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of processes used to parse the files.",
+        )
+        return super().add_arguments(parser)
+
+    def get_insert_func(self, model: type[RequestLogBase], use_copy: bool) -> Any:
+        if not use_copy:
+            return lambda records: model.objects.bulk_create(
+                [model(**record) for record in records]
+            )
+        if connections[router.db_for_write(model)].vendor != "postgresql":
+            raise CommandError("--copy is only supported on PostgreSQL.")
+        if get_field_lookups(model, LOG_FIELDS) != LOG_FIELDS:
+            raise CommandError("--copy does not support normalised models.")
+        return lambda records: copy_records(model, records)
+
+    def handle(self, *args: object, **options: Any) -> None:
+        model = get_log_model(options["model"])
+        insert = self.get_insert_func(model, options["copy"])
+        batches = read_batches(options["paths"], options["batch_size"])
+        pool = None
+        parsed: Iterator[list[dict[str, Any]]]
+        if options["workers"] > 1:
+            pool = multiprocessing.Pool(options["workers"])
+            # batches are parsed in parallel, but inserted in order
+            parsed = pool.imap(parse_batch, batches)
+        else:
+            parsed = map(parse_batch, batches)
+        count = 0
+        start = time.monotonic()
+        try:
+            for records in parsed:
+                insert(records)
+                count += len(records)
+                # a fast batch can complete within the clock resolution
+                rate = count / max(time.monotonic() - start, 1e-9)
+                self.stdout.write(f"Imported {count} records ({rate:.0f} rows/sec)")
+        finally:
+            if pool:
+                pool.terminate()
+        self.stdout.write(f"Imported {count} records")
@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import datetime
+from typing import cast
+
+from django.core.management import BaseCommand, CommandError
+from django.core.management.base import CommandParser
+from django.db import connections, router, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+from request_logger import partitions
+from request_logger.management.commands.truncate_request_logs import get_cutoff
+from request_logger.models import RequestLogBase, get_request_log_model
+from request_logger.settings import PARTITION_INTERVAL
+
+
+class Command(BaseCommand):
+    help = (
+        "Manage PostgreSQL partitions of the REQUEST_LOGGER_MODEL table - "
+        "convert the table, create upcoming partitions, and drop expired "
+        "partitions."
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--interval",
+            choices=partitions.INTERVALS,
+            default=PARTITION_INTERVAL,
+            help="Interval covered by each partition.",
+        )
+        parser.add_argument(
+            "--convert",
+            action="store_true",
+            help="Convert the existing table into a partitioned table (one-off).",
+        )
+        parser.add_argument(
+            "--premake",
+            type=int,
+            default=3,
+            help="Number of upcoming partitions to create.",
+        )
+        parser.add_argument(
+            "-d",
+            "--days",
+            type=int,
+            default=0,
+            help="Drop partitions that only contain logs older than this.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the SQL without executing it.",
+        )
+        return super().add_arguments(parser)
+
+    def handle(self, *args: object, **options: object) -> None:
+        model = get_request_log_model()
+        connection = connections[router.db_for_write(model)]
+        try:
+            partitions.check_connection(connection)
+        except partitions.PartitioningNotSupported as ex:
+            raise CommandError(str(ex))
+        self.dry_run = cast(bool, options["dry_run"])
+        interval = cast(str, options["interval"])
+        table = model._meta.db_table
+        today = start = datetime.date.today()
+        if options["convert"]:
+            self.convert(connection, model, today, interval)
+            # the legacy partition covers everything up to the next interval
+            start = partitions.convert_boundary(today, interval)
+        elif not partitions.is_partitioned(connection, table):
+            raise CommandError(f"{table} is not partitioned - use --convert.")
+        ranges = partitions.uncovered_ranges(
+            partitions.partition_ranges(start, interval, cast(int, options["premake"])),
+            partitions.list_partitions(connection, table),
+        )
+        self.execute_sql(
+            connection, partitions.create_partitions_sql(connection, table, ranges)
+        )
+        if days := cast(int, options["days"]):
+            self.execute_sql(
+                connection,
+                partitions.drop_expired_partitions_sql(
+                    connection, table, get_cutoff(days)
+                ),
+            )
+
+    def convert(
+        self,
+        connection: BaseDatabaseWrapper,
+        model: type[RequestLogBase],
+        today: datetime.date,
+        interval: str,
+    ) -> None:
+        table = model._meta.db_table
+        if partitions.is_partitioned(connection, table):
+            raise CommandError(f"{table} is already partitioned.")
+        self.stdout.write(f"Converting {table} to a partitioned table")
+        with transaction.atomic(using=connection.alias):
+            self.execute_sql(
+                connection,
+                partitions.convert_table_sql(connection, model, today, interval),
+            )
+            if self.dry_run:
+                return
+            # indexes are not copied from the original table - the legacy
+            # table's (renamed) indexes are attached to the new ones
+            with connection.schema_editor(atomic=False) as schema_editor:
+                for index in model._meta.indexes:
+                    schema_editor.add_index(model, index)
+
+    def execute_sql(self, connection: BaseDatabaseWrapper, statements: list) -> None:
+        for sql in statements:
+            self.stdout.write(sql)
+            if not self.dry_run:
+                with connection.cursor() as cursor:
+                    cursor.execute(sql)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import cast
+
+from django.core.management import BaseCommand
+from django.core.management.base import CommandParser
+
+from request_logger.models import RequestLogRollup
+from request_logger.rollups import rollup_request_logs
+
+
+class Command(BaseCommand):
+    help = "Roll up new RequestLog records into per-minute/hour aggregates."
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--period",
+            choices=RequestLogRollup.Period.values,
+            default=RequestLogRollup.Period.HOUR,
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10_000,
+            help="Number of logs rolled up per transaction.",
+        )
+        parser.add_argument(
+            "--lag",
+            type=float,
+            default=60,
+            help="Ignore logs newer than this many seconds.",
+        )
+        return super().add_arguments(parser)
+
+    def handle(self, *args: object, **options: object) -> None:
+        count, position = rollup_request_logs(
+            cast(str, options["period"]),
+            batch_size=cast(int, options["batch_size"]),
+            lag=cast(float, options["lag"]),
+        )
+        self.stdout.write(f"Rolled up {count} records (up to id {position})")
@@ -3,24 +3,95 @@ from __future__ import annotations
 import datetime
 from typing import cast
 
-from django.core.management import BaseCommand
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
 from django.core.management.base import CommandParser
+from django.db import connections, router
+from django.db.models import QuerySet
+from django.utils import timezone
 
-from request_logger.models import RequestLog
+from request_logger import partitions
+from request_logger.batching import run_in_batches
+from request_logger.models import get_request_log_model
+
+
+def get_cutoff(days: int) -> datetime.datetime:
+    """Return start of the first day of logs to keep."""
+    min_date = datetime.date.today() - datetime.timedelta(days=days)
+    cutoff = datetime.datetime.combine(min_date, datetime.time.min)
+    if settings.USE_TZ:
+        return timezone.make_aware(cutoff)
+    return cutoff
+
+
+def delete_batch(batch: QuerySet) -> int:
+    return batch.delete()[0]
 
 
 class Command(BaseCommand):
+    help = "Delete RequestLog records older than a given number of days."
+
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument("-d", "--days", type=int, default=365, dest="days")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=0,
+            help="Delete records in batches of this size, committed separately.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches.",
+        )
+        parser.add_argument(
+            "--max-runtime",
+            type=float,
+            default=0,
+            help="Stop after this many seconds - re-run the command to resume.",
+        )
+        parser.add_argument(
+            "--drop-partitions",
+            action="store_true",
+            help=(
+                "Drop expired partitions (PostgreSQL only - see "
+                "partition_request_logs) before deleting any remaining records."
+            ),
+        )
         return super().add_arguments(parser)
 
-    def handle(self, *args: object, **options: object) -> str | None:
-        days = cast(int, options["days"])
-        min_date = datetime.date.today() - datetime.timedelta(days=days)
-        logs = RequestLog.objects.filter(timestamp__date__lt=min_date)
-        count = logs.count()
-        self.stdout.write(f"Deleting records before {min_date}")
-        self.stdout.write(f"Deleting {count} records")
-        logs.delete()
+    def handle(self, *args: object, **options: object) -> None:
+        cutoff = get_cutoff(cast(int, options["days"]))
+        batch_size = cast(int, options["batch_size"])
+        # a plain timestamp comparison (rather than __date) can use an index
+        logs = get_request_log_model().objects.filter(timestamp__lt=cutoff)
+        if options["drop_partitions"]:
+            self.drop_partitions(cutoff)
+        self.stdout.write(f"Deleting records before {cutoff}")
+        if not batch_size:
+            count = delete_batch(logs)
+            self.stdout.write(f"Deleted {count} records")
+            return
+        count, complete = run_in_batches(
+            logs,
+            delete_batch,
+            batch_size=batch_size,
+            sleep=cast(float, options["sleep"]),
+            max_runtime=cast(float, options["max_runtime"]),
+            log=self.stdout.write,
+        )
         self.stdout.write(f"Deleted {count} records")
-        return count
+        if not complete:
+            self.stdout.write("Max runtime exceeded - re-run to delete the rest")
+
+    def drop_partitions(self, cutoff: datetime.datetime) -> None:
+        model = get_request_log_model()
+        connection = connections[router.db_for_write(model)]
+        table = model._meta.db_table
+        if not partitions.is_partitioned(connection, table):
+            raise CommandError(f"{table} is not partitioned.")
+        for sql in partitions.drop_expired_partitions_sql(connection, table, cutoff):
+            self.stdout.write(sql)
+            with connection.cursor() as cursor:
+                cursor.execute(sql)
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import logging
+from contextlib import nullcontext
+from typing import Callable
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpRequest, HttpResponse
+
+from request_logger.decorators import (
+    Timer,
+    astore_request_log,
+    is_logged_by_view,
+    store_request_log,
+)
+from request_logger.queries import QueryCounter
+from request_logger.rules import RequestLogRules
+from request_logger.sampling import sample_request
+from request_logger.settings import CAPTURE_QUERIES, MIDDLEWARE_RULES
+from request_logger.sketches import record_latency
+
+logger = logging.getLogger(__name__)
+
+
+class RequestLogMiddleware:
+    """
+    Log all requests that match the REQUEST_LOGGER_MIDDLEWARE_RULES setting.
+
+    The rules are compiled once, when the middleware is loaded. Views that are
+    decorated with `log_request` are left to the decorator, so that requests
+    are never logged twice.
+
+    If REQUEST_LOGGER_CAPTURE_QUERIES is True the SQL queries executed while
+    handling the request are counted - this is not supported when the
+    middleware is run asynchronously (see `log_request`).
+
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response: Callable) -> None:
+        self.get_response = get_response
+        self.rules = RequestLogRules(**MIDDLEWARE_RULES)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest) -> HttpResponse:
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self.rules.match_request(request):
+            return self.get_response(request)
+        queries = QueryCounter() if CAPTURE_QUERIES else None
+        with queries or nullcontext(), Timer() as t:
+            response = self.get_response(request)
+        sample_rate = self.get_sample_rate(request, response, t.duration)
+        if sample_rate is None:
+            return response
+        try:
+            store_request_log(
+                request,
+                response,
+                duration=t.duration,
+                sample_rate=sample_rate,
+                queries=queries,
+            )
+        except Exception:  # noqa: B902
+            logger.exception("Error storing RequestLog.")
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        if not self.rules.match_request(request):
+            return await self.get_response(request)
+        with Timer() as t:
+            response = await self.get_response(request)
+        sample_rate = self.get_sample_rate(request, response, t.duration)
+        if sample_rate is None:
+            return response
+        try:
+            await astore_request_log(
+                request, response, duration=t.duration, sample_rate=sample_rate
+            )
+        except Exception:  # noqa: B902
+            logger.exception("Error storing RequestLog.")
+        return response
+
+    def get_sample_rate(
+        self, request: HttpRequest, response: HttpResponse, duration: float
+    ) -> float | None:
+        """Return the sample rate to log the request with, or None to skip it."""
+        if is_logged_by_view(request):
+            return None
+        record_latency(request, duration)
+        if not self.rules.match_response(request, response):
+            return None
+        return sample_request(request, response, duration)
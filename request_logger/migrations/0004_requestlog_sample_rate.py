@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 05:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("request_logger", "0003_requestlog_context"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="requestlog",
+            name="sample_rate",
+            field=models.FloatField(
+                default=1.0,
+                help_text="Sampling rate applied when the request was logged (1.0 = all requests).",
+            ),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations, models
+
+from request_logger.operations import AddBrinIndex, AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # indexes are created concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ("request_logger", "0004_requestlog_sample_rate"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name="requestlog",
+            index=models.Index(
+                fields=["timestamp"], name="request_log_timesta_6f26c3_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="requestlog",
+            index=models.Index(
+                fields=["source", "timestamp"], name="request_log_source_f517c5_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="requestlog",
+            index=models.Index(
+                fields=["view_func", "timestamp"], name="request_log_view_fu_2f53b9_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="requestlog",
+            index=models.Index(
+                fields=["user", "timestamp"], name="request_log_user_id_7fdb5f_idx"
+            ),
+        ),
+        AddBrinIndex(
+            model_name="requestlog",
+            field_name="timestamp",
+            name="request_log_timesta_brin",
+        ),
+    ]
@@ -0,0 +1,98 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("request_logger", "0005_requestlog_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RequestLogCheckpoint",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(max_length=100, unique=True)),
+                ("position", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="RequestLogRollup",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "period",
+                    models.CharField(
+                        choices=[("minute", "Minute"), ("hour", "Hour")], max_length=10
+                    ),
+                ),
+                ("bucket", models.DateTimeField(help_text="Start of the period.")),
+                ("source", models.CharField(max_length=200)),
+                ("view_func", models.CharField(max_length=200)),
+                ("http_method", models.CharField(max_length=10)),
+                (
+                    "status_class",
+                    models.PositiveSmallIntegerField(
+                        help_text="Response status code class - 2 for 2xx, etc."
+                    ),
+                ),
+                ("count", models.BigIntegerField(default=0)),
+                (
+                    "estimated_count",
+                    models.FloatField(
+                        default=0, help_text="Count re-weighted by the sample rate."
+                    ),
+                ),
+                (
+                    "content_length",
+                    models.BigIntegerField(
+                        default=0,
+                        help_text="Total length of the response bodies in bytes.",
+                    ),
+                ),
+                ("duration_sum", models.FloatField(default=0)),
+                ("duration_min", models.FloatField(blank=True, null=True)),
+                ("duration_max", models.FloatField(blank=True, null=True)),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["view_func", "bucket"],
+                        name="request_log_view_fu_a480c0_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=(
+                            "period",
+                            "bucket",
+                            "source",
+                            "view_func",
+                            "http_method",
+                            "status_class",
+                        ),
+                        name="unique_request_log_rollup",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("request_logger", "0006_rollups"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LatencySketch",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("view_func", models.CharField(max_length=200)),
+                ("window_start", models.DateTimeField()),
+                ("window_end", models.DateTimeField()),
+                ("count", models.PositiveIntegerField(default=0)),
+                ("histogram", models.JSONField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["view_func", "window_start"],
+                        name="request_log_view_fu_e277be_idx",
+                    )
+                ],
+            },
+        ),
+    ]
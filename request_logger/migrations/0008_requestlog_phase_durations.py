@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("request_logger", "0007_latencysketch"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="requestlog",
+            name="log_duration",
+            field=models.FloatField(
+                blank=True,
+                help_text="Time taken to build the log record (excluding the write).",
+                null=True,
+                verbose_name="Logging overhead (sec)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="requestlog",
+            name="render_duration",
+            field=models.FloatField(
+                blank=True,
+                help_text="Time taken to render a template response after the view.",
+                null=True,
+                verbose_name="Render duration (sec)",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="requestlog",
+            name="duration",
+            field=models.FloatField(
+                blank=True,
+                help_text="Time taken to execute the view function.",
+                null=True,
+                verbose_name="Request duration (sec)",
+            ),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("request_logger", "0008_requestlog_phase_durations"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="requestlog",
+            name="query_count",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Number of SQL queries executed by the view.",
+                null=True,
+            ),
+        ),
+        migrations.AddField(
+            model_name="requestlog",
+            name="query_duration",
+            field=models.FloatField(
+                blank=True,
+                help_text="Time spent executing SQL queries in the view.",
+                null=True,
+                verbose_name="Query duration (sec)",
+            ),
+        ),
+        migrations.AddField(
+            model_name="requestlog",
+            name="slowest_query",
+            field=models.TextField(
+                blank=True,
+                default="",
+                help_text="Slowest SQL query executed by the view (literals removed).",
+            ),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("request_logger", "0009_requestlog_queries"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="requestlog",
+            name="stream_duration",
+            field=models.FloatField(
+                blank=True,
+                help_text="Time taken to send a streaming response after the view.",
+                null=True,
+                verbose_name="Stream duration (sec)",
+            ),
+        ),
+    ]
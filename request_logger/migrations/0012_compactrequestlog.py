@@ -0,0 +1,243 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:14
+
+import django.core.serializers.json
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+import request_logger.fields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("request_logger", "0011_normalisedrequestlog"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompactRequestLog",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "session_key",
+                    models.CharField(blank=True, default="", max_length=40),
+                ),
+                (
+                    "request_uri",
+                    models.URLField(
+                        help_text="Request URI from HttpRequest.build_absolute_uri()"
+                    ),
+                ),
+                ("request_content_type", models.CharField(default="", max_length=100)),
+                ("http_referer", models.CharField(default="", max_length=400)),
+                (
+                    "redirect_to",
+                    models.CharField(
+                        help_text="Response location in the event of a redirect (3xx).",
+                        max_length=400,
+                    ),
+                ),
+                (
+                    "duration",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Time taken to execute the view function.",
+                        null=True,
+                        verbose_name="Request duration (sec)",
+                    ),
+                ),
+                (
+                    "render_duration",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Time taken to render a template response after the view.",
+                        null=True,
+                        verbose_name="Render duration (sec)",
+                    ),
+                ),
+                (
+                    "stream_duration",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Time taken to send a streaming response after the view.",
+                        null=True,
+                        verbose_name="Stream duration (sec)",
+                    ),
+                ),
+                (
+                    "log_duration",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Time taken to build the log record (excluding the write).",
+                        null=True,
+                        verbose_name="Logging overhead (sec)",
+                    ),
+                ),
+                (
+                    "query_count",
+                    models.PositiveIntegerField(
+                        blank=True,
+                        help_text="Number of SQL queries executed by the view.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "query_duration",
+                    models.FloatField(
+                        blank=True,
+                        help_text="Time spent executing SQL queries in the view.",
+                        null=True,
+                        verbose_name="Query duration (sec)",
+                    ),
+                ),
+                (
+                    "slowest_query",
+                    models.TextField(
+                        blank=True,
+                        default="",
+                        help_text="Slowest SQL query executed by the view (literals removed).",
+                    ),
+                ),
+                (
+                    "sample_rate",
+                    models.FloatField(
+                        default=1.0,
+                        help_text="Sampling rate applied when the request was logged (1.0 = all requests).",
+                    ),
+                ),
+                ("timestamp", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "context",
+                    models.JSONField(
+                        blank=True,
+                        default=dict,
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        help_text="Customisable JSON extracted from the request using REQUEST_LOGGER_CONTEXT_EXTRACTOR",
+                    ),
+                ),
+                ("remote_addr", request_logger.fields.RemoteAddrField()),
+                ("http_method", request_logger.fields.HttpMethodField()),
+                (
+                    "http_status_code",
+                    models.PositiveSmallIntegerField(
+                        blank=True, null=True, verbose_name="Response status code"
+                    ),
+                ),
+                (
+                    "content_length",
+                    models.BigIntegerField(
+                        blank=True,
+                        help_text="Length of the response body in bytes.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "http_user_agent_ref",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="request_logger.requestlogvalue",
+                    ),
+                ),
+                (
+                    "request_accepts_ref",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="request_logger.requestlogvalue",
+                    ),
+                ),
+                (
+                    "response_class_ref",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="request_logger.requestlogvalue",
+                    ),
+                ),
+                (
+                    "response_content_type_ref",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="request_logger.requestlogvalue",
+                    ),
+                ),
+                (
+                    "source_ref",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="request_logger.requestlogvalue",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "view_func_ref",
+                    models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.PROTECT,
+                        related_name="+",
+                        to="request_logger.requestlogvalue",
+                    ),
+                ),
+            ],
+            options={
+                "abstract": False,
+                "indexes": [
+                    models.Index(
+                        fields=["timestamp"], name="request_log_timesta_20b333_idx"
+                    ),
+                    models.Index(
+                        fields=["source_ref", "timestamp"],
+                        name="request_log_source__414f43_idx",
+                    ),
+                    models.Index(
+                        fields=["view_func_ref", "timestamp"],
+                        name="request_log_view_fu_e0e7da_idx",
+                    ),
+                    models.Index(
+                        fields=["user", "timestamp"],
+                        name="request_log_user_id_e415c8_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+from request_logger.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # indexes are created concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ("request_logger", "0012_compactrequestlog"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="compactrequestlog",
+            name="hostname",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.AddField(
+            model_name="compactrequestlog",
+            name="path",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.AddField(
+            model_name="compactrequestlog",
+            name="query",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.AddField(
+            model_name="normalisedrequestlog",
+            name="hostname",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.AddField(
+            model_name="normalisedrequestlog",
+            name="path",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.AddField(
+            model_name="normalisedrequestlog",
+            name="query",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.AddField(
+            model_name="requestlog",
+            name="hostname",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.AddField(
+            model_name="requestlog",
+            name="path",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        migrations.AddField(
+            model_name="requestlog",
+            name="query",
+            field=models.CharField(blank=True, default="", max_length=200),
+        ),
+        AddIndexConcurrently(
+            model_name="compactrequestlog",
+            index=models.Index(
+                fields=["path", "timestamp"], name="request_log_path_c909bf_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="normalisedrequestlog",
+            index=models.Index(
+                fields=["path", "timestamp"], name="request_log_path_35a35f_idx"
+            ),
+        ),
+        AddIndexConcurrently(
+            model_name="requestlog",
+            index=models.Index(
+                fields=["path", "timestamp"], name="request_log_path_892d43_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from request_logger.operations import RemoveFieldIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # the index is dropped concurrently on PostgreSQL, outside a transaction
+    atomic = False
+
+    dependencies = [
+        ("request_logger", "0013_requestlog_url_components"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                RemoveFieldIndexConcurrently(
+                    model_name="requestlog", field_name="user"
+                ),
+            ],
+            state_operations=[
+                migrations.AlterField(
+                    model_name="requestlog",
+                    name="user",
+                    field=models.ForeignKey(
+                        blank=True,
+                        db_index=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+        ),
+    ]
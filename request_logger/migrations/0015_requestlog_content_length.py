@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("request_logger", "0014_requestlog_user_db_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="normalisedrequestlog",
+            name="content_length",
+            field=models.BigIntegerField(
+                blank=True, help_text="Length of the response body in bytes.", null=True
+            ),
+        ),
+        migrations.AlterField(
+            model_name="requestlog",
+            name="content_length",
+            field=models.BigIntegerField(
+                blank=True, help_text="Length of the response body in bytes.", null=True
+            ),
+        ),
+    ]
@@ -1,31 +1,83 @@
 from __future__ import annotations
 
-from typing import TypeAlias
+from typing import Iterable, TypeAlias
 from urllib.parse import ParseResult, urlparse
 
+from asgiref.sync import sync_to_async
+from django.apps import apps
 from django.conf import settings
+from django.contrib.auth import SESSION_KEY, get_user_model
 from django.contrib.auth.models import AbstractUser
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db import models
+from django.db import models, transaction
 from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
-from django.template.response import ContentNotRenderedError
+from django.template.response import SimpleTemplateResponse
+from django.utils.functional import LazyObject, empty
 from django.utils.timezone import now as tz_now
 from django.utils.translation import gettext_lazy as _lazy
 
-from .settings import REQUEST_CONTEXT_EXTRACTOR
+from .cache import LRUCache
+from .context import extract_context
+from .fields import HttpMethodField, RemoteAddrField
+from .histogram import LatencyHistogram
+from .settings import (
+    DIMENSION_CACHE_SIZE,
+    LAZY_USER,
+    REQUEST_CONTEXT_EXTRACTOR,
+    REQUEST_LOG_MODEL,
+)
 
 # TODO: work out how to get this to work with get_user_model | AUTH_USER_MODEL
 User: TypeAlias = AbstractUser
-RequestKwargs: TypeAlias = dict[str, str | User | None]
+RequestKwargs: TypeAlias = dict[str, str | int | User | None]
 ResponseKwargs: TypeAlias = dict[str, str | int | None]
 
 
-def parse_request(request: HttpRequest) -> RequestKwargs:
-    """Extract values from HttpRequest."""
+def parse_url(url: str) -> dict[str, str]:
+    """Extract the URL components that are stored on the log."""
+    components = urlparse(url)
+    return {
+        "hostname": (components.hostname or "")[:200],
+        "path": components.path[:200],
+        "query": components.query[:200],
+    }
+
+
+def get_user_id(request: HttpRequest) -> int | str | None:
+    """
+    Return the id of the request user, if it can be read without a query.
+
+    The lazy `request.user` set by AuthenticationMiddleware is not evaluated
+    (which loads the session and then the user) - the id is read from the
+    user if the view has already loaded it, else from the session data if
+    the session has already been loaded. Anonymous users have no id.
+
+    NB the session's user id is not verified against the session auth hash
+    (that requires the user), so it may belong to an invalidated session,
+    or a deleted user - see DatabaseSink.
+
+    """
+    user = getattr(request, "user", None)
+    # NB isinstance(user, ...) would evaluate a lazy object
+    if user is not None and not (
+        issubclass(type(user), LazyObject) and user._wrapped is empty
+    ):
+        return user.pk if user.is_authenticated else None
+    session = getattr(request, "session", None)
+    if session is None or not hasattr(session, "_session_cache"):
+        return None
+    if (user_id := session.get(SESSION_KEY)) is None:
+        return None
+    return get_user_model()._meta.pk.to_python(user_id)
+
+
+def parse_request(request: HttpRequest, with_context: bool = True) -> RequestKwargs:
+    """Extract values from HttpRequest (and the context, if with_context)."""
     kwargs: RequestKwargs = {}
     if getattr(request, "resolver_match"):
         kwargs["view_func"] = request.resolver_match._func_path[:200]
-    kwargs["request_uri"] = request.build_absolute_uri()
+    kwargs["request_uri"] = request_uri = request.build_absolute_uri()
+    kwargs.update(parse_url(request_uri))
     kwargs["http_method"] = request.method[:10]
     kwargs["request_content_type"] = request.content_type[:100]
     kwargs["request_accepts"] = request.headers.get("accept", "")[:200]
@@ -43,21 +95,36 @@ def parse_request(request: HttpRequest) -> RequestKwargs:
     else:
         kwargs["session_key"] = ""
     # NB you can't store AnonymouseUsers, so don't bother trying
-    if hasattr(request, "user") and request.user.is_authenticated:
+    if LAZY_USER:
+        kwargs["user_id"] = get_user_id(request)
+    elif hasattr(request, "user") and request.user.is_authenticated:
         kwargs["user"] = request.user
     # extract custom data from the request
-    kwargs["context"] = REQUEST_CONTEXT_EXTRACTOR(request)
+    if with_context:
+        kwargs["context"] = extract_context(REQUEST_CONTEXT_EXTRACTOR, request)
     return kwargs
 
 
 def get_content_length(response: HttpResponse) -> int | None:
+    """
+    Return the response content length, without copying the content.
+
+    The Content-Length header is used if it is set, else the content chunks
+    are summed (`response.content` joins them into a new bytes object). The
+    length of streaming and unrendered responses is unknown.
+
+    """
+    if header := response.headers.get("Content-Length"):
+        try:
+            return int(header)
+        except ValueError:
+            pass
     if isinstance(response, StreamingHttpResponse):
         return None
-    try:
-        return len(response.content)
-    except ContentNotRenderedError:
-        pass
-    return None
+    if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+        return None
+    # HttpResponse stores its content as a list of bytes chunks
+    return sum(len(chunk) for chunk in response._container)
 
 
 def get_response_klass(response: HttpResponse) -> str:
@@ -77,19 +144,62 @@ def parse_response(response: HttpResponse) -> ResponseKwargs:
     return kwargs
 
 
-class RequestLogManager(models.Manager):
-    def create(
+# value stored in place of personal data
+ANONYMISED = "****"
+
+
+class RequestLogQuerySet(models.QuerySet):
+    def anonymise(self) -> int:
+        """
+        Remove sensitive personal data from all records in the queryset.
+
+        Records are updated using a single UPDATE statement, rather than
+        saving each record in turn. Returns the number of records updated.
+
+        """
+        return self.update(**self.model.get_anonymised_values())
+
+
+class RequestLogManager(models.Manager.from_queryset(RequestLogQuerySet)):  # type: ignore[misc]
+    def parse(
         self,
         request: HttpRequest | None = None,
         response: HttpResponse | None = None,
         **kwargs: object,
-    ) -> RequestLog:
+    ) -> dict[str, object]:
+        """
+        Return the field values used to create a new log record.
+
+        Values passed in as kwargs take precedence over those parsed from the
+        request and response - if the context is passed in, the context
+        extractor is not called.
+
+        """
+        values: dict[str, object] = {}
         if request:
-            kwargs.update(parse_request(request))
+            values.update(parse_request(request, "context" not in kwargs))
         if response:
-            kwargs.update(parse_response(response))
-        kwargs["source"] = self.model._meta.label
-        return super().create(**kwargs)
+            values.update(parse_response(response))
+        values.update(kwargs)
+        values["source"] = self.model._meta.label
+        return values
+
+    def create(
+        self,
+        request: HttpRequest | None = None,
+        response: HttpResponse | None = None,
+        **kwargs: object,
+    ) -> RequestLog:
+        return super().create(**self.parse(request, response, **kwargs))
+
+    async def acreate(
+        self,
+        request: HttpRequest | None = None,
+        response: HttpResponse | None = None,
+        **kwargs: object,
+    ) -> RequestLog:
+        # the default acreate proxies to QuerySet.create, bypassing parsing
+        return await sync_to_async(self.create)(request, response, **kwargs)
 
 
 class RequestLogBase(models.Model):
@@ -100,6 +210,8 @@ class RequestLogBase(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
+        # covered by the (user, timestamp) index
+        db_index=False,
     )
     source = models.CharField(
         blank=True,
@@ -119,6 +231,9 @@ class RequestLogBase(models.Model):
     request_uri = models.URLField(
         help_text=_lazy("Request URI from HttpRequest.build_absolute_uri()")
     )
+    hostname = models.CharField(max_length=200, default="", blank=True)
+    path = models.CharField(max_length=200, default="", blank=True)
+    query = models.CharField(max_length=200, default="", blank=True)
     remote_addr = models.CharField(max_length=100, default="")
     http_method = models.CharField(max_length=10)
     request_content_type = models.CharField(max_length=100, default="")
@@ -132,7 +247,7 @@ class RequestLogBase(models.Model):
         null=True,
         verbose_name=_lazy("Response status code"),
     )
-    content_length = models.IntegerField(
+    content_length = models.BigIntegerField(
         null=True, blank=True, help_text=_lazy("Length of the response body in bytes.")
     )
     response_class = models.CharField(
@@ -149,7 +264,50 @@ class RequestLogBase(models.Model):
         help_text=_lazy("Response location in the event of a redirect (3xx)."),
     )
     duration = models.FloatField(
-        blank=True, null=True, verbose_name=_lazy("Request duration (sec)")
+        blank=True,
+        null=True,
+        verbose_name=_lazy("Request duration (sec)"),
+        help_text=_lazy("Time taken to execute the view function."),
+    )
+    render_duration = models.FloatField(
+        blank=True,
+        null=True,
+        verbose_name=_lazy("Render duration (sec)"),
+        help_text=_lazy("Time taken to render a template response after the view."),
+    )
+    stream_duration = models.FloatField(
+        blank=True,
+        null=True,
+        verbose_name=_lazy("Stream duration (sec)"),
+        help_text=_lazy("Time taken to send a streaming response after the view."),
+    )
+    log_duration = models.FloatField(
+        blank=True,
+        null=True,
+        verbose_name=_lazy("Logging overhead (sec)"),
+        help_text=_lazy("Time taken to build the log record (excluding the write)."),
+    )
+    query_count = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text=_lazy("Number of SQL queries executed by the view."),
+    )
+    query_duration = models.FloatField(
+        blank=True,
+        null=True,
+        verbose_name=_lazy("Query duration (sec)"),
+        help_text=_lazy("Time spent executing SQL queries in the view."),
+    )
+    slowest_query = models.TextField(
+        blank=True,
+        default="",
+        help_text=_lazy("Slowest SQL query executed by the view (literals removed)."),
+    )
+    sample_rate = models.FloatField(
+        default=1.0,
+        help_text=_lazy(
+            "Sampling rate applied when the request was logged (1.0 = all requests)."
+        ),
     )
     timestamp = models.DateTimeField(default=tz_now)
     context = models.JSONField(
@@ -166,6 +324,15 @@ class RequestLogBase(models.Model):
 
     class Meta:
         abstract = True
+        # indexes support the admin filters, retention (timestamp), and the
+        # most common queries - always within a time range.
+        indexes = [
+            models.Index(fields=["timestamp"]),
+            models.Index(fields=["source", "timestamp"]),
+            models.Index(fields=["view_func", "timestamp"]),
+            models.Index(fields=["user", "timestamp"]),
+            models.Index(fields=["path", "timestamp"]),
+        ]
 
     def __str__(self) -> str:
         if self.http_status_code:
@@ -191,26 +358,357 @@ class RequestLogBase(models.Model):
     def netloc(self) -> str:
         return self.url_components.netloc
 
-    @property
-    def hostname(self) -> str:
-        return self.url_components.hostname or ""
-
-    @property
-    def path(self) -> str:
-        return self.url_components.path
-
-    @property
-    def query(self) -> str:
-        return self.url_components.query
+    @classmethod
+    def get_anonymised_values(cls) -> dict[str, object]:
+        """Return the field values used to anonymise a record."""
+        return {
+            "user": None,
+            "session_key": ANONYMISED,
+            "remote_addr": ANONYMISED,
+            "http_user_agent": ANONYMISED,
+        }
 
     def anonymise(self) -> None:
         """Remove sensitive personal data from the record."""
-        self.user = None
-        self.session_key = "****"
-        self.remote_addr = "****"
-        self.http_user_agent = "****"
+        for field, value in self.get_anonymised_values().items():
+            setattr(self, field, value)
         self.save()
 
 
 class RequestLog(RequestLogBase):
     """Default concrete subclass of RequestLogBase."""
+
+
+class RequestLogValueManager(models.Manager):
+    """
+    Manager that maps values to ids (and back) using an in-process cache.
+
+    As with ContentTypeManager, the cache is held on the manager - values are
+    never updated or deleted, so cached entries are never stale. The cache is
+    bounded to REQUEST_LOGGER_DIMENSION_CACHE_SIZE entries, evicting the least
+    recently used values.
+
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._ids: LRUCache[str, int] = LRUCache(DIMENSION_CACHE_SIZE)
+        self._values: LRUCache[int, str] = LRUCache(DIMENSION_CACHE_SIZE)
+
+    def _add_to_cache(self, ids: dict[str, int]) -> None:
+        # values may have been created in the current transaction, so they
+        # are not cached until it commits (in case it is rolled back).
+        def add() -> None:
+            for value, pk in ids.items():
+                self._ids.set(value, pk)
+                self._values.set(pk, value)
+
+        transaction.on_commit(add, using=self.db)
+
+    def clear_cache(self) -> None:
+        self._ids.clear()
+        self._values.clear()
+
+    def get_ids(self, values: Iterable[str]) -> dict[str, int]:
+        """
+        Return a {value: id} dict, creating any values that do not exist.
+
+        Values that are not cached are fetched in a single query, and those
+        that do not exist are created in a single (conflict-ignoring) insert
+        and then fetched - so concurrent writers can create the same value.
+
+        """
+        ids: dict[str, int] = {}
+        missing = set()
+        for value in values:
+            if (pk := self._ids.get(value)) is None:
+                missing.add(value)
+            else:
+                ids[value] = pk
+        if not missing:
+            return ids
+        found = dict(self.filter(value__in=missing).values_list("value", "id"))
+        if new := missing - found.keys():
+            self.bulk_create(
+                [self.model(value=value) for value in new], ignore_conflicts=True
+            )
+            found.update(self.filter(value__in=new).values_list("value", "id"))
+        self._add_to_cache(found)
+        return ids | found
+
+    def get_value(self, pk: int) -> str:
+        """Return the value with the given id."""
+        if (value := self._values.get(pk)) is None:
+            value = self.values_list("value", flat=True).get(pk=pk)
+            self._add_to_cache({value: pk})
+        return value
+
+
+class RequestLogValue(models.Model):
+    """Distinct string value referenced by normalised request logs."""
+
+    value = models.CharField(max_length=400, unique=True)
+
+    objects = RequestLogValueManager()
+
+    def __str__(self) -> str:
+        return self.value
+
+
+def dimension(name: str) -> property:
+    """
+    Return a property that reads and writes a value stored in RequestLogValue.
+
+    Values that are set are held on the object until it is saved (see
+    NormalisedRequestLogBase.resolve_values), so that the ids for a batch of
+    objects can be resolved together.
+
+    """
+    attname = f"{name}_ref_id"
+
+    def fget(self: NormalisedRequestLogBase) -> str:
+        if name in self._unresolved_values:
+            return self._unresolved_values[name]
+        if (pk := getattr(self, attname)) is None:
+            return ""
+        return RequestLogValue.objects.get_value(pk)
+
+    def fset(self: NormalisedRequestLogBase, value: str) -> None:
+        self._unresolved_values[name] = value or ""
+
+    return property(fget, fset)
+
+
+def dimension_fk() -> models.ForeignKey:
+    # values are never deleted, and the columns are not indexed individually
+    return models.ForeignKey(
+        RequestLogValue,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        db_index=False,
+        related_name="+",
+    )
+
+
+class NormalisedRequestLogManager(RequestLogManager):
+    def bulk_create(
+        self, objs: Iterable[NormalisedRequestLogBase], *args: object, **kwargs: object
+    ) -> list[NormalisedRequestLogBase]:
+        objs = list(objs)
+        self.model.resolve_values(objs)
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class NormalisedRequestLogBase(RequestLogBase):
+    """
+    Abstract base class for logs that store repetitive strings in a lookup table.
+
+    The `source`, `view_func`, `request_accepts`, `http_user_agent`,
+    `response_class` and `response_content_type` values are stored once, in
+    RequestLogValue, and referenced by id - they are read and written using
+    the same attributes as RequestLog, but must be filtered on using the
+    `{name}_ref__value` lookup.
+
+    """
+
+    source = dimension("source")
+    source_ref = dimension_fk()
+    view_func = dimension("view_func")
+    view_func_ref = dimension_fk()
+    request_accepts = dimension("request_accepts")
+    request_accepts_ref = dimension_fk()
+    http_user_agent = dimension("http_user_agent")
+    http_user_agent_ref = dimension_fk()
+    response_class = dimension("response_class")
+    response_class_ref = dimension_fk()
+    response_content_type = dimension("response_content_type")
+    response_content_type_ref = dimension_fk()
+
+    objects: NormalisedRequestLogManager = NormalisedRequestLogManager()
+
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=["timestamp"]),
+            models.Index(fields=["source_ref", "timestamp"]),
+            models.Index(fields=["view_func_ref", "timestamp"]),
+            models.Index(fields=["user", "timestamp"]),
+            models.Index(fields=["path", "timestamp"]),
+        ]
+
+    def __init__(self, *args: object, **kwargs: object) -> None:
+        self._unresolved_values: dict[str, str] = {}
+        super().__init__(*args, **kwargs)
+
+    @classmethod
+    def get_anonymised_values(cls) -> dict[str, object]:
+        # the user agent is stored in the lookup table
+        values = super().get_anonymised_values()
+        del values["http_user_agent"]
+        values["http_user_agent_ref_id"] = RequestLogValue.objects.get_ids(
+            [ANONYMISED]
+        )[ANONYMISED]
+        return values
+
+    @classmethod
+    def resolve_values(cls, objs: Iterable[NormalisedRequestLogBase]) -> None:
+        """Set the value ids for a batch of objects, using a single lookup."""
+        objs = [obj for obj in objs if obj._unresolved_values]
+        ids = RequestLogValue.objects.get_ids(
+            {v for obj in objs for v in obj._unresolved_values.values() if v}
+        )
+        for obj in objs:
+            for name, value in obj._unresolved_values.items():
+                setattr(obj, f"{name}_ref_id", ids.get(value))
+            obj._unresolved_values.clear()
+
+    def save(self, *args: object, **kwargs: object) -> None:
+        self.resolve_values([self])
+        super().save(*args, **kwargs)
+
+
+class NormalisedRequestLog(NormalisedRequestLogBase):
+    """Request log that stores repetitive strings in a lookup table."""
+
+
+class CompactRequestLog(NormalisedRequestLogBase):
+    """
+    Normalised request log that also uses compact column types.
+
+    The remote address uses the native IP address type (inet on PostgreSQL),
+    the HTTP method and status code are small integers, and the content
+    length is a big integer, so large (>2GB) responses can be stored.
+
+    """
+
+    remote_addr = RemoteAddrField()
+    http_method = HttpMethodField()
+    http_status_code = models.PositiveSmallIntegerField(
+        blank=True,
+        null=True,
+        verbose_name=_lazy("Response status code"),
+    )
+    content_length = models.BigIntegerField(
+        null=True, blank=True, help_text=_lazy("Length of the response body in bytes.")
+    )
+
+
+def get_request_log_model() -> type[RequestLogBase]:
+    """Return the model used to store request logs (REQUEST_LOGGER_MODEL)."""
+    return apps.get_model(REQUEST_LOG_MODEL, require_ready=False)
+
+
+class RequestLogCheckpoint(models.Model):
+    """Position (e.g. last processed RequestLog id) stored by incremental jobs."""
+
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.position}"
+
+
+class RequestLogRollup(models.Model):
+    """
+    Aggregated request log statistics per minute/hour.
+
+    Rollups are keyed on source, view_func, http_method and the status code
+    class (2 for 2xx, etc. and 0 if there is no status code), and are
+    updated incrementally by the `rollup_request_logs` command.
+
+    """
+
+    class Period(models.TextChoices):
+        MINUTE = "minute", _lazy("Minute")
+        HOUR = "hour", _lazy("Hour")
+
+    period = models.CharField(max_length=10, choices=Period.choices)
+    bucket = models.DateTimeField(help_text=_lazy("Start of the period."))
+    source = models.CharField(max_length=200)
+    view_func = models.CharField(max_length=200)
+    http_method = models.CharField(max_length=10)
+    status_class = models.PositiveSmallIntegerField(
+        help_text=_lazy("Response status code class - 2 for 2xx, etc.")
+    )
+    count = models.BigIntegerField(default=0)
+    estimated_count = models.FloatField(
+        default=0, help_text=_lazy("Count re-weighted by the sample rate.")
+    )
+    content_length = models.BigIntegerField(
+        default=0, help_text=_lazy("Total length of the response bodies in bytes.")
+    )
+    duration_sum = models.FloatField(default=0)
+    duration_min = models.FloatField(blank=True, null=True)
+    duration_max = models.FloatField(blank=True, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=[
+                    "period",
+                    "bucket",
+                    "source",
+                    "view_func",
+                    "http_method",
+                    "status_class",
+                ],
+                name="unique_request_log_rollup",
+            )
+        ]
+        indexes = [models.Index(fields=["view_func", "bucket"])]
+
+    def __str__(self) -> str:
+        return f"{self.bucket} {self.http_method} {self.view_func}"
+
+    @property
+    def duration_mean(self) -> float | None:
+        if not self.count:
+            return None
+        return self.duration_sum / self.count
+
+
+class LatencySketchQuerySet(models.QuerySet):
+    def merge(self, relative_accuracy: float | None = None) -> LatencyHistogram:
+        """Merge all of the sketches into a single histogram."""
+        merged: LatencyHistogram | None = None
+        for data in self.values_list("histogram", flat=True).iterator():
+            histogram = LatencyHistogram.from_dict(data)
+            if merged is None:
+                merged = LatencyHistogram(histogram.relative_accuracy)
+            merged.merge(histogram)
+        return merged or LatencyHistogram(relative_accuracy or 0.01)
+
+
+class LatencySketch(models.Model):
+    """
+    Latency histogram for a view function, recorded by a single process.
+
+    Each process records the duration of every request (including requests
+    that are not logged) in memory, and stores the histograms periodically.
+    Sketches can be merged to calculate percentiles over any time range:
+
+        >>> LatencySketch.objects.filter(
+        ...     view_func="myapp.views.foo",
+        ...     window_start__gte=one_hour_ago,
+        ... ).merge().quantile(0.99)
+
+    """
+
+    view_func = models.CharField(max_length=200)
+    window_start = models.DateTimeField()
+    window_end = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+    histogram = models.JSONField()
+
+    objects = LatencySketchQuerySet.as_manager()
+
+    class Meta:
+        indexes = [models.Index(fields=["view_func", "window_start"])]
+
+    def __str__(self) -> str:
+        return f"{self.view_func} ({self.window_start} - {self.window_end})"
+
+    def to_histogram(self) -> LatencyHistogram:
+        return LatencyHistogram.from_dict(self.histogram)
@@ -0,0 +1,196 @@
+"""
+Migration operations used to index large, live, request log tables.
+
+On PostgreSQL indexes are built using CREATE INDEX CONCURRENTLY, which does
+not block writes to the table - migrations that use these operations must
+be declared with `atomic = False`. Other databases use a regular
+CREATE INDEX.
+
+"""
+
+from __future__ import annotations
+
+from django.db import migrations, models
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations.operations.base import Operation
+from django.db.migrations.state import ProjectState
+from django.db.models import Model
+
+from request_logger.partitions import is_partitioned
+from request_logger.settings import BRIN_INDEX
+
+
+def supports_concurrent_index(
+    connection: BaseDatabaseWrapper, model: type[Model]
+) -> bool:
+    # indexes on a partitioned table cannot be created concurrently
+    if connection.vendor != "postgresql":
+        return False
+    return not is_partitioned(connection, model._meta.db_table)
+
+
+class AddIndexConcurrently(migrations.AddIndex):
+    """Create an index concurrently, if the database supports it."""
+
+    def database_forwards(
+        self,
+        app_label: str,
+        schema_editor: BaseDatabaseSchemaEditor,
+        from_state: ProjectState,
+        to_state: ProjectState,
+    ) -> None:
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if supports_concurrent_index(schema_editor.connection, model):
+            schema_editor.add_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.add_index(model, self.index)
+
+    def database_backwards(
+        self,
+        app_label: str,
+        schema_editor: BaseDatabaseSchemaEditor,
+        from_state: ProjectState,
+        to_state: ProjectState,
+    ) -> None:
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if not self.allow_migrate_model(schema_editor.connection.alias, model):
+            return
+        if supports_concurrent_index(schema_editor.connection, model):
+            schema_editor.remove_index(model, self.index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, self.index)
+
+
+class RemoveFieldIndexConcurrently(Operation):
+    """
+    Drop the index that Django creates for a (foreign key) field.
+
+    The index is dropped concurrently, if the database supports it. This is
+    a database operation only - use it with SeparateDatabaseAndState, and an
+    AlterField(db_index=False) state operation. MySQL requires an index on
+    foreign key columns, so the index is kept.
+
+    """
+
+    reduces_to_sql = True
+    reversible = True
+
+    def __init__(self, model_name: str, field_name: str) -> None:
+        self.model_name = model_name
+        self.field_name = field_name
+
+    def state_forwards(self, app_label: str, state: ProjectState) -> None:
+        pass
+
+    def get_index(
+        self, schema_editor: BaseDatabaseSchemaEditor, model: type[Model]
+    ) -> models.Index:
+        column = model._meta.get_field(self.field_name).column
+        # the name Django gives the index it creates for the field
+        name = schema_editor._create_index_name(model._meta.db_table, [column])
+        return models.Index(fields=[self.field_name], name=name)
+
+    def database_forwards(
+        self,
+        app_label: str,
+        schema_editor: BaseDatabaseSchemaEditor,
+        from_state: ProjectState,
+        to_state: ProjectState,
+    ) -> None:
+        model = from_state.apps.get_model(app_label, self.model_name)
+        connection = schema_editor.connection
+        if connection.vendor == "mysql":
+            return
+        if not self.allow_migrate_model(connection.alias, model):
+            return
+        index = self.get_index(schema_editor, model)
+        if supports_concurrent_index(connection, model):
+            schema_editor.remove_index(model, index, concurrently=True)
+        else:
+            schema_editor.remove_index(model, index)
+
+    def database_backwards(
+        self,
+        app_label: str,
+        schema_editor: BaseDatabaseSchemaEditor,
+        from_state: ProjectState,
+        to_state: ProjectState,
+    ) -> None:
+        model = to_state.apps.get_model(app_label, self.model_name)
+        connection = schema_editor.connection
+        if connection.vendor == "mysql":
+            return
+        if not self.allow_migrate_model(connection.alias, model):
+            return
+        index = self.get_index(schema_editor, model)
+        if supports_concurrent_index(connection, model):
+            schema_editor.add_index(model, index, concurrently=True)
+        else:
+            schema_editor.add_index(model, index)
+
+    def describe(self) -> str:
+        return f"Drop index on field {self.field_name} of model {self.model_name}"
+
+
+class AddBrinIndex(Operation):
+    """
+    Create a BRIN index on PostgreSQL, if REQUEST_LOGGER_BRIN_INDEX is True.
+
+    BRIN indexes are a fraction of the size of a btree index, and suit
+    append-only columns such as `timestamp`. The index is not part of the
+    model state, as it is database (and setting) specific.
+
+    """
+
+    reduces_to_sql = False
+    reversible = True
+
+    def __init__(self, model_name: str, field_name: str, name: str) -> None:
+        self.model_name = model_name
+        self.field_name = field_name
+        self.name = name
+
+    def state_forwards(self, app_label: str, state: ProjectState) -> None:
+        pass
+
+    def database_forwards(
+        self,
+        app_label: str,
+        schema_editor: BaseDatabaseSchemaEditor,
+        from_state: ProjectState,
+        to_state: ProjectState,
+    ) -> None:
+        model = to_state.apps.get_model(app_label, self.model_name)
+        connection = schema_editor.connection
+        if not (BRIN_INDEX and connection.vendor == "postgresql"):
+            return
+        if not self.allow_migrate_model(connection.alias, model):
+            return
+        qn = schema_editor.quote_name
+        concurrently = (
+            "CONCURRENTLY " if supports_concurrent_index(connection, model) else ""
+        )
+        column = model._meta.get_field(self.field_name).column
+        schema_editor.execute(
+            f"CREATE INDEX {concurrently}IF NOT EXISTS {qn(self.name)} "
+            f"ON {qn(model._meta.db_table)} USING brin ({qn(column)})"
+        )
+
+    def database_backwards(
+        self,
+        app_label: str,
+        schema_editor: BaseDatabaseSchemaEditor,
+        from_state: ProjectState,
+        to_state: ProjectState,
+    ) -> None:
+        if schema_editor.connection.vendor != "postgresql":
+            return
+        schema_editor.execute(
+            f"DROP INDEX IF EXISTS {schema_editor.quote_name(self.name)}"
+        )
+
+    def describe(self) -> str:
+        return f"Create BRIN index {self.name} on {self.model_name}"
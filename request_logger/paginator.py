@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import json
+import logging
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import QuerySet
+from django.utils.functional import cached_property
+
+from request_logger.settings import ESTIMATED_COUNT_THRESHOLD
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_table_count(queryset: QuerySet) -> int | None:
+    """Return the planner's estimate of the number of rows in the table."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+    with connection.cursor() as cursor:
+        # reltuples is -1 for tables that have never been analyzed, and a
+        # partitioned table has no rows of its own - so sum the partitions.
+        cursor.execute(
+            "SELECT SUM(GREATEST(reltuples, 0))::bigint FROM pg_class "
+            "WHERE oid = to_regclass(%s) OR oid IN "
+            "(SELECT inhrelid FROM pg_inherits WHERE inhparent = to_regclass(%s))",
+            [queryset.model._meta.db_table] * 2,
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def estimate_query_count(queryset: QuerySet) -> int | None:
+    """Return the planner's estimate of the number of rows in a queryset."""
+    try:
+        plan = json.loads(queryset.explain(format="json"))
+        return int(plan[0]["Plan"]["Plan Rows"])
+    except Exception:  # noqa: B902
+        logger.exception("Error estimating queryset count.")
+        return None
+
+
+def estimate_count(
+    queryset: QuerySet, threshold: int = ESTIMATED_COUNT_THRESHOLD
+) -> int | None:
+    """
+    Return an estimated count for the queryset, if the table is large.
+
+    Estimates are taken from the PostgreSQL planner statistics, and are only
+    used if the table holds more than `threshold` rows - below that an exact
+    count is cheap enough. Returns None if the count should not be estimated.
+
+    """
+    total = estimate_table_count(queryset)
+    if total is None or total < threshold:
+        return None
+    if not queryset.query.where:
+        return total
+    return estimate_query_count(queryset)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids an exact COUNT(*) on large tables.
+
+    On PostgreSQL the count is estimated from planner statistics once the
+    table is larger than REQUEST_LOGGER_ESTIMATED_COUNT_THRESHOLD rows, so
+    the number of pages is approximate.
+
+    """
+
+    @cached_property
+    def count(self) -> int:
+        if isinstance(self.object_list, QuerySet):
+            if (estimate := estimate_count(self.object_list)) is not None:
+                return estimate
+        return super().count
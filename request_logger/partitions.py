@@ -0,0 +1,278 @@
+"""
+Native (PostgreSQL) range partitioning of request logs by timestamp.
+
+Partitions are named after the table and the start of the range that they
+cover - e.g. `request_logger_requestlog_p20240101` - and cover a day or a
+month. Expired partitions can be dropped in constant time, instead of
+deleting (and then vacuuming) individual rows.
+
+An existing table is converted by renaming it, creating a new partitioned
+table in its place, and attaching the original table as the partition for
+everything before the start of the next interval. This locks the table, and
+attaching the partition requires a scan of the existing table to validate
+the range, so it should be run during a maintenance window.
+
+"""
+
+from __future__ import annotations
+
+import datetime
+import re
+from dataclasses import dataclass
+
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Model
+from django.utils import timezone
+
+UTC = datetime.timezone.utc
+
+DAY = "day"
+MONTH = "month"
+INTERVALS = (DAY, MONTH)
+
+# match the bounds in a partition bound expression, e.g.
+# "FOR VALUES FROM ('2024-01-01 00:00:00+00') TO ('2024-02-01 00:00:00+00')"
+LOWER_BOUND_RE = re.compile(r"FROM \('(\d{4}-\d{2}-\d{2})")
+UPPER_BOUND_RE = re.compile(r"TO \('(\d{4}-\d{2}-\d{2})")
+
+
+class PartitioningNotSupported(Exception):
+    pass
+
+
+@dataclass
+class Partition:
+    name: str
+    # the upper bound is None for a DEFAULT partition, or a MAXVALUE range
+    upper_bound: datetime.date | None
+    # the lower bound is None for a DEFAULT partition, or a MINVALUE range
+    lower_bound: datetime.date | None = None
+
+    @property
+    def is_default(self) -> bool:
+        return self.lower_bound is None and self.upper_bound is None
+
+    def overlaps(self, lower: datetime.date, upper: datetime.date) -> bool:
+        """Return True if the partition overlaps the [lower, upper) range."""
+        if self.is_default:
+            return False
+        return (self.lower_bound is None or self.lower_bound < upper) and (
+            self.upper_bound is None or lower < self.upper_bound
+        )
+
+
+def interval_start(day: datetime.date, interval: str) -> datetime.date:
+    """Return the start of the interval containing day."""
+    if interval == DAY:
+        return day
+    if interval == MONTH:
+        return day.replace(day=1)
+    raise ValueError(f"Invalid partition interval: {interval}")
+
+
+def next_interval(start: datetime.date, interval: str) -> datetime.date:
+    """Return the start of the interval following the one starting at start."""
+    if interval == DAY:
+        return start + datetime.timedelta(days=1)
+    if interval == MONTH:
+        return (start.replace(day=1) + datetime.timedelta(days=32)).replace(day=1)
+    raise ValueError(f"Invalid partition interval: {interval}")
+
+
+def partition_ranges(
+    start: datetime.date, interval: str, count: int
+) -> list[tuple[datetime.date, datetime.date]]:
+    """Return (from, to) date ranges for `count` partitions, from start."""
+    ranges = []
+    lower = interval_start(start, interval)
+    for _ in range(count):
+        upper = next_interval(lower, interval)
+        ranges.append((lower, upper))
+        lower = upper
+    return ranges
+
+
+def partition_name(table: str, lower: datetime.date) -> str:
+    return f"{table}_p{lower:%Y%m%d}"
+
+
+def _bound(day: datetime.date) -> str:
+    # timestamps are stored as UTC
+    return f"'{day.isoformat()} 00:00:00+00:00'"
+
+
+def check_connection(connection: BaseDatabaseWrapper) -> None:
+    if connection.vendor != "postgresql":
+        raise PartitioningNotSupported(
+            "Request log partitioning is only supported on PostgreSQL."
+        )
+
+
+def is_partitioned(connection: BaseDatabaseWrapper, table: str) -> bool:
+    """Return True if the table is a partitioned table."""
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [table]
+        )
+        row = cursor.fetchone()
+    return bool(row) and row[0] == "p"
+
+
+def list_partitions(connection: BaseDatabaseWrapper, table: str) -> list[Partition]:
+    """Return the partitions of the table, ordered by name."""
+    check_connection(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) "
+            "FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = to_regclass(%s) "
+            "ORDER BY c.relname",
+            [table],
+        )
+        rows = cursor.fetchall()
+    partitions = []
+    for name, bound in rows:
+        lower, upper = (
+            (
+                datetime.date.fromisoformat(match.group(1))
+                if (match := regex.search(bound or ""))
+                else None
+            )
+            for regex in (LOWER_BOUND_RE, UPPER_BOUND_RE)
+        )
+        partitions.append(Partition(name=name, upper_bound=upper, lower_bound=lower))
+    return partitions
+
+
+def uncovered_ranges(
+    ranges: list[tuple[datetime.date, datetime.date]], partitions: list[Partition]
+) -> list[tuple[datetime.date, datetime.date]]:
+    """Return the ranges that do not overlap any existing partition."""
+    return [
+        (lower, upper)
+        for lower, upper in ranges
+        if not any(p.overlaps(lower, upper) for p in partitions)
+    ]
+
+
+def create_partitions_sql(
+    connection: BaseDatabaseWrapper,
+    table: str,
+    ranges: list[tuple[datetime.date, datetime.date]],
+) -> list[str]:
+    """Return the SQL used to create partitions for each (from, to) range."""
+    qn = connection.ops.quote_name
+    return [
+        f"CREATE TABLE IF NOT EXISTS {qn(partition_name(table, lower))} "
+        f"PARTITION OF {qn(table)} "
+        f"FOR VALUES FROM ({_bound(lower)}) TO ({_bound(upper)})"
+        for lower, upper in ranges
+    ]
+
+
+def drop_partition_sql(
+    connection: BaseDatabaseWrapper, table: str, partition: str
+) -> list[str]:
+    """Return the SQL used to detach and drop a partition."""
+    qn = connection.ops.quote_name
+    return [
+        f"ALTER TABLE {qn(table)} DETACH PARTITION {qn(partition)}",
+        f"DROP TABLE {qn(partition)}",
+    ]
+
+
+def expired_partitions(
+    partitions: list[Partition], cutoff: datetime.datetime
+) -> list[Partition]:
+    """Return the partitions that only contain rows from before the cutoff."""
+    if timezone.is_naive(cutoff):
+        cutoff = timezone.make_aware(cutoff)
+    return [
+        p
+        for p in partitions
+        if p.upper_bound
+        and datetime.datetime.combine(p.upper_bound, datetime.time.min, tzinfo=UTC)
+        <= cutoff
+    ]
+
+
+def drop_expired_partitions_sql(
+    connection: BaseDatabaseWrapper, table: str, cutoff: datetime.datetime
+) -> list[str]:
+    """Return the SQL used to drop all partitions expired at the cutoff."""
+    expired = expired_partitions(list_partitions(connection, table), cutoff)
+    return [
+        sql
+        for partition in expired
+        for sql in drop_partition_sql(connection, table, partition.name)
+    ]
+
+
+def legacy_index_name(name: str) -> str:
+    # index names are at most 30 characters, well within the 63 allowed
+    return f"{name}_legacy"
+
+
+def convert_boundary(today: datetime.date, interval: str) -> datetime.date:
+    """Return the upper bound of the legacy partition created by convert."""
+    return next_interval(interval_start(today, interval), interval)
+
+
+def convert_table_sql(
+    connection: BaseDatabaseWrapper,
+    model: type[Model],
+    today: datetime.date,
+    interval: str,
+) -> list[str]:
+    """
+    Return the SQL used to convert the model table to a partitioned table.
+
+    The existing table becomes the partition for all rows up to the start of
+    the next interval, and a partition is created for the next interval.
+
+    """
+    qn = connection.ops.quote_name
+    table = model._meta.db_table
+    legacy = f"{table}_legacy"
+    pk = model._meta.pk.column
+    timestamp = model._meta.get_field("timestamp").column
+    user_field = model._meta.get_field("user")
+    boundary = convert_boundary(today, interval)
+    sql = [
+        f"ALTER TABLE {qn(table)} RENAME TO {qn(legacy)}",
+        f"CREATE TABLE {qn(table)} "
+        f"(LIKE {qn(legacy)} INCLUDING DEFAULTS INCLUDING IDENTITY) "
+        f"PARTITION BY RANGE ({qn(timestamp)})",
+        # the partition key must be part of the primary key
+        f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_part_pkey')} "
+        f"PRIMARY KEY ({qn(pk)}, {qn(timestamp)})",
+        # a serial (pre-identity) sequence is owned by the legacy table, and
+        # would be dropped along with it, so it must be handed over
+        "DO $$ DECLARE seq text; BEGIN "
+        f"IF pg_get_serial_sequence('{table}', '{pk}') IS NULL THEN "
+        f"seq := pg_get_serial_sequence('{legacy}', '{pk}'); "
+        "EXECUTE format('ALTER SEQUENCE %s OWNED BY %I.%I', "
+        f"seq, '{table}', '{pk}'); "
+        "END IF; END $$",
+        # carry on from the existing ids, as IDENTITY creates a new sequence
+        f"SELECT setval(pg_get_serial_sequence('{table}', '{pk}'), "  # noqa: S608
+        f"(SELECT COALESCE(MAX({qn(pk)}), 0) + 1 FROM {qn(legacy)}), false)",
+        f"ALTER TABLE {qn(table)} ADD CONSTRAINT "
+        f"{qn(table + '_user_fk')} FOREIGN KEY ({qn(user_field.column)}) "
+        f"REFERENCES {qn(user_field.related_model._meta.db_table)} "
+        "DEFERRABLE INITIALLY DEFERRED",
+        # the Meta indexes are (re)created on the partitioned table, using
+        # the same (fixed) names, so the legacy table's must be renamed
+        *(
+            f"ALTER INDEX IF EXISTS {qn(index.name)} "
+            f"RENAME TO {qn(legacy_index_name(index.name))}"
+            for index in model._meta.indexes
+        ),
+        f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(legacy)} "
+        f"FOR VALUES FROM (MINVALUE) TO ({_bound(boundary)})",
+    ]
+    return sql + create_partitions_sql(
+        connection, table, partition_ranges(boundary, interval, 1)
+    )
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import re
+import time
+from contextlib import ExitStack
+from types import TracebackType
+from typing import Any, Callable
+
+from django.db import connections
+
+# patterns used to strip literal values from SQL, in order
+FINGERPRINT_PATTERNS = [
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\s*(?:\?|%s)(?:\s*,\s*(?:\?|%s))*\s*\)"), "(...)"),
+    (re.compile(r"\s+"), " "),
+]
+
+
+def fingerprint(sql: str) -> str:
+    """Return the SQL with literal values removed, so like queries match."""
+    for pattern, replacement in FINGERPRINT_PATTERNS:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+class QueryCounter:
+    """
+    Context manager that records the SQL queries executed within it.
+
+    An execute wrapper is installed on every configured database connection,
+    counting the number of queries, the total time spent executing them, and
+    the slowest query. NB connections are per-thread, so only queries run in
+    the current thread are recorded.
+
+    """
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.duration_ns = 0
+        self.slowest_ns = 0
+        self.slowest_sql = ""
+
+    def __call__(
+        self,
+        execute: Callable,
+        sql: str,
+        params: Any,
+        many: bool,
+        context: dict,
+    ) -> Any:
+        start_ns = time.perf_counter_ns()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed_ns = time.perf_counter_ns() - start_ns
+            self.count += 1
+            self.duration_ns += elapsed_ns
+            if elapsed_ns > self.slowest_ns:
+                self.slowest_ns = elapsed_ns
+                self.slowest_sql = sql
+
+    def __enter__(self) -> QueryCounter:
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._stack.close()
+
+    def log_kwargs(self) -> dict[str, object]:
+        """Return the values stored on the RequestLog."""
+        return {
+            "query_count": self.count,
+            "query_duration": self.duration_ns / 1e9,
+            "slowest_query": fingerprint(self.slowest_sql),
+        }
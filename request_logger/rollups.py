@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import datetime
+
+from django.db import router, transaction
+from django.db.models import Count, F, FloatField, Max, Min, Q, Sum, Value
+from django.db.models.functions import Cast, Coalesce, Trunc
+from django.utils import timezone
+
+from request_logger.models import (
+    RequestLogCheckpoint,
+    RequestLogRollup,
+    get_request_log_model,
+)
+from request_logger.serializers import get_field_lookups
+
+# fields that identify a rollup (in addition to the period)
+ROLLUP_KEY = ("bucket", "source", "view_func", "http_method", "status_class")
+# rollup key values read from the log
+ROLLUP_VALUES = ("source", "view_func", "http_method")
+
+
+def aggregate_logs(period: str, min_pk: int, max_pk: int, using: str) -> list[dict]:
+    """Aggregate the logs in the (min_pk, max_pk] range into rollup values."""
+    model = get_request_log_model()
+    # normalised values are read from the lookup table
+    values = {
+        name: F(lookup)
+        for name, lookup in zip(
+            ROLLUP_VALUES, get_field_lookups(model, list(ROLLUP_VALUES))
+        )
+        if lookup != name
+    }
+    return list(
+        model.objects.using(using)
+        .filter(pk__gt=min_pk, pk__lte=max_pk)
+        .annotate(
+            bucket=Trunc("timestamp", period),
+            status_class=Coalesce(F("http_status_code") / 100, Value(0)),
+            **values,
+        )
+        .values(*ROLLUP_KEY)
+        .annotate(
+            count=Count("id"),
+            estimated_count=Sum(Value(1.0) / Cast("sample_rate", FloatField())),
+            content_length=Coalesce(Sum("content_length"), Value(0)),
+            duration_sum=Coalesce(Sum("duration"), Value(0.0)),
+            duration_min=Min("duration"),
+            duration_max=Max("duration"),
+        )
+        .order_by()
+    )
+
+
+def _min(a: float | None, b: float | None) -> float | None:
+    return b if a is None else a if b is None else min(a, b)
+
+
+def _max(a: float | None, b: float | None) -> float | None:
+    return b if a is None else a if b is None else max(a, b)
+
+
+def merge_rollups(period: str, values: list[dict], using: str) -> None:
+    """Add the aggregated values to existing rollups, or create new ones."""
+    if not values:
+        return
+    existing = (
+        RequestLogRollup.objects.using(using).select_for_update().filter(period=period)
+    )
+    lookup = Q()
+    for value in values:
+        lookup |= Q(**{k: value[k] for k in ROLLUP_KEY})
+    rollups = {
+        tuple(getattr(r, k) for k in ROLLUP_KEY): r for r in existing.filter(lookup)
+    }
+    new_rollups = []
+    for value in values:
+        rollup = rollups.get(tuple(value[k] for k in ROLLUP_KEY))
+        if not rollup:
+            new_rollups.append(RequestLogRollup(period=period, **value))
+            continue
+        rollup.count += value["count"]
+        rollup.estimated_count += value["estimated_count"]
+        rollup.content_length += value["content_length"]
+        rollup.duration_sum += value["duration_sum"]
+        rollup.duration_min = _min(rollup.duration_min, value["duration_min"])
+        rollup.duration_max = _max(rollup.duration_max, value["duration_max"])
+        rollup.save()
+    RequestLogRollup.objects.using(using).bulk_create(new_rollups)
+
+
+def rollup_request_logs(
+    period: str, batch_size: int = 10_000, lag: float = 60
+) -> tuple[int, int]:
+    """
+    Roll up all logs created since the last run into RequestLogRollup.
+
+    The id of the last log processed is stored as a RequestLogCheckpoint, so
+    each log is only rolled up once. Logs less than `lag` seconds old, and
+    all logs with a later id, are left for the next run - so that logs
+    written in transactions that are still open (e.g. buffered writes) are
+    not skipped. NB logs written with an older timestamp (e.g. imported, or
+    drained from the spool) do not hold back the batch, so should not be
+    written concurrently with a rollup.
+
+    Logs are read from, and the rollups and checkpoint written to, the
+    database that logs are written to (see routers.py), in one transaction
+    per batch - logs are not read from a (lagging) replica.
+
+    Returns the number of logs processed, and the last log id processed.
+
+    """
+    name = f"rollup:{period}"
+    using = router.db_for_write(RequestLogCheckpoint)
+    checkpoints = RequestLogCheckpoint.objects.using(using)
+    checkpoints.get_or_create(name=name)
+    cutoff = timezone.now() - datetime.timedelta(seconds=lag)
+    total = 0
+    while True:
+        with transaction.atomic(using=using):
+            checkpoint = checkpoints.select_for_update().get(name=name)
+            logs = (
+                get_request_log_model()
+                .objects.using(using)
+                .filter(pk__gt=checkpoint.position)
+                .order_by("pk")
+            )
+            # the batch ends before the first log that is too recent, so
+            # that no log after it is rolled up early (or skipped)
+            recent = logs.filter(timestamp__gte=cutoff).values_list("pk", flat=True)
+            if (first_recent := recent.first()) is not None:
+                logs = logs.filter(pk__lt=first_recent)
+            pks = list(logs.values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                return total, checkpoint.position
+            values = aggregate_logs(period, checkpoint.position, pks[-1], using)
+            merge_rollups(period, values, using)
+            total += sum(value["count"] for value in values)
+            checkpoint.position = pks[-1]
+            checkpoint.save()
@@ -0,0 +1,62 @@
+"""
+Database router used to isolate request logging from the application.
+
+Add the router to DATABASE_ROUTERS, and set REQUEST_LOGGER_DATABASE to the
+alias that logs are written to:
+
+    DATABASES = {
+        "default": {...},
+        # a second connection to the same database
+        "request_logger": {...},
+        "replica": {...},
+    }
+    DATABASE_ROUTERS = ["request_logger.routers.RequestLoggerRouter"]
+    REQUEST_LOGGER_DATABASE = "request_logger"
+    REQUEST_LOGGER_READ_DATABASE = "replica"
+
+As the alias has its own connection, logs are written in autocommit mode,
+outside of any transaction (including ATOMIC_REQUESTS) held by the request
+- so a rollback does not discard the log, and the INSERT does not extend
+the request's transaction.
+
+Logs (RequestLogBase subclasses) are read from REQUEST_LOGGER_READ_DATABASE,
+so the admin, exports and rollups can use a replica. Other request_logger
+models (lookup values, checkpoints etc.) are always read from the primary,
+as they are read back immediately after being written.
+
+"""
+
+from __future__ import annotations
+
+from django.db import models
+
+from request_logger.models import RequestLogBase
+from request_logger.settings import DATABASE, READ_DATABASE
+
+
+def is_request_logger_model(model: type[models.Model]) -> bool:
+    return model._meta.app_label == "request_logger" or issubclass(
+        model, RequestLogBase
+    )
+
+
+class RequestLoggerRouter:
+    """Route request_logger models to REQUEST_LOGGER_DATABASE."""
+
+    def db_for_read(self, model: type[models.Model], **hints: object) -> str | None:
+        if issubclass(model, RequestLogBase):
+            return READ_DATABASE
+        return self.db_for_write(model, **hints)
+
+    def db_for_write(self, model: type[models.Model], **hints: object) -> str | None:
+        if is_request_logger_model(model):
+            return DATABASE
+        return None
+
+    def allow_relation(
+        self, obj1: models.Model, obj2: models.Model, **hints: object
+    ) -> bool | None:
+        # logs reference the user, which is stored in the default database
+        if is_request_logger_model(type(obj1)) or is_request_logger_model(type(obj2)):
+            return True
+        return None
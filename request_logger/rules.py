@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable, TypeAlias
+
+from django.http import HttpRequest, HttpResponse
+
+# a status code rule is either a single code, or an inclusive (min, max) range
+StatusCodeRule: TypeAlias = int | tuple[int, int]
+
+
+def _compile_paths(
+    prefixes: Iterable[str], regexes: Iterable[str]
+) -> re.Pattern | None:
+    # prefixes and regexes are combined into a single pattern so that a path
+    # is tested in a single pass, however many rules are configured.
+    patterns = [re.escape(p) for p in prefixes] + [f"(?:{r})" for r in regexes]
+    if not patterns:
+        return None
+    return re.compile("|".join(patterns))
+
+
+def _compile_status_codes(rules: Iterable[StatusCodeRule]) -> frozenset[int]:
+    codes: set[int] = set()
+    for rule in rules:
+        if isinstance(rule, int):
+            codes.add(rule)
+        else:
+            codes.update(range(rule[0], rule[1] + 1))
+    return frozenset(codes)
+
+
+class RequestLogRules:
+    """
+    Declarative rules used to decide whether a request should be logged.
+
+    Rules are compiled once, so that testing a request is (close to) constant
+    time, regardless of the number of rules. Each include rule that is set
+    must match (an empty rule matches everything), and any matching exclude
+    rule prevents the request from being logged.
+
+    Paths are matched against `request.path_info` - `paths` are prefixes, and
+    `path_regexes` are matched from the start of the path (as with `re_path`).
+    View functions are matched against `request.resolver_match._func_path`.
+
+    """
+
+    def __init__(
+        self,
+        *,
+        paths: Iterable[str] = (),
+        path_regexes: Iterable[str] = (),
+        methods: Iterable[str] = (),
+        status_codes: Iterable[StatusCodeRule] = (),
+        view_funcs: Iterable[str] = (),
+        exclude_paths: Iterable[str] = (),
+        exclude_path_regexes: Iterable[str] = (),
+        exclude_view_funcs: Iterable[str] = (),
+    ) -> None:
+        self.path_pattern = _compile_paths(paths, path_regexes)
+        self.exclude_path_pattern = _compile_paths(exclude_paths, exclude_path_regexes)
+        self.methods = frozenset(m.upper() for m in methods)
+        self.status_codes = _compile_status_codes(status_codes)
+        self.view_funcs = frozenset(view_funcs)
+        self.exclude_view_funcs = frozenset(exclude_view_funcs)
+
+    def match_request(self, request: HttpRequest) -> bool:
+        """Return True if the request path and method match the rules."""
+        if self.methods and request.method not in self.methods:
+            return False
+        path = request.path_info
+        if self.path_pattern and not self.path_pattern.match(path):
+            return False
+        if self.exclude_path_pattern and self.exclude_path_pattern.match(path):
+            return False
+        return True
+
+    def match_response(self, request: HttpRequest, response: HttpResponse) -> bool:
+        """Return True if the resolved view and response status match the rules."""
+        if self.status_codes and response.status_code not in self.status_codes:
+            return False
+        if not (self.view_funcs or self.exclude_view_funcs):
+            return True
+        match = getattr(request, "resolver_match", None)
+        view_func = match._func_path if match else ""
+        if self.view_funcs and view_func not in self.view_funcs:
+            return False
+        return view_func not in self.exclude_view_funcs
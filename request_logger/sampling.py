@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import random
+import threading
+import time
+
+from django.http import HttpRequest, HttpResponse
+
+from request_logger.settings import SAMPLING_POLICIES
+
+# half-life (secs) of the request counts used to measure the acceptance rate
+ACCEPTANCE_HALF_LIFE = 10.0
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket, used to cap the rate of logged requests.
+
+    The share of requests that are let through (`acceptance_rate`) is
+    measured using exponentially decayed counts, so that it tracks the
+    recent rate of requests.
+
+    """
+
+    def __init__(self, rate: float, capacity: float | None = None) -> None:
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.last_ts = time.monotonic()
+        self.offered = 0.0
+        self.accepted = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def acceptance_rate(self) -> float:
+        with self._lock:
+            return self.accepted / self.offered if self.offered else 1.0
+
+    def consume(self) -> bool:
+        """Take a token from the bucket, returning False if it is empty."""
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self.last_ts
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.last_ts = now
+            decay = 0.5 ** (elapsed / ACCEPTANCE_HALF_LIFE)
+            self.offered = self.offered * decay + 1
+            self.accepted *= decay
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            self.accepted += 1
+            return True
+
+
+class SamplingPolicy:
+    """
+    Policy used to log a sample of requests, rather than all of them.
+
+    The `rate` is the probability (0-1) that a request is logged, and
+    `max_per_second` caps the number of logged requests (per view function)
+    using a token bucket. Server errors (5xx) are always logged, unless
+    `always_log_errors` is False, and requests that take longer than
+    `slow_threshold` seconds are always logged.
+
+    The sampling rate is recorded on each RequestLog (as `sample_rate`), so
+    that counts can be re-weighted - e.g. `Sum(1 / F("sample_rate"))`. If
+    requests are dropped by the `max_per_second` cap the recorded rate is
+    scaled by the (recent) share of requests that the cap let through.
+
+    """
+
+    def __init__(
+        self,
+        rate: float = 1.0,
+        max_per_second: float | None = None,
+        always_log_errors: bool = True,
+        slow_threshold: float | None = None,
+    ) -> None:
+        if not 0 < rate <= 1:
+            raise ValueError("Sampling rate must be > 0 and <= 1.")
+        self.rate = rate
+        self.max_per_second = max_per_second
+        self.always_log_errors = always_log_errors
+        self.slow_threshold = slow_threshold
+        self._buckets: dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def get_bucket(self, view_func: str) -> TokenBucket:
+        if bucket := self._buckets.get(view_func):
+            return bucket
+        with self._lock:
+            return self._buckets.setdefault(
+                view_func, TokenBucket(self.max_per_second or 0)
+            )
+
+    def sample(
+        self, request: HttpRequest, response: HttpResponse, duration: float
+    ) -> float | None:
+        """Return the sample rate to record, or None if the request is dropped."""
+        if self.always_log_errors and response.status_code >= 500:
+            return 1.0
+        if self.slow_threshold is not None and duration >= self.slow_threshold:
+            return 1.0
+        if self.rate < 1 and random.random() >= self.rate:  # noqa: S311
+            return None
+        if self.max_per_second is not None:
+            bucket = self.get_bucket(get_view_func(request))
+            if not bucket.consume():
+                return None
+            return self.rate * bucket.acceptance_rate
+        return self.rate
+
+
+def get_view_func(request: HttpRequest) -> str:
+    match = getattr(request, "resolver_match", None)
+    return match._func_path if match else ""
+
+
+# SamplingPolicy instances configured by REQUEST_LOGGER_SAMPLING_POLICIES
+_policies = {
+    view_func: SamplingPolicy(**kwargs)
+    for view_func, kwargs in SAMPLING_POLICIES.items()
+}
+
+
+def get_sampling_policy(request: HttpRequest) -> SamplingPolicy | None:
+    """Return the configured SamplingPolicy for the request view function."""
+    if not _policies:
+        return None
+    return _policies.get(get_view_func(request))
+
+
+def sample_request(
+    request: HttpRequest,
+    response: HttpResponse,
+    duration: float,
+    policy: SamplingPolicy | None = None,
+) -> float | None:
+    """
+    Return the sample rate to record for a request, or None to drop it.
+
+    If no policy is passed in, the policy configured for the request view
+    function (if any) is used. Requests without a policy are always logged.
+
+    """
+    policy = policy or get_sampling_policy(request)
+    if policy is None:
+        return 1.0
+    return policy.sample(request, response, duration)
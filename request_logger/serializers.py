@@ -0,0 +1,90 @@
+"""
+Serialization of request log records, shared by commands and log sinks.
+
+Records are dicts of field values, keyed on LOG_FIELDS, as returned by
+`RequestLogManager.parse` - or read from the database using
+`get_field_lookups`. Foreign keys are stored as ids (`user_id`).
+
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+from typing import Any
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Model
+from django.utils.timezone import now as tz_now
+
+from request_logger.models import RequestLogBase
+
+# fields common to all RequestLogBase models, in column order
+LOG_FIELDS = [
+    f.attname if f.is_relation else f.name for f in RequestLogBase._meta.fields
+]
+# fields exported from the database
+EXPORT_FIELDS = ["id", *LOG_FIELDS]
+
+_encoder = DjangoJSONEncoder()
+
+
+def get_field_lookups(model: type[Model], fields: list[str]) -> list[str]:
+    """
+    Return the lookups used to read each field from the model using values().
+
+    Fields that are properties on the model (e.g. the values stored in a lookup
+    table by NormalisedRequestLog) are read through the `{name}_ref` relation.
+
+    """
+    return [
+        (
+            f"{name}_ref__value"
+            if isinstance(getattr(model, name, None), property)
+            else name
+        )
+        for name in fields
+    ]
+
+
+def prepare_record(record: dict[str, Any]) -> dict[str, Any]:
+    """
+    Return a parsed record (see RequestLogManager.parse) for serialization.
+
+    Related objects (i.e. the user) are replaced by their ids, and the
+    timestamp is set if it is not already.
+
+    """
+    prepared = {}
+    for key, value in record.items():
+        if isinstance(value, Model):
+            prepared[f"{key}_id"] = value.pk
+        else:
+            prepared[key] = value
+    prepared.setdefault("timestamp", tz_now())
+    return prepared
+
+
+def _default(value: Any) -> Any:
+    # datetimes are the only non-JSON type in a log record
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return _encoder.default(value)
+
+
+def to_json(record: dict[str, Any]) -> bytes:
+    """Serialize a record as a single line of JSON (with trailing newline)."""
+    return json.dumps(record, default=_default, separators=(",", ":")).encode() + b"\n"
+
+
+def from_json(line: bytes | str) -> dict[str, Any]:
+    """Deserialize a line of JSON written by `to_json`."""
+    return json.loads(line)
+
+
+def to_csv_row(record: dict[str, Any], fields: list[str]) -> list[Any]:
+    """Return the record as a CSV row - the context is stored as JSON."""
+    return [
+        json.dumps(v, default=_default) if isinstance(v, dict) else v
+        for v in (record.get(f) for f in fields)
+    ]
@@ -14,7 +14,7 @@ def _exclude(request: HttpRequest) -> bool:
     return False
 
 
-def _extract(request: HttpRequest) -> bool:
+def _extract(request: HttpRequest) -> dict:
     # default request context extractor
     return {}
 
@@ -27,3 +27,82 @@ DEFAULT_EXCLUDE_FUNC = getattr(settings, "REQUEST_LOGGER_DEFAULT_EXCLUDE", _excl
 REQUEST_CONTEXT_EXTRACTOR = getattr(
     settings, "REQUEST_LOGGER_CONTEXT_EXTRACTOR", _extract
 )
+
+# If True, log records are buffered in-process and written in batches from
+# a background thread, instead of one INSERT per request.
+BUFFER_ENABLED = getattr(settings, "REQUEST_LOGGER_BUFFER_ENABLED", False)
+# Max number of buffered records before the buffer is flushed.
+BUFFER_SIZE = getattr(settings, "REQUEST_LOGGER_BUFFER_SIZE", 100)
+# Max number of seconds a record is held in the buffer before being flushed.
+BUFFER_FLUSH_INTERVAL = getattr(settings, "REQUEST_LOGGER_BUFFER_FLUSH_INTERVAL", 1.0)
+# Max number of records held in the buffer (e.g. while the database is slow)
+# - records added to a buffer that holds this many are dropped.
+BUFFER_MAX_RECORDS = getattr(settings, "REQUEST_LOGGER_BUFFER_MAX_RECORDS", 10_000)
+
+# Declarative rules used by RequestLogMiddleware - see rules.RequestLogRules
+MIDDLEWARE_RULES = getattr(settings, "REQUEST_LOGGER_MIDDLEWARE_RULES", {})
+
+# Sampling policies per view function path - {view_func: SamplingPolicy kwargs}
+SAMPLING_POLICIES = getattr(settings, "REQUEST_LOGGER_SAMPLING_POLICIES", {})
+
+# Interval covered by each partition ("day" or "month") - see partitions.py
+PARTITION_INTERVAL = getattr(settings, "REQUEST_LOGGER_PARTITION_INTERVAL", "month")
+
+# If True, a BRIN index is created on RequestLog.timestamp (PostgreSQL only)
+BRIN_INDEX = getattr(settings, "REQUEST_LOGGER_BRIN_INDEX", False)
+
+# Tables larger than this use an estimated count in the admin (PostgreSQL only)
+ESTIMATED_COUNT_THRESHOLD = getattr(
+    settings, "REQUEST_LOGGER_ESTIMATED_COUNT_THRESHOLD", 100_000
+)
+
+# If True, the duration of every request is recorded in per-view latency
+# histograms, which are stored every LATENCY_SKETCH_FLUSH_INTERVAL seconds.
+LATENCY_SKETCHES_ENABLED = getattr(settings, "REQUEST_LOGGER_LATENCY_SKETCHES", False)
+LATENCY_SKETCH_FLUSH_INTERVAL = getattr(
+    settings, "REQUEST_LOGGER_LATENCY_SKETCH_FLUSH_INTERVAL", 60
+)
+LATENCY_SKETCH_ACCURACY = getattr(
+    settings, "REQUEST_LOGGER_LATENCY_SKETCH_ACCURACY", 0.01
+)
+
+# If True, the number and duration of SQL queries executed by a view are logged
+CAPTURE_QUERIES = getattr(settings, "REQUEST_LOGGER_CAPTURE_QUERIES", False)
+
+# If True, streaming responses are logged once the stream has been sent, with
+# the number of bytes streamed and the time taken to stream them.
+STREAMING_ENABLED = getattr(settings, "REQUEST_LOGGER_STREAMING", False)
+
+# Model used to store request logs - e.g. "request_logger.NormalisedRequestLog"
+REQUEST_LOG_MODEL = getattr(
+    settings, "REQUEST_LOGGER_MODEL", "request_logger.RequestLog"
+)
+# Max number of values held in the NormalisedRequestLog value cache
+DIMENSION_CACHE_SIZE = getattr(settings, "REQUEST_LOGGER_DIMENSION_CACHE_SIZE", 10_000)
+
+# Destination that request logs are written to - see sinks.py
+SINK = getattr(
+    settings, "REQUEST_LOGGER_SINK", {"BACKEND": "request_logger.sinks.DatabaseSink"}
+)
+
+# Path of the local (SQLite) spool used when logs cannot be written - see spool.py
+SPOOL_PATH = getattr(settings, "REQUEST_LOGGER_SPOOL_PATH", None)
+# Writes slower than this (in seconds) open the circuit breaker (0 to disable)
+SPOOL_LATENCY_BUDGET = getattr(settings, "REQUEST_LOGGER_SPOOL_LATENCY_BUDGET", 0)
+# Number of seconds that logs are spooled for once the circuit breaker opens
+SPOOL_COOLDOWN = getattr(settings, "REQUEST_LOGGER_SPOOL_COOLDOWN", 30)
+
+# Database alias that logs are written to by RequestLoggerRouter - see routers.py
+DATABASE = getattr(settings, "REQUEST_LOGGER_DATABASE", None)
+# Database alias that logs are read from (e.g. a replica) - defaults to DATABASE
+READ_DATABASE = getattr(settings, "REQUEST_LOGGER_READ_DATABASE", DATABASE)
+
+# If True, REQUEST_CONTEXT_EXTRACTOR is run after the response has been sent
+# (or in the buffer thread), rather than in the request path - see context.py
+CONTEXT_DEFERRED = getattr(settings, "REQUEST_LOGGER_CONTEXT_DEFERRED", False)
+# Max number of seconds the context extractor can run for (0 for no limit)
+CONTEXT_TIMEOUT = getattr(settings, "REQUEST_LOGGER_CONTEXT_TIMEOUT", 0)
+
+# If True, the user id is only recorded if it can be read without loading
+# the (lazy) request.user or the session - see models.get_user_id
+LAZY_USER = getattr(settings, "REQUEST_LOGGER_LAZY_USER", False)
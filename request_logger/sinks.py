@@ -0,0 +1,246 @@
+"""
+Destinations that request log records are written to.
+
+The sink is configured using the REQUEST_LOGGER_SINK setting, e.g.:
+
+    REQUEST_LOGGER_SINK = {
+        "BACKEND": "request_logger.sinks.FileSink",
+        "OPTIONS": {"path": "/var/log/app/requests-{pid}.jsonl"},
+    }
+
+Records are the dicts of field values returned by RequestLogManager.parse,
+and are written in batches (of one, unless the buffer is enabled).
+
+"""
+
+from __future__ import annotations
+
+import abc
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Any
+
+from django.db import models, router
+from django.utils.module_loading import import_string
+
+from request_logger.context import resolve_context
+from request_logger.models import RequestLogBase
+from request_logger.serializers import prepare_record, to_json
+from request_logger.settings import (
+    SINK,
+    SPOOL_COOLDOWN,
+    SPOOL_LATENCY_BUDGET,
+    SPOOL_PATH,
+)
+from request_logger.spool import CircuitBreaker, RequestLogSpool
+
+logger = logging.getLogger(__name__)
+
+
+def clear_deleted_users(model: type[models.Model], records: list[dict]) -> None:
+    """
+    Remove (in place) any `user_id` that does not belong to an existing user.
+
+    Ids read from the session are not verified, so may belong to a deleted
+    user. The user foreign key is checked when the transaction commits, which
+    may be the caller's (outer) transaction - so the ids are checked before
+    the records are inserted, using a single query per batch.
+
+    """
+    user_ids = {
+        record["user_id"] for record in records if record.get("user_id") is not None
+    }
+    if not user_ids:
+        return
+    users = model._meta.get_field("user").related_model._default_manager
+    existing = set(
+        users.db_manager(router.db_for_write(model))
+        .filter(pk__in=user_ids)
+        .values_list("pk", flat=True)
+    )
+    for record in records:
+        if record.get("user_id") is not None and record["user_id"] not in existing:
+            logger.warning("RequestLog user %s does not exist.", record["user_id"])
+            record["user_id"] = None
+
+
+class RequestLogSink(abc.ABC):
+    """Base class for request log sinks."""
+
+    @abc.abstractmethod
+    def write(self, model: type[models.Model], records: list[dict]) -> None:
+        """Write the records - raising an exception if they are not written."""
+
+    def close(self) -> None:
+        pass
+
+
+class DatabaseSink(RequestLogSink):
+    """
+    Write records to the database (the default).
+
+    A record whose `user_id` was read from the session (see
+    REQUEST_LOGGER_LAZY_USER) may reference a user that has since been
+    deleted - it is stored without the user (see `clear_deleted_users`).
+
+    """
+
+    def write(self, model: type[models.Model], records: list[dict]) -> None:
+        clear_deleted_users(model, records)
+        if len(records) == 1:
+            model.objects.create(**records[0])
+        else:
+            model.objects.bulk_create([model(**record) for record in records])
+
+
+class FileSink(RequestLogSink):
+    """
+    Append records to a JSON lines file.
+
+    The file is rotated (renamed with a timestamp suffix) once it is larger
+    than `max_bytes`, or older than `max_age` seconds. Each batch is written
+    using a single unbuffered append - as files should not be rotated by more
+    than one process, the path can include the process id as `{pid}`.
+
+    """
+
+    def __init__(self, path: str, max_bytes: int = 0, max_age: float = 0) -> None:
+        self.path = path.format(pid=os.getpid())
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._file: Any = None
+        self._opened_at = 0.0
+
+    def _open(self) -> None:
+        self._file = open(self.path, "ab", buffering=0)  # noqa: SIM115
+        self._opened_at = time.monotonic()
+
+    def should_rotate(self) -> bool:
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            return True
+        if self.max_age and time.monotonic() - self._opened_at >= self.max_age:
+            return True
+        return False
+
+    def rotate(self) -> None:
+        self._file.close()
+        suffix = time.strftime("%Y%m%d%H%M%S")
+        rotated, count = f"{self.path}.{suffix}", 0
+        while os.path.exists(rotated):
+            count += 1
+            rotated = f"{self.path}.{suffix}.{count}"
+        os.rename(self.path, rotated)
+        self._open()
+
+    def write(self, model: type[models.Model], records: list[dict]) -> None:
+        data = b"".join(to_json(prepare_record(record)) for record in records)
+        with self._lock:
+            if self._file is None:
+                self._open()
+            elif self.should_rotate():
+                self.rotate()
+            self._file.write(data)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
+
+
+class LoggingSink(RequestLogSink):
+    """
+    Log records using Python logging, as JSON.
+
+    The record is also attached to the LogRecord as `request_log`, for use by
+    structured log handlers.
+
+    """
+
+    def __init__(
+        self, logger: str = "request_logger.requests", level: int = logging.INFO
+    ) -> None:
+        self.logger = logging.getLogger(logger)
+        self.level = level
+
+    def write(self, model: type[models.Model], records: list[dict]) -> None:
+        if not self.logger.isEnabledFor(self.level):
+            return
+        for record in records:
+            prepared = prepare_record(record)
+            self.logger.log(
+                self.level,
+                to_json(prepared).decode().rstrip(),
+                extra={"request_log": prepared},
+            )
+
+
+@functools.cache
+def get_request_log_sink() -> RequestLogSink:
+    """Return the sink configured by REQUEST_LOGGER_SINK."""
+    backend = import_string(SINK["BACKEND"])
+    return backend(**SINK.get("OPTIONS", {}))
+
+
+database_sink = DatabaseSink()
+
+
+def get_sink(model: type[models.Model]) -> RequestLogSink:
+    """
+    Return the sink used to write records of the given model.
+
+    Request logs are written to the configured sink, anything else (e.g.
+    latency sketches written by the buffer) to the database.
+
+    """
+    if issubclass(model, RequestLogBase):
+        return get_request_log_sink()
+    return database_sink
+
+
+@functools.cache
+def get_spool() -> RequestLogSpool | None:
+    """Return the spool configured by REQUEST_LOGGER_SPOOL_PATH, if any."""
+    return RequestLogSpool(SPOOL_PATH) if SPOOL_PATH else None
+
+
+breaker = CircuitBreaker(cooldown=SPOOL_COOLDOWN)
+
+
+def write_records(model: type[models.Model], records: list[dict]) -> None:
+    """
+    Write records to the sink, or to the spool if the sink is unavailable.
+
+    If the spool is enabled, request logs are spooled if the write fails,
+    and while the circuit breaker is open - which it is for
+    REQUEST_LOGGER_SPOOL_COOLDOWN seconds after a write fails, or takes
+    longer than REQUEST_LOGGER_SPOOL_LATENCY_BUDGET seconds. Any deferred
+    contexts (see context.py) are extracted first.
+
+    """
+    resolve_context(records)
+    sink = get_sink(model)
+    spool = get_spool()
+    if spool is None or not issubclass(model, RequestLogBase):
+        sink.write(model, records)
+        return
+    if breaker.is_open:
+        spool.add(model, records)
+        return
+    start = time.perf_counter()
+    try:
+        sink.write(model, records)
+    except Exception:  # noqa: B902
+        logger.exception(
+            "Error storing %i RequestLog records - spooling.", len(records)
+        )
+        breaker.trip()
+        spool.add(model, records)
+        return
+    if SPOOL_LATENCY_BUDGET and time.perf_counter() - start > SPOOL_LATENCY_BUDGET:
+        logger.warning("RequestLog write exceeded latency budget - spooling.")
+        breaker.trip()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import atexit
+import functools
+import logging
+import threading
+import time
+
+from django.db import connections
+from django.http import HttpRequest
+from django.utils import timezone
+
+from request_logger.buffer import buffer
+from request_logger.histogram import LatencyHistogram
+from request_logger.models import LatencySketch
+from request_logger.sampling import get_view_func
+from request_logger.settings import (
+    BUFFER_ENABLED,
+    LATENCY_SKETCH_ACCURACY,
+    LATENCY_SKETCH_FLUSH_INTERVAL,
+    LATENCY_SKETCHES_ENABLED,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class LatencySketchRecorder:
+    """
+    Record request durations in per-view latency histograms.
+
+    Histograms are held in memory, and stored as LatencySketch records every
+    `flush_interval` seconds (and when the process exits). If the write-behind
+    buffer is enabled the sketches are written by the buffer, otherwise they
+    are written from a short-lived background thread - `record` is called
+    from the request path, including from the event loop in async views,
+    where it must not block on (or make) a synchronous database write.
+
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = LATENCY_SKETCH_FLUSH_INTERVAL,
+        relative_accuracy: float = LATENCY_SKETCH_ACCURACY,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.relative_accuracy = relative_accuracy
+        self._histograms: dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+        self._window_start = timezone.now()
+        self._last_flush = time.monotonic()
+        self._atexit_registered = False
+        self._flush_thread: threading.Thread | None = None
+
+    def record(self, view_func: str, duration: float) -> None:
+        with self._lock:
+            if not (histogram := self._histograms.get(view_func)):
+                histogram = LatencyHistogram(self.relative_accuracy)
+                self._histograms[view_func] = histogram
+            histogram.add(duration)
+            is_due = time.monotonic() - self._last_flush >= self.flush_interval
+            if not self._atexit_registered:
+                # the buffer may already have been stopped at exit
+                atexit.register(functools.partial(self.flush, buffered=False))
+                self._atexit_registered = True
+        if is_due:
+            self.flush_in_background()
+
+    def flush_in_background(self) -> None:
+        """Flush the histograms without blocking the caller."""
+        if BUFFER_ENABLED:
+            self.flush(buffered=True)
+            return
+        self._flush_thread = threading.Thread(
+            target=self._flush_unbuffered, name="request-logger-sketches", daemon=True
+        )
+        self._flush_thread.start()
+
+    def _flush_unbuffered(self) -> None:
+        try:
+            self.flush(buffered=False)
+        finally:
+            # the thread's connections are not closed by request_finished
+            connections.close_all()
+
+    def flush(self, buffered: bool = BUFFER_ENABLED) -> int:
+        """Store the current histograms, and start a new time window."""
+        now = timezone.now()
+        with self._lock:
+            histograms, self._histograms = self._histograms, {}
+            window_start, self._window_start = self._window_start, now
+            self._last_flush = time.monotonic()
+        records = [
+            {
+                "view_func": view_func,
+                "window_start": window_start,
+                "window_end": now,
+                "count": histogram.count,
+                "histogram": histogram.to_dict(),
+            }
+            for view_func, histogram in histograms.items()
+        ]
+        if buffered:
+            for record in records:
+                buffer.add(LatencySketch, record)
+            return len(records)
+        try:
+            LatencySketch.objects.bulk_create(LatencySketch(**r) for r in records)
+        except Exception:  # noqa: B902
+            logger.exception("Error storing %i LatencySketch records.", len(records))
+        return len(records)
+
+
+# Process-wide recorder used by the log_request decorator and middleware.
+recorder = LatencySketchRecorder()
+
+
+def record_latency(request: HttpRequest, duration: float) -> None:
+    """Record the request duration, if REQUEST_LOGGER_LATENCY_SKETCHES is True."""
+    if LATENCY_SKETCHES_ENABLED:
+        recorder.record(get_view_func(request), duration)
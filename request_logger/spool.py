@@ -0,0 +1,111 @@
+"""
+Durable local spool for request logs that cannot be written to the sink.
+
+The spool is a local SQLite database (in WAL mode, so it can be shared by
+all processes on a host). Records are spooled if writing them fails, or
+while the circuit breaker is open - it is opened for a cooldown period
+whenever a write fails or takes longer than the latency budget. Spooled
+records are loaded into the database by the `drain_request_log_spool`
+command.
+
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any
+
+from django.db import models
+
+from request_logger.serializers import from_json, prepare_record, to_json
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS spool_meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS spool (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+"""
+
+
+class CircuitBreaker:
+    """Open for `cooldown` seconds after each failure."""
+
+    def __init__(self, cooldown: float) -> None:
+        self.cooldown = cooldown
+        self.open_until = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    def trip(self) -> None:
+        self.open_until = time.monotonic() + self.cooldown
+
+    def reset(self) -> None:
+        self.open_until = 0.0
+
+
+class RequestLogSpool:
+    """
+    Append-only spool of request log records, stored in a SQLite file.
+
+    Ids use AUTOINCREMENT, so they are never reused, even once records have
+    been drained and deleted. Each spool file has a unique id, used to name
+    the checkpoint that records the last drained record.
+
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # sqlite connections cannot be shared between threads
+        if (connection := getattr(self._local, "connection", None)) is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            connection.execute(
+                "INSERT OR IGNORE INTO spool_meta VALUES ('id', ?)", [uuid.uuid4().hex]
+            )
+            self._local.connection = connection
+        return connection
+
+    @property
+    def spool_id(self) -> str:
+        return self.connection.execute(
+            "SELECT value FROM spool_meta WHERE key = 'id'"
+        ).fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def add(self, model: type[models.Model], records: list[dict]) -> None:
+        label = model._meta.label
+        self.connection.executemany(
+            "INSERT INTO spool (model, record) VALUES (?, ?)",
+            [(label, to_json(prepare_record(record))) for record in records],
+        )
+
+    def read(self, after: int, limit: int) -> list[tuple[int, str, dict[str, Any]]]:
+        """Return up to `limit` records (id, model, record) after the given id."""
+        rows = self.connection.execute(
+            "SELECT id, model, record FROM spool WHERE id > ? ORDER BY id LIMIT ?",
+            [after, limit],
+        )
+        return [(pk, label, from_json(record)) for pk, label, record in rows]
+
+    def delete(self, up_to: int) -> None:
+        """Delete all records up to (and including) the given id."""
+        self.connection.execute("DELETE FROM spool WHERE id <= ?", [up_to])
+
+    def close(self) -> None:
+        if connection := getattr(self._local, "connection", None):
+            connection.close()
+            self._local.connection = None
@@ -0,0 +1,121 @@
+"""
+Wrappers used to measure streaming responses as they are sent.
+
+The view returns a StreamingHttpResponse before any content has been
+generated, so the response size and the time taken to send it are only
+known once the stream has been consumed. The wrappers count the bytes
+passing through the response's `streaming_content`, and call `on_close`
+when the response is closed - which the server does once the stream has
+completed, or has been aborted (e.g. the client disconnected).
+
+"""
+
+from __future__ import annotations
+
+import time
+from typing import AsyncIterator, Callable, Iterator
+
+from django.http import HttpRequest, StreamingHttpResponse
+
+# response attribute holding the wrapped stream
+STREAM_ATTR = "_request_logger_stream"
+
+
+class StreamCounter:
+    """Count the bytes in a streaming response."""
+
+    def __init__(self, on_close: Callable[[StreamCounter], None]) -> None:
+        self.on_close = on_close
+        self.content_length = 0
+        self.start_ns = time.perf_counter_ns()
+        self.end_ns: int | None = None
+        self.closed = False
+
+    @property
+    def complete(self) -> bool:
+        """Return True if the stream was consumed in full."""
+        return self.end_ns is not None
+
+    @property
+    def duration(self) -> float:
+        """Return the time taken to send the stream (to the last byte)."""
+        end_ns = self.end_ns or time.perf_counter_ns()
+        return (end_ns - self.start_ns) / 1e9
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self.on_close(self)
+
+
+class SyncStreamCounter(StreamCounter):
+    def __init__(
+        self, content: Iterator[bytes], on_close: Callable[[StreamCounter], None]
+    ) -> None:
+        super().__init__(on_close)
+        self.content = content
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self
+
+    def __next__(self) -> bytes:
+        try:
+            chunk = next(self.content)
+        except StopIteration:
+            self.end_ns = time.perf_counter_ns()
+            raise
+        self.content_length += len(chunk)
+        return chunk
+
+
+class AsyncStreamCounter(StreamCounter):
+    def __init__(
+        self, content: AsyncIterator[bytes], on_close: Callable[[StreamCounter], None]
+    ) -> None:
+        super().__init__(on_close)
+        self.content = content
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self
+
+    async def __anext__(self) -> bytes:
+        try:
+            chunk = await self.content.__anext__()
+        except StopAsyncIteration:
+            self.end_ns = time.perf_counter_ns()
+            raise
+        self.content_length += len(chunk)
+        return chunk
+
+
+def is_unstreamed(request: HttpRequest, response: StreamingHttpResponse) -> bool:
+    """
+    Return True if the response content can be measured as it is streamed.
+
+    File responses served by the WSGI server's `wsgi.file_wrapper` (e.g.
+    using sendfile) are not wrapped, as that would disable the optimisation.
+
+    """
+    if not response.streaming or hasattr(response, STREAM_ATTR):
+        return False
+    if getattr(response, "file_to_stream", None) is not None:
+        return "wsgi.file_wrapper" not in request.META
+    return True
+
+
+def wrap_streaming_content(
+    response: StreamingHttpResponse, on_close: Callable[[StreamCounter], None]
+) -> StreamCounter:
+    """Replace the response content with a counting wrapper."""
+    content = response.streaming_content
+    counter: StreamCounter
+    # StreamingHttpResponse.is_async was added in Django 4.2
+    if getattr(response, "is_async", False):
+        counter = AsyncStreamCounter(content, on_close)
+    else:
+        counter = SyncStreamCounter(content, on_close)
+    # the counter is closed along with the response
+    response.streaming_content = counter
+    setattr(response, STREAM_ATTR, counter)
+    return counter
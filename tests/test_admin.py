@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import datetime
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from request_logger import admin, paginator
+from request_logger.models import (
+    CompactRequestLog,
+    NormalisedRequestLog,
+    RequestLog,
+    RequestLogBase,
+    RequestLogValue,
+)
+
+User = get_user_model()
+
+
+@pytest.fixture
+def logs() -> list[RequestLog]:
+    now = timezone.now()
+    return [
+        RequestLog.objects.create(
+            request_uri=f"http://testserver/{i}",
+            timestamp=now - datetime.timedelta(minutes=i),
+        )
+        for i in range(5)
+    ]
+
+
+@pytest.mark.django_db
+class TestRequestLogAdmin:
+    url = reverse("admin:request_logger_requestlog_changelist")
+
+    def test_changelist(self, admin_client: Client, logs: list[RequestLog]) -> None:
+        response = admin_client.get(self.url)
+        assert response.status_code == 200
+        assert list(response.context["cl"].result_list) == logs
+
+    def test_changelist__before(
+        self, admin_client: Client, logs: list[RequestLog]
+    ) -> None:
+        response = admin_client.get(self.url, {"before": logs[1].pk})
+        assert response.status_code == 200
+        assert list(response.context["cl"].result_list) == logs[2:]
+
+    def test_changelist__before_invalid(
+        self, admin_client: Client, logs: list[RequestLog]
+    ) -> None:
+        response = admin_client.get(self.url, {"before": "foo"})
+        assert response.status_code == 200
+        assert list(response.context["cl"].result_list) == []
+
+    def test_changelist__older_url(
+        self, admin_client: Client, logs: list[RequestLog]
+    ) -> None:
+        with mock.patch.object(admin.RequestLogAdmin, "list_per_page", 2):
+            response = admin_client.get(self.url)
+        assert response.context["cl"].older_url == f"?before={logs[1].pk}"
+        assert b"Load older logs" in response.content
+
+    def test_changelist__not_sortable(
+        self, admin_client: Client, logs: list[RequestLog]
+    ) -> None:
+        # columns cannot be sorted, as the logs are paged by (timestamp, id)
+        response = admin_client.get(self.url, {"o": "1"})
+        assert response.status_code == 200
+        assert list(response.context["cl"].result_list) == logs
+        assert response.context["cl"].date_hierarchy is None
+        assert b"sortable" not in response.content
+
+
+@pytest.mark.django_db
+class TestEstimatedCountPaginator:
+    def test_count(self, logs: list[RequestLog]) -> None:
+        """Test that the exact count is used on non-PostgreSQL databases."""
+        p = paginator.EstimatedCountPaginator(RequestLog.objects.order_by("id"), 2)
+        assert p.count == 5
+
+    @pytest.mark.parametrize(
+        "table_count,filtered,expected",
+        [(None, False, None), (10, False, None), (1000, False, 1000), (1000, True, 50)],
+    )
+    def test_estimate_count(
+        self, table_count: int | None, filtered: bool, expected: int | None
+    ) -> None:
+        queryset = RequestLog.objects.all()
+        if filtered:
+            queryset = queryset.filter(source="foo")
+        with mock.patch.object(
+            paginator, "estimate_table_count", return_value=table_count
+        ), mock.patch.object(paginator, "estimate_query_count", return_value=50):
+            assert paginator.estimate_count(queryset, threshold=100) == expected
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", [NormalisedRequestLog, CompactRequestLog])
+class TestNormalisedRequestLogAdmin:
+    def test_changelist(
+        self, admin_client: Client, model: type[RequestLogBase]
+    ) -> None:
+        model.objects.create(view_func="foo.bar", http_user_agent="spyware 1.0")
+        url = reverse(f"admin:request_logger_{model._meta.model_name}_changelist")
+        response = admin_client.get(url)
+        assert response.status_code == 200
+        assert model._meta.label.encode() in response.content
+
+    def test_changelist__older_url(
+        self, admin_client: Client, model: type[RequestLogBase]
+    ) -> None:
+        for _ in range(3):
+            model.objects.create()
+        url = reverse(f"admin:request_logger_{model._meta.model_name}_changelist")
+        with mock.patch.object(admin.RequestLogAdmin, "list_per_page", 2):
+            response = admin_client.get(url)
+        assert b"Load older logs" in response.content
+
+    def test_change(self, admin_client: Client, model: type[RequestLogBase]) -> None:
+        # the lookup table is not rendered as (unbounded) selects
+        for i in range(10):
+            RequestLogValue.objects.get_ids([f"value-{i}"])
+        log = model.objects.create(view_func="foo.bar", http_user_agent="spyware")
+        url = reverse(
+            f"admin:request_logger_{model._meta.model_name}_change", args=[log.pk]
+        )
+        response = admin_client.get(url)
+        assert response.status_code == 200
+        assert b"spyware" in response.content
+        assert b"value-" not in response.content
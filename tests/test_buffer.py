@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+from django.test import RequestFactory
+
+from request_logger.buffer import RequestLogBuffer
+from request_logger.models import RequestLog
+from request_logger.sinks import DatabaseSink
+
+
+@pytest.mark.django_db
+@mock.patch.object(RequestLogBuffer, "start")
+class TestRequestLogBuffer:
+    def test_add(self, mock_start: mock.Mock, rf: RequestFactory) -> None:
+        buffer = RequestLogBuffer(max_size=10)
+        buffer.add(RequestLog, RequestLog.objects.parse(rf.get("/")))
+        assert len(buffer) == 1
+        assert mock_start.call_count == 1
+        assert not buffer._wakeup.is_set()
+        assert RequestLog.objects.count() == 0
+
+    def test_add__full(self, mock_start: mock.Mock, rf: RequestFactory) -> None:
+        buffer = RequestLogBuffer(max_size=2)
+        buffer.add(RequestLog, RequestLog.objects.parse(rf.get("/")))
+        buffer.add(RequestLog, RequestLog.objects.parse(rf.get("/")))
+        assert buffer._wakeup.is_set()
+
+    def test_add__max_records(self, mock_start: mock.Mock, rf: RequestFactory) -> None:
+        buffer = RequestLogBuffer(max_size=2, max_records=3)
+        for _ in range(5):
+            buffer.add(RequestLog, RequestLog.objects.parse(rf.get("/")))
+        assert len(buffer) == 3
+        assert buffer.dropped == 2
+        assert buffer.flush() == 3
+        buffer.add(RequestLog, RequestLog.objects.parse(rf.get("/")))
+        assert len(buffer) == 1
+        assert buffer.dropped == 2
+
+    def test_flush(self, mock_start: mock.Mock, rf: RequestFactory) -> None:
+        buffer = RequestLogBuffer(max_size=10)
+        for path in ("/foo", "/bar"):
+            buffer.add(RequestLog, RequestLog.objects.parse(rf.get(path)))
+        assert buffer.flush() == 2
+        assert len(buffer) == 0
+        assert sorted(RequestLog.objects.values_list("request_uri", flat=True)) == [
+            "http://testserver/bar",
+            "http://testserver/foo",
+        ]
+        assert buffer.flush() == 0
+
+    def test_flush__error(self, mock_start: mock.Mock, rf: RequestFactory) -> None:
+        """Test that a failed write discards the batch without raising."""
+        buffer = RequestLogBuffer(max_size=10)
+        buffer.add(RequestLog, RequestLog.objects.parse(rf.get("/")))
+        with mock.patch.object(DatabaseSink, "write", side_effect=Exception):
+            assert buffer.flush() == 1
+        assert len(buffer) == 0
+        assert RequestLog.objects.count() == 0
+
+    def test_stop(self, mock_start: mock.Mock, rf: RequestFactory) -> None:
+        buffer = RequestLogBuffer(max_size=10)
+        buffer.add(RequestLog, RequestLog.objects.parse(rf.get("/")))
+        buffer.stop()
+        assert RequestLog.objects.count() == 1
@@ -0,0 +1,328 @@
+from __future__ import annotations
+
+import csv
+import datetime
+import gzip
+import json
+from io import StringIO
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from request_logger.management.commands.import_request_logs import copy_rows
+from request_logger.models import (
+    CompactRequestLog,
+    NormalisedRequestLog,
+    RequestLog,
+)
+from request_logger.serializers import EXPORT_FIELDS, LOG_FIELDS
+
+
+def create_logs(*days_ago: int) -> None:
+    now = timezone.now()
+    for days in days_ago:
+        RequestLog.objects.create(timestamp=now - datetime.timedelta(days=days))
+
+
+@pytest.mark.django_db
+class TestTruncateRequestLogs:
+    def test_truncate(self) -> None:
+        create_logs(0, 5, 10, 20)
+        out = StringIO()
+        call_command("truncate_request_logs", days=7, stdout=out)
+        assert RequestLog.objects.count() == 2
+        assert "Deleted 2 records" in out.getvalue()
+
+    def test_truncate__batched(self) -> None:
+        create_logs(0, 10, 11, 12, 13, 14)
+        out = StringIO()
+        call_command("truncate_request_logs", days=7, batch_size=2, stdout=out)
+        assert RequestLog.objects.count() == 1
+        assert "Deleted 5 records" in out.getvalue()
+
+    def test_truncate__max_runtime(self) -> None:
+        create_logs(10, 11, 12, 13)
+        out = StringIO()
+        call_command(
+            "truncate_request_logs",
+            days=7,
+            batch_size=2,
+            max_runtime=0.000001,
+            stdout=out,
+        )
+        assert RequestLog.objects.count() == 2
+        assert "re-run" in out.getvalue()
+        # resume
+        call_command("truncate_request_logs", days=7, batch_size=2, stdout=out)
+        assert RequestLog.objects.count() == 0
+
+    def test_truncate__no_elapsed_time(self) -> None:
+        # the batch completes within the resolution of the clock
+        create_logs(10)
+        out = StringIO()
+        with mock.patch("time.monotonic", return_value=0.0):
+            call_command("truncate_request_logs", days=7, batch_size=10, stdout=out)
+        assert "Deleted 1 records" in out.getvalue()
+
+
+@pytest.mark.django_db
+class TestCopyRequestLogs:
+    def test_copy(self) -> None:
+        RequestLog.objects.create(
+            http_method="POST",
+            remote_addr="10.0.0.1, 192.168.0.1",
+            http_status_code=201,
+            http_user_agent="Mozilla/5.0",
+            content_length=3_000_000_000,
+        )
+        out = StringIO()
+        call_command(
+            "copy_request_logs", target="request_logger.CompactRequestLog", stdout=out
+        )
+        assert "Copied 1 records" in out.getvalue()
+        log = CompactRequestLog.objects.get()
+        assert log.http_method == "POST"
+        assert log.remote_addr == "10.0.0.1"
+        assert log.http_status_code == 201
+        assert log.http_user_agent == "Mozilla/5.0"
+        assert log.content_length == 3_000_000_000
+        assert log.source == "request_logger.RequestLog"
+
+    def test_copy__resume(self) -> None:
+        create_logs(1, 2, 3, 4)
+        out = StringIO()
+        call_command(
+            "copy_request_logs",
+            target="request_logger.CompactRequestLog",
+            batch_size=2,
+            max_runtime=0.000001,
+            stdout=out,
+        )
+        assert CompactRequestLog.objects.count() == 2
+        assert "re-run" in out.getvalue()
+        call_command(
+            "copy_request_logs",
+            target="request_logger.CompactRequestLog",
+            batch_size=2,
+            stdout=out,
+        )
+        assert CompactRequestLog.objects.count() == 4
+        copied = CompactRequestLog.objects.values_list("timestamp", flat=True)
+        original = RequestLog.objects.values_list("timestamp", flat=True)
+        assert sorted(copied) == sorted(original)
+
+    @pytest.mark.parametrize(
+        "target", ["request_logger.RequestLog", "request_logger.Foo", "auth.User"]
+    )
+    def test_copy__invalid_target(self, target: str) -> None:
+        with pytest.raises(CommandError):
+            call_command("copy_request_logs", target=target, stdout=StringIO())
+
+
+@pytest.mark.django_db
+class TestBackfillRequestLogUrls:
+    def test_backfill(self) -> None:
+        RequestLog.objects.create(request_uri="http://example.com/foo?bar=1")
+        RequestLog.objects.create(request_uri="")
+        out = StringIO()
+        call_command("backfill_request_log_urls", batch_size=1, stdout=out)
+        assert "Updated 1 records" in out.getvalue()
+        log = RequestLog.objects.get(path="/foo")
+        assert log.hostname == "example.com"
+        assert log.query == "bar=1"
+
+
+@pytest.mark.django_db
+class TestExportRequestLogs:
+    def test_export(self, tmp_path: Path) -> None:
+        create_logs(3, 2, 1)
+        output = tmp_path / "logs.jsonl.gz"
+        out = StringIO()
+        call_command("export_request_logs", str(output), batch_size=2, stdout=out)
+        assert "Exported 3 records to 1 file(s)" in out.getvalue()
+        with gzip.open(output) as f:
+            records = [json.loads(line) for line in f]
+        # ordered by timestamp
+        expected = RequestLog.objects.order_by("timestamp")
+        assert [r["id"] for r in records] == [log.id for log in expected]
+        assert records[0]["source"] == "request_logger.RequestLog"
+        assert set(records[0]) == set(EXPORT_FIELDS)
+
+    def test_export__csv(self, tmp_path: Path) -> None:
+        create_logs(1)
+        output = tmp_path / "logs.csv"
+        call_command(
+            "export_request_logs",
+            str(output),
+            format="csv",
+            compression="none",
+            stdout=StringIO(),
+        )
+        with output.open() as f:
+            rows = list(csv.DictReader(f))
+        assert len(rows) == 1
+        assert rows[0]["context"] == "{}"
+
+    def test_export__filters(self, tmp_path: Path) -> None:
+        create_logs(10, 5, 1)
+        RequestLog.objects.create(path="/foo")
+        output = tmp_path / "logs.jsonl"
+        start = (timezone.now() - datetime.timedelta(days=7)).isoformat()
+        call_command(
+            "export_request_logs",
+            str(output),
+            compression="none",
+            start=start,
+            stdout=StringIO(),
+        )
+        assert len(output.read_text().splitlines()) == 3
+        call_command(
+            "export_request_logs",
+            str(output),
+            compression="none",
+            path="/foo",
+            stdout=StringIO(),
+        )
+        assert len(output.read_text().splitlines()) == 1
+
+    def test_export__max_file_size(self, tmp_path: Path) -> None:
+        create_logs(*range(10))
+        out = StringIO()
+        call_command(
+            "export_request_logs",
+            str(tmp_path / "logs.jsonl"),
+            compression="none",
+            batch_size=3,
+            max_file_size=1,
+            stdout=out,
+        )
+        assert "Exported 10 records to 4 file(s)" in out.getvalue()
+        assert (tmp_path / "logs-0004.jsonl").exists()
+
+    def test_export__normalised(self, tmp_path: Path) -> None:
+        NormalisedRequestLog.objects.create(view_func="foo.bar")
+        output = tmp_path / "logs.jsonl"
+        call_command(
+            "export_request_logs",
+            str(output),
+            model="request_logger.NormalisedRequestLog",
+            compression="none",
+            view_func="foo.bar",
+            stdout=StringIO(),
+        )
+        record = json.loads(output.read_text())
+        assert record["view_func"] == "foo.bar"
+        assert record["source"] == "request_logger.NormalisedRequestLog"
+
+    def test_export__same_timestamp(self, tmp_path: Path) -> None:
+        now = timezone.now()
+        for _ in range(5):
+            RequestLog.objects.create(timestamp=now)
+        output = tmp_path / "logs.jsonl"
+        call_command(
+            "export_request_logs",
+            str(output),
+            compression="none",
+            batch_size=2,
+            stdout=StringIO(),
+        )
+        ids = [json.loads(line)["id"] for line in output.read_text().splitlines()]
+        assert ids == sorted(RequestLog.objects.values_list("id", flat=True))
+
+
+@pytest.mark.django_db
+class TestImportRequestLogs:
+    @pytest.fixture
+    def export(self, tmp_path: Path) -> Path:
+        create_logs(3, 2, 1)
+        RequestLog.objects.update(http_method="POST", remote_addr="10.0.0.1, 10.0.0.2")
+        output = tmp_path / "logs.jsonl.gz"
+        call_command("export_request_logs", str(output), stdout=StringIO())
+        return output
+
+    def test_import(self, export: Path) -> None:
+        out = StringIO()
+        call_command("import_request_logs", str(export), batch_size=2, stdout=out)
+        assert "Imported 3 records" in out.getvalue()
+        assert RequestLog.objects.count() == 6
+        logs = list(RequestLog.objects.order_by("id"))
+        assert [log.timestamp for log in logs[3:]] == [
+            log.timestamp for log in logs[:3]
+        ]
+
+    def test_import__compact(self, export: Path) -> None:
+        call_command(
+            "import_request_logs",
+            str(export),
+            model="request_logger.CompactRequestLog",
+            stdout=StringIO(),
+        )
+        log = CompactRequestLog.objects.first()
+        assert log is not None
+        assert log.http_method == "POST"
+        assert log.remote_addr == "10.0.0.1"
+        assert log.source == "request_logger.RequestLog"
+
+    def test_import__no_elapsed_time(self, export: Path) -> None:
+        out = StringIO()
+        with mock.patch("time.monotonic", return_value=0.0):
+            call_command("import_request_logs", str(export), stdout=out)
+        assert "Imported 3 records" in out.getvalue()
+
+    def test_import__workers(self, export: Path) -> None:
+        call_command("import_request_logs", str(export), workers=2, stdout=StringIO())
+        assert RequestLog.objects.count() == 6
+
+    def test_import__copy(self, export: Path) -> None:
+        # sqlite
+        with pytest.raises(CommandError):
+            call_command("import_request_logs", str(export), copy=True)
+
+
+def test_copy_rows() -> None:
+    records = [
+        {
+            "request_uri": "http://testserver/",
+            "http_user_agent": "tab\\there\nnewline",
+            "http_status_code": None,
+            "context": {"foo": "bar"},
+            "timestamp": "2024-01-01T00:00:00+00:00",
+        }
+    ]
+    row = copy_rows(RequestLog, records).rstrip("\n").split("\t")
+    values = dict(zip(LOG_FIELDS, row))
+    assert values["http_user_agent"] == "tab\\\\there\\nnewline"
+    assert values["http_status_code"] == "\\N"
+    assert values["context"] == '{"foo": "bar"}'
+    assert values["timestamp"] == "2024-01-01 00:00:00+00:00"
+
+
+@pytest.mark.django_db
+class TestAnonymiseRequestLogs:
+    def test_anonymise__older_than(self) -> None:
+        create_logs(0, 10, 20)
+        RequestLog.objects.update(http_user_agent="Mozilla/5.0")
+        out = StringIO()
+        call_command("anonymise_request_logs", older_than=7, batch_size=1, stdout=out)
+        assert "Anonymised 2 records" in out.getvalue()
+        assert RequestLog.objects.filter(http_user_agent="****").count() == 2
+        # already anonymised logs are skipped
+        call_command("anonymise_request_logs", older_than=7, stdout=out)
+        assert "Anonymised 0 records" in out.getvalue()
+
+    def test_anonymise__user(self, admin_user: Any) -> None:
+        create_logs(0, 1)
+        RequestLog.objects.create(user=admin_user, session_key="foo")
+        out = StringIO()
+        call_command("anonymise_request_logs", user=admin_user.pk, stdout=out)
+        assert "Anonymised 1 records" in out.getvalue()
+        log = RequestLog.objects.get(session_key="****")
+        assert log.user is None
+
+    def test_anonymise__no_filter(self) -> None:
+        with pytest.raises(CommandError):
+            call_command("anonymise_request_logs")
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import threading
+from typing import Iterator
+from unittest import mock
+
+import pytest
+from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory
+
+from request_logger import context, decorators
+from request_logger.buffer import RequestLogBuffer
+from request_logger.context import (
+    FAILED,
+    TIMED_OUT,
+    DeferredContext,
+    extract_context,
+    extractor_stats,
+    resolve_context,
+)
+from request_logger.models import RequestLog
+
+
+def extractor(request: HttpRequest) -> dict:
+    return {"path": request.path}
+
+
+def failing_extractor(request: HttpRequest) -> dict:
+    raise ValueError("Oops")
+
+
+def view_func(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("OK")
+
+
+@pytest.fixture(autouse=True)
+def stats() -> Iterator[None]:
+    extractor_stats.reset()
+    yield
+    extractor_stats.reset()
+
+
+class TestExtractContext:
+    def test_extract(self, rf: RequestFactory) -> None:
+        assert extract_context(extractor, rf.get("/foo")) == {"path": "/foo"}
+        stats = extractor_stats.as_dict()
+        assert stats["calls"] == 1
+        assert stats["duration"] > 0
+        assert stats["max_duration"] == stats["duration"]
+
+    def test_extract__timeout(self, rf: RequestFactory) -> None:
+        assert extract_context(extractor, rf.get("/foo"), timeout=1) == {"path": "/foo"}
+
+    def test_extract__timed_out(self, rf: RequestFactory) -> None:
+        event = threading.Event()
+
+        def slow_extractor(request: HttpRequest) -> dict:
+            event.wait(1)
+            return {}
+
+        assert extract_context(slow_extractor, rf.get("/"), timeout=0.01) == TIMED_OUT
+        event.set()
+        assert extractor_stats.as_dict()["timeouts"] == 1
+
+    def test_extract__saturated(self, rf: RequestFactory) -> None:
+        event = threading.Event()
+        workers = threading.BoundedSemaphore(1)
+
+        def slow_extractor(request: HttpRequest) -> dict:
+            event.wait(1)
+            return {}
+
+        fast_extractor = mock.Mock(return_value={})
+        with mock.patch.object(context, "_workers", workers):
+            assert extract_context(slow_extractor, rf.get("/"), 0.01) == TIMED_OUT
+            # the worker is busy, so the extractor is not called
+            assert extract_context(fast_extractor, rf.get("/"), 1) == TIMED_OUT
+            fast_extractor.assert_not_called()
+            assert extractor_stats.as_dict()["timeouts"] == 2
+            event.set()
+            # the worker is released once the slow extractor completes
+            assert workers.acquire(timeout=1)
+            workers.release()
+            assert extract_context(fast_extractor, rf.get("/"), 1) == {}
+
+    def test_extract__default_timeout(self, rf: RequestFactory) -> None:
+        with mock.patch.object(context, "CONTEXT_TIMEOUT", 1), mock.patch.object(
+            context, "get_executor", wraps=context.get_executor
+        ) as get_executor:
+            assert extract_context(extractor, rf.get("/foo")) == {"path": "/foo"}
+        get_executor.assert_called_once()
+
+    @pytest.mark.parametrize("timeout", [0, 1])
+    def test_extract__error(self, rf: RequestFactory, timeout: float) -> None:
+        assert extract_context(failing_extractor, rf.get("/"), timeout) == FAILED
+        assert extractor_stats.as_dict()["errors"] == 1
+
+
+class TestDeferredContext:
+    def test_resolve_context(self, rf: RequestFactory) -> None:
+        records = [
+            {"context": DeferredContext(extractor, rf.get("/foo"))},
+            {"context": {"foo": "bar"}},
+            {},
+        ]
+        resolve_context(records)
+        assert records == [
+            {"context": {"path": "/foo"}},
+            {"context": {"foo": "bar"}},
+            {},
+        ]
+
+
+@pytest.mark.django_db
+class TestLogRequest:
+    @pytest.fixture
+    def deferred(self) -> Iterator[None]:
+        with (
+            mock.patch.object(decorators, "CONTEXT_DEFERRED", True),
+            mock.patch.object(decorators, "REQUEST_CONTEXT_EXTRACTOR", extractor),
+        ):
+            yield
+
+    def test_deferred(self, rf: RequestFactory, deferred: None) -> None:
+        response = decorators.log_request()(view_func)(rf.get("/foo"))
+        assert extractor_stats.as_dict()["calls"] == 0
+        assert not RequestLog.objects.exists()
+        # the log is written once the response is closed
+        response.close()
+        assert RequestLog.objects.get().context == {"path": "/foo"}
+        assert extractor_stats.as_dict()["calls"] == 1
+
+    def test_deferred__buffered(self, rf: RequestFactory, deferred: None) -> None:
+        buffer = RequestLogBuffer(max_size=10, flush_interval=60)
+        with (
+            mock.patch.object(decorators, "BUFFER_ENABLED", True),
+            mock.patch.object(decorators, "buffer", buffer),
+            mock.patch.object(buffer, "start"),
+        ):
+            decorators.log_request()(view_func)(rf.get("/foo"))
+        assert extractor_stats.as_dict()["calls"] == 0
+        assert buffer.flush() == 1
+        assert RequestLog.objects.get().context == {"path": "/foo"}
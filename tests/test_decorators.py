@@ -1,11 +1,16 @@
 from __future__ import annotations
 
+import asyncio
 from unittest import mock
 
 import pytest
+from asgiref.sync import async_to_sync
 from django.contrib.auth import get_user_model
 from django.http import HttpRequest, HttpResponse
+from django.template import engines
+from django.template.response import TemplateResponse
 from django.test import RequestFactory
+from django.utils import timezone
 
 from request_logger import decorators
 from request_logger.models import RequestLog, RequestLogManager
@@ -17,6 +22,18 @@ def view_func(request: HttpRequest) -> HttpResponse:
     return HttpResponse("OK")
 
 
+async def async_view_func(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("OK")
+
+
+def template_view_func(request: HttpRequest) -> TemplateResponse:
+    return TemplateResponse(request, engines["django"].from_string("Hello"))
+
+
+async def async_template_view_func(request: HttpRequest) -> TemplateResponse:
+    return template_view_func(request)
+
+
 @pytest.mark.django_db
 class TestLogRequest:
     def test_log_request_reference(self, rf: RequestFactory) -> None:
@@ -54,3 +71,105 @@ class TestLogRequest:
         resp = func(request)
         assert resp.status_code == 200
         assert RequestLog.objects.count() == expected
+
+    def test_log_request_buffered(self, rf: RequestFactory) -> None:
+        request = rf.get("/")
+        func = decorators.log_request()(view_func)
+        before = timezone.now()
+        with mock.patch.object(decorators, "BUFFER_ENABLED", True):
+            with mock.patch.object(decorators.buffer, "add") as mock_add:
+                func(request)
+        assert RequestLog.objects.count() == 0
+        model, record = mock_add.call_args[0]
+        assert model == RequestLog
+        assert record["source"] == "request_logger.RequestLog"
+        assert record["http_status_code"] == 200
+        assert record["duration"] > 0.0
+        # the timestamp is set when the record is parsed, not when it is written
+        assert before <= record["timestamp"] <= timezone.now()
+
+    def test_log_request_async(self, rf: RequestFactory) -> None:
+        request = rf.get("/")
+        func = decorators.log_request()(async_view_func)
+        assert asyncio.iscoroutinefunction(func)
+        resp = async_to_sync(func)(request)
+        assert resp.status_code == 200
+        rl: RequestLog = RequestLog.objects.get()
+        assert rl.source == "request_logger.RequestLog"
+        assert rl.http_status_code == 200
+        assert rl.duration > 0.0
+
+    def test_log_request_async__error(self, rf: RequestFactory) -> None:
+        request = rf.get("/")
+        func = decorators.log_request()(async_view_func)
+        with mock.patch.object(RequestLogManager, "create", side_effect=Exception):
+            resp = async_to_sync(func)(request)
+        assert resp.status_code == 200
+        assert RequestLog.objects.count() == 0
+
+    def test_log_request_async__exclude(self, rf: RequestFactory) -> None:
+        request = rf.get("/")
+        func = decorators.log_request(exclude=lambda r: True)(async_view_func)
+        async_to_sync(func)(request)
+        assert RequestLog.objects.count() == 0
+
+    def test_log_request_async__orm_filter(self, rf: RequestFactory) -> None:
+        # filters are run in a thread, so may use the ORM
+        func = decorators.log_request(
+            exclude=lambda r: User.objects.filter(username="fred").exists()
+        )(async_view_func)
+        async_to_sync(func)(rf.get("/"))
+        assert RequestLog.objects.count() == 1
+
+    def test_log_request_async__default_filters(self, rf: RequestFactory) -> None:
+        func = decorators.log_request()(async_view_func)
+        with mock.patch.object(
+            decorators, "sync_to_async", wraps=decorators.sync_to_async
+        ) as mock_sync_to_async:
+            async_to_sync(func)(rf.get("/"))
+        # the built-in filters are not run in a thread (only the log is stored)
+        mock_sync_to_async.assert_called_once_with(decorators.store_request_log)
+        assert RequestLog.objects.count() == 1
+
+    def test_log_request_async__buffered(self, rf: RequestFactory) -> None:
+        request = rf.get("/")
+        func = decorators.log_request()(async_view_func)
+        with mock.patch.object(decorators, "BUFFER_ENABLED", True):
+            with mock.patch.object(decorators.buffer, "add") as mock_add:
+                async_to_sync(func)(request)
+        assert RequestLog.objects.count() == 0
+        assert mock_add.call_args[0][1]["http_status_code"] == 200
+
+    def test_log_request_timing(self, rf: RequestFactory) -> None:
+        func = decorators.log_request()(view_func)
+        func(rf.get("/"))
+        rl: RequestLog = RequestLog.objects.get()
+        assert rl.duration > 0.0
+        assert rl.log_duration > 0.0
+        assert rl.render_duration is None
+
+    def test_log_request_template_response(self, rf: RequestFactory) -> None:
+        """Test that template responses are logged once they are rendered."""
+        func = decorators.log_request()(template_view_func)
+        response = func(rf.get("/"))
+        assert RequestLog.objects.count() == 0
+        response.render()
+        rl: RequestLog = RequestLog.objects.get()
+        assert rl.content_length == 5
+        assert rl.render_duration > 0.0
+        assert rl.duration > 0.0
+
+    def test_log_request_template_response__async(self, rf: RequestFactory) -> None:
+        func = decorators.log_request()(async_template_view_func)
+        response = async_to_sync(func)(rf.get("/"))
+        assert RequestLog.objects.count() == 0
+        response.render()
+        assert RequestLog.objects.get().render_duration > 0.0
+
+
+class TestTimer:
+    def test_duration(self) -> None:
+        with decorators.Timer() as t:
+            pass
+        assert t.duration_ns > 0
+        assert t.duration == t.duration_ns / 1e9
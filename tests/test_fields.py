@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import pytest
+
+from request_logger.fields import (
+    decode_http_method,
+    encode_http_method,
+    parse_ip_address,
+)
+from request_logger.models import CompactRequestLog
+
+
+@pytest.mark.parametrize(
+    "method,code", [("GET", 1), ("get", 1), ("CONNECT", 9), ("PROPFIND", 0)]
+)
+def test_encode_http_method(method: str, code: int) -> None:
+    assert encode_http_method(method) == code
+
+
+@pytest.mark.parametrize("code,method", [(1, "GET"), (9, "CONNECT"), (0, "OTHER")])
+def test_decode_http_method(code: int, method: str) -> None:
+    assert decode_http_method(code) == method
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("127.0.0.1", "127.0.0.1"),
+        ("10.0.0.1, 192.168.0.1", "10.0.0.1"),
+        ("2001:db8::1", "2001:db8::1"),
+        ("unknown", None),
+        ("", None),
+        (None, None),
+    ],
+)
+def test_parse_ip_address(value: str | None, expected: str | None) -> None:
+    assert parse_ip_address(value) == expected
+
+
+@pytest.mark.django_db
+class TestCompactRequestLog:
+    def test_create(self) -> None:
+        CompactRequestLog.objects.create(
+            http_method="DELETE", remote_addr="not an ip", http_status_code=404
+        )
+        log = CompactRequestLog.objects.get(http_method="DELETE")
+        assert log.http_method == "DELETE"
+        assert log.remote_addr is None
+        assert str(log) == "[404] DELETE"
+        assert not CompactRequestLog.objects.filter(http_method="GET").exists()
+
+    def test_create__no_method(self) -> None:
+        # a missing method is stored as NULL, not as "OTHER" (0)
+        log = CompactRequestLog.objects.create()
+        assert log.http_method == ""
+        assert CompactRequestLog.objects.get().http_method == ""
+        assert CompactRequestLog.objects.filter(http_method__isnull=True).exists()
+        assert not CompactRequestLog.objects.filter(http_method="OTHER").exists()
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory
+
+from request_logger import middleware
+from request_logger.decorators import log_request
+from request_logger.models import RequestLog
+
+
+def get_response(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("OK")
+
+
+async def aget_response(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("OK")
+
+
+@pytest.mark.django_db
+class TestRequestLogMiddleware:
+    def test_sync(self, rf: RequestFactory) -> None:
+        mw = middleware.RequestLogMiddleware(get_response)
+        assert not iscoroutinefunction(mw)
+        response = mw(rf.get("/"))
+        assert response.status_code == 200
+        rl = RequestLog.objects.get()
+        assert rl.http_status_code == 200
+        assert rl.duration > 0.0
+
+    def test_async(self, rf: RequestFactory) -> None:
+        mw = middleware.RequestLogMiddleware(aget_response)
+        assert iscoroutinefunction(mw)
+        response = async_to_sync(mw)(rf.get("/"))
+        assert response.status_code == 200
+        assert RequestLog.objects.get().http_status_code == 200
+
+    @pytest.mark.parametrize(
+        "rules,path,expected",
+        [
+            ({"paths": ["/api/"]}, "/api/foo", 1),
+            ({"paths": ["/api/"]}, "/foo", 0),
+            ({"status_codes": [(400, 599)]}, "/foo", 0),
+        ],
+    )
+    def test_rules(
+        self, rf: RequestFactory, rules: dict, path: str, expected: int
+    ) -> None:
+        with mock.patch.object(middleware, "MIDDLEWARE_RULES", rules):
+            mw = middleware.RequestLogMiddleware(get_response)
+        mw(rf.get(path))
+        assert RequestLog.objects.count() == expected
+
+    def test_decorated_view(self, rf: RequestFactory) -> None:
+        """Test that requests logged by the decorator are not logged twice."""
+        mw = middleware.RequestLogMiddleware(log_request()(get_response))
+        mw(rf.get("/"))
+        assert RequestLog.objects.count() == 1
+
+    def test_error(self, rf: RequestFactory) -> None:
+        mw = middleware.RequestLogMiddleware(get_response)
+        with mock.patch.object(middleware, "store_request_log", side_effect=Exception):
+            response = mw(rf.get("/"))
+        assert response.status_code == 200
+        assert RequestLog.objects.count() == 0
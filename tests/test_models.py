@@ -1,17 +1,36 @@
 from __future__ import annotations
 
 from types import SimpleNamespace
+from typing import Any
 from unittest import mock
 
 import pytest
-from django.contrib.auth import get_user_model
+from asgiref.sync import async_to_sync
+from django.contrib.auth import SESSION_KEY, get_user_model
 from django.contrib.auth.models import AnonymousUser
 from django.contrib.sessions.backends.base import SessionBase
+from django.contrib.sessions.backends.db import SessionStore
+from django.db import transaction
 from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.template import engines
+from django.template.response import TemplateResponse
 from django.test import RequestFactory
 from django.urls import ResolverMatch
-
-from request_logger.models import RequestLog, parse_request, parse_response
+from django.utils.functional import SimpleLazyObject
+
+from request_logger import models
+from request_logger.models import (
+    CompactRequestLog,
+    NormalisedRequestLog,
+    RequestLog,
+    RequestLogBase,
+    get_content_length,
+    get_user_id,
+    parse_request,
+    parse_response,
+    parse_url,
+)
+from request_logger.sinks import DatabaseSink
 
 User = get_user_model()
 
@@ -27,6 +46,9 @@ class TestParseRequest:
             "request_accepts": "",
             "request_content_type": "",
             "request_uri": "http://testserver/",
+            "hostname": "testserver",
+            "path": "/",
+            "query": "",
             "context": {},
             "session_key": "",
         }
@@ -92,6 +114,99 @@ class TestParseRequest:
             assert parse_request(request).get("context") == {"foo": "bar"}
 
 
+@pytest.mark.django_db
+class TestGetUserId:
+    @pytest.fixture
+    def user(self) -> User:
+        return User.objects.create(username="foo")
+
+    @pytest.fixture
+    def session(self, user: User) -> SessionStore:
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session.save()
+        # a fresh (unloaded) session, as loaded by SessionMiddleware
+        return SessionStore(session.session_key)
+
+    def lazy_user(self, user: User) -> SimpleLazyObject:
+        return SimpleLazyObject(lambda: User.objects.get(pk=user.pk))
+
+    def test_user_loaded(
+        self, rf: RequestFactory, user: User, django_assert_num_queries: Any
+    ) -> None:
+        request = rf.get("/")
+        request.user = self.lazy_user(user)
+        assert request.user.is_authenticated
+        with django_assert_num_queries(0):
+            assert get_user_id(request) == user.pk
+
+    def test_user_not_loaded(
+        self,
+        rf: RequestFactory,
+        user: User,
+        session: SessionStore,
+        django_assert_num_queries: Any,
+    ) -> None:
+        request = rf.get("/")
+        request.session = session
+        request.user = self.lazy_user(user)
+        with django_assert_num_queries(0):
+            assert get_user_id(request) is None
+
+    def test_session_loaded(
+        self,
+        rf: RequestFactory,
+        user: User,
+        session: SessionStore,
+        django_assert_num_queries: Any,
+    ) -> None:
+        request = rf.get("/")
+        request.session = session
+        request.user = self.lazy_user(user)
+        assert SESSION_KEY in session
+        with django_assert_num_queries(0):
+            assert get_user_id(request) == user.pk
+
+    @pytest.mark.django_db(transaction=True)
+    def test_session_deleted_user(
+        self, rf: RequestFactory, user: User, session: SessionStore
+    ) -> None:
+        # the session is not verified, so the id of a deleted user is returned
+        request = rf.get("/")
+        request.session = session
+        assert SESSION_KEY in session
+        user_id = user.pk
+        user.delete()
+        assert get_user_id(request) == user_id
+        # ...but the log (or a batch of logs) is still stored, without the user
+        with mock.patch.object(models, "LAZY_USER", True):
+            record = RequestLog.objects.parse(request)
+        assert record["user_id"] == user_id
+        for batch in ([record], [record, record]):
+            DatabaseSink().write(RequestLog, [dict(r) for r in batch])
+        # ...including inside an outer transaction, as the FK is checked on commit
+        with transaction.atomic():
+            DatabaseSink().write(RequestLog, [dict(record)])
+        assert RequestLog.objects.count() == 4
+        assert not RequestLog.objects.filter(user_id__isnull=False).exists()
+
+    def test_anonymous(self, rf: RequestFactory) -> None:
+        request = rf.get("/")
+        request.user = AnonymousUser()
+        assert get_user_id(request) is None
+        del request.user
+        assert get_user_id(request) is None
+
+    def test_parse_request(self, rf: RequestFactory, user: User) -> None:
+        request = rf.get("/")
+        request.user = self.lazy_user(user)
+        with mock.patch.object(models, "LAZY_USER", True):
+            assert parse_request(request)["user_id"] is None
+            assert request.user.is_authenticated
+            assert parse_request(request)["user_id"] == user.pk
+            assert "user" not in parse_request(request)
+
+
 class TestParseResponse:
     def test_defaults(self) -> None:
         response = HttpResponse()
@@ -114,9 +229,43 @@ class TestParseResponse:
         response = StreamingHttpResponse()
         assert parse_response(response)["content_length"] is None
 
+    def test_content_length__chunks(self) -> None:
+        response = HttpResponse(b"foo")
+        response.write(b"barbaz")
+        with mock.patch.object(
+            HttpResponse, "content", new_callable=mock.PropertyMock
+        ) as content:
+            assert get_content_length(response) == 9
+        content.assert_not_called()
+
+    @pytest.mark.parametrize("header,expected", [("42", 42), ("invalid", 3)])
+    def test_content_length__header(self, header: str, expected: int) -> None:
+        response = HttpResponse(b"foo", headers={"Content-Length": header})
+        assert get_content_length(response) == expected
+
+    def test_content_length__streaming_header(self) -> None:
+        response = StreamingHttpResponse(headers={"Content-Length": "42"})
+        assert get_content_length(response) == 42
+
+    def test_content_length__unrendered(self) -> None:
+        response = TemplateResponse(None, engines["django"].from_string("Hello"))
+        assert get_content_length(response) is None
+        response.render()
+        assert get_content_length(response) == 5
+
 
 @pytest.mark.django_db
 class TestRequestLogManager:
+    @pytest.mark.parametrize(
+        "model", [RequestLog, NormalisedRequestLog, CompactRequestLog]
+    )
+    def test_create__large_content_length(self, model: type[RequestLogBase]) -> None:
+        # downloads over 2 GiB overflow a (32-bit) integer column
+        model.objects.create(content_length=2**31 + 1)
+        assert model.objects.get().content_length == 2**31 + 1
+        field = model._meta.get_field("content_length")
+        assert field.get_internal_type() == "BigIntegerField"
+
     def test_create__no_args(self) -> None:
         rl = RequestLog.objects.create()
         assert rl.user is None
@@ -180,6 +329,15 @@ class TestRequestLogManager:
         assert rl.duration is None
         assert rl.timestamp is not None
 
+    def test_acreate(self, rf: RequestFactory) -> None:
+        # the request and response are parsed, as they are by create
+        rl = async_to_sync(RequestLog.objects.acreate)(
+            request=rf.get("/foo"), response=HttpResponse(status=201)
+        )
+        assert rl.path == "/foo"
+        assert rl.http_status_code == 201
+        assert RequestLog.objects.get().http_method == "GET"
+
     def test_create__duration(self) -> None:
         rl = RequestLog.objects.create(duration=0.123)
         assert rl.duration == 0.123
@@ -220,36 +378,38 @@ class TestModelProperties:
         rl = RequestLog(request_uri=request_uri)
         assert rl.scheme == scheme
         assert rl.netloc == netloc
-        assert rl.hostname == hostname
-        assert rl.path == path
-        assert rl.query == query
+        assert parse_url(request_uri) == {
+            "hostname": hostname,
+            "path": path,
+            "query": query,
+        }
 
     @pytest.mark.parametrize(
-        "id,method,url,status_code,expected",
+        "id,method,path,status_code,expected",
         [
             (None, "GET", "", None, "GET"),
-            (1, "GET", "http://google.com", 200, "[200] GET"),
-            (1, "GET", "http://google.com/foo", 200, "[200] GET /foo"),
+            (1, "GET", "", 200, "[200] GET"),
+            (1, "GET", "/foo", 200, "[200] GET /foo"),
         ],
     )
     def test_str(
         self,
         id: int | None,  # noqa: A002
         method: str,
-        url: str,
+        path: str,
         status_code: int | None,
         expected: str,
     ) -> None:
         rl = RequestLog(
             id=id,
             http_method=method,
-            request_uri=url,
+            path=path,
             http_status_code=status_code,
         )
         assert str(rl) == expected
 
     @pytest.mark.parametrize(
-        "id,method,url,status_code,user_id,expected",
+        "id,method,path,status_code,user_id,expected",
         [
             (
                 None,
@@ -262,7 +422,7 @@ class TestModelProperties:
             (
                 1,
                 "GET",
-                "http://google.com",
+                "",
                 200,
                 None,
                 "<RequestLog id=1 method='GET' status_code=200 path='' user=None>",
@@ -270,7 +430,7 @@ class TestModelProperties:
             (
                 1,
                 "GET",
-                "http://google.com/foo",
+                "/foo",
                 200,
                 1,
                 "<RequestLog id=1 method='GET' status_code=200 path='/foo' user=1>",
@@ -281,7 +441,7 @@ class TestModelProperties:
         self,
         id: int | None,  # noqa: A002
         method: str,
-        url: str,
+        path: str,
         status_code: int | None,
         user_id: int | None,
         expected: str,
@@ -289,7 +449,7 @@ class TestModelProperties:
         rl = RequestLog(
             id=id,
             http_method=method,
-            request_uri=url,
+            path=path,
             http_status_code=status_code,
             user_id=user_id,
         )
@@ -320,3 +480,32 @@ def test_anonymise(rf: RequestFactory) -> None:
     assert rl.session_key == "****"
     assert rl.http_user_agent == "****"
     assert rl.remote_addr == "****"
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "model,remote_addr",
+    [
+        (RequestLog, "****"),
+        (NormalisedRequestLog, "****"),
+        (CompactRequestLog, None),
+    ],
+)
+def test_queryset_anonymise(
+    model: type[RequestLogBase],
+    remote_addr: str | None,
+) -> None:
+    user = User.objects.create(username="foo")
+    for _ in range(3):
+        model.objects.create(
+            user=user,
+            session_key="bar",
+            remote_addr="4.3.2.1",
+            http_user_agent="spyware 1.0",
+        )
+    assert model.objects.all().anonymise() == 3
+    for log in model.objects.all():
+        assert log.user is None
+        assert log.session_key == "****"
+        assert log.remote_addr == remote_addr
+        assert log.http_user_agent == "****"
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+from typing import Callable, Iterator
+from unittest import mock
+
+import pytest
+from django.db import transaction
+from django.http import HttpRequest, HttpResponse
+from django.test import Client, RequestFactory
+from django.urls import reverse
+from pytest_django import DjangoAssertNumQueries
+
+from request_logger import decorators, models
+from request_logger.cache import LRUCache
+from request_logger.models import (
+    NormalisedRequestLog,
+    RequestLog,
+    RequestLogValue,
+    get_request_log_model,
+)
+
+
+def view_func(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("OK")
+
+
+@pytest.fixture(autouse=True)
+def clear_cache() -> Iterator[None]:
+    RequestLogValue.objects.clear_cache()
+    yield
+    RequestLogValue.objects.clear_cache()
+
+
+class TestLRUCache:
+    def test_get_set(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+        # "b" was the least recently used
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+
+    def test_clear(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(2)
+        cache.set("a", 1)
+        cache.clear()
+        assert cache.get("a") is None
+
+
+@pytest.mark.django_db
+class TestRequestLogValueManager:
+    def test_get_ids(
+        self,
+        django_assert_num_queries: DjangoAssertNumQueries,
+        django_capture_on_commit_callbacks: Callable,
+    ) -> None:
+        existing = RequestLogValue.objects.create(value="foo")
+        with django_assert_num_queries(3), django_capture_on_commit_callbacks(
+            execute=True
+        ):
+            ids = RequestLogValue.objects.get_ids(["foo", "bar", "baz"])
+        assert ids["foo"] == existing.pk
+        assert RequestLogValue.objects.get(pk=ids["bar"]).value == "bar"
+        # all cached
+        with django_assert_num_queries(0):
+            assert RequestLogValue.objects.get_ids(["foo", "bar"]) == {
+                "foo": ids["foo"],
+                "bar": ids["bar"],
+            }
+
+    def test_get_value(
+        self,
+        django_assert_num_queries: DjangoAssertNumQueries,
+        django_capture_on_commit_callbacks: Callable,
+    ) -> None:
+        value = RequestLogValue.objects.create(value="foo")
+        with django_assert_num_queries(1):
+            with django_capture_on_commit_callbacks(execute=True):
+                assert RequestLogValue.objects.get_value(value.pk) == "foo"
+            assert RequestLogValue.objects.get_value(value.pk) == "foo"
+
+    def test_rollback(self) -> None:
+        # values are not cached until the transaction commits
+        with pytest.raises(ValueError), transaction.atomic():
+            RequestLogValue.objects.get_ids(["foo"])
+            raise ValueError
+        assert RequestLogValue.objects.get_ids(["foo"])["foo"] == (
+            RequestLogValue.objects.get(value="foo").pk
+        )
+
+
+@pytest.mark.django_db
+class TestNormalisedRequestLog:
+    def test_create(self, rf: RequestFactory) -> None:
+        request = rf.get("/", HTTP_USER_AGENT="Mozilla/5.0")
+        log = NormalisedRequestLog.objects.create(request, HttpResponse("OK"))
+        assert log.http_user_agent_ref.value == "Mozilla/5.0"
+        log = NormalisedRequestLog.objects.get()
+        assert log.source == "request_logger.NormalisedRequestLog"
+        assert log.http_user_agent == "Mozilla/5.0"
+        assert log.response_class == "django.http.response.HttpResponse"
+        assert log.view_func == ""
+        assert log.view_func_ref is None
+        assert NormalisedRequestLog.objects.filter(
+            http_user_agent_ref__value="Mozilla/5.0"
+        ).exists()
+
+    def test_set_value(self) -> None:
+        log = NormalisedRequestLog(http_user_agent="foo")
+        assert log.http_user_agent == "foo"
+        log.save()
+        log.http_user_agent = "bar"
+        assert log.http_user_agent == "bar"
+        log.save()
+        log.refresh_from_db()
+        assert log.http_user_agent == "bar"
+
+    def test_bulk_create(
+        self, django_assert_num_queries: DjangoAssertNumQueries
+    ) -> None:
+        logs = [
+            NormalisedRequestLog(http_user_agent=f"agent-{i % 2}", http_method="GET")
+            for i in range(10)
+        ]
+        # select + insert + select values, insert logs
+        with django_assert_num_queries(4):
+            NormalisedRequestLog.objects.bulk_create(logs)
+        assert RequestLogValue.objects.count() == 2
+        assert (
+            NormalisedRequestLog.objects.filter(
+                http_user_agent_ref__value="agent-1"
+            ).count()
+            == 5
+        )
+
+
+@pytest.mark.django_db
+class TestRequestLogModelSetting:
+    def test_default(self) -> None:
+        assert get_request_log_model() is RequestLog
+
+    def test_log_request(self, rf: RequestFactory) -> None:
+        with mock.patch.object(
+            models, "REQUEST_LOG_MODEL", "request_logger.NormalisedRequestLog"
+        ):
+            decorators.log_request()(view_func)(rf.get("/"))
+        assert not RequestLog.objects.exists()
+        log = NormalisedRequestLog.objects.get()
+        assert log.response_class == "django.http.response.HttpResponse"
+
+    def test_admin(self, admin_client: Client) -> None:
+        NormalisedRequestLog.objects.create(http_user_agent="foo")
+        url = reverse("admin:request_logger_normalisedrequestlog_changelist")
+        response = admin_client.get(url)
+        assert response.status_code == 200
+        assert len(response.context["cl"].result_list) == 1
@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+from django.db import connection, migrations, models
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.state import ProjectState
+
+from request_logger import operations
+from request_logger.operations import (
+    AddBrinIndex,
+    AddIndexConcurrently,
+    RemoveFieldIndexConcurrently,
+)
+
+APP_LABEL = "request_logger"
+TABLE = "request_logger_requestlog"
+
+postgresql = pytest.mark.skipif(
+    connection.vendor != "postgresql", reason="PostgreSQL only"
+)
+
+
+@pytest.fixture
+def index_op() -> AddIndexConcurrently:
+    return AddIndexConcurrently(
+        model_name="requestlog",
+        index=models.Index(fields=["http_method"], name="test_method_idx"),
+    )
+
+
+@pytest.fixture
+def brin_op() -> AddBrinIndex:
+    return AddBrinIndex(
+        model_name="requestlog", field_name="timestamp", name="test_brin_idx"
+    )
+
+
+@pytest.fixture
+def from_state() -> ProjectState:
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    return loader.project_state(loader.graph.leaf_nodes(APP_LABEL)[0])
+
+
+def collect_sql(
+    op: operations.Operation, from_state: ProjectState, backwards: bool = False
+) -> list[str]:
+    to_state = from_state.clone()
+    op.state_forwards(APP_LABEL, to_state)
+    with connection.schema_editor(collect_sql=True) as schema_editor:
+        if backwards:
+            op.database_backwards(APP_LABEL, schema_editor, to_state, from_state)
+        else:
+            op.database_forwards(APP_LABEL, schema_editor, from_state, to_state)
+    return schema_editor.collected_sql
+
+
+@pytest.fixture
+def field_index_op() -> RemoveFieldIndexConcurrently:
+    return RemoveFieldIndexConcurrently(model_name="requestlog", field_name="user")
+
+
+def get_index_names(table: str = TABLE) -> set[str]:
+    with connection.cursor() as cursor:
+        return set(connection.introspection.get_constraints(cursor, table))
+
+
+def get_index_columns(table: str) -> list[list[str]]:
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    return [c["columns"] for c in constraints.values() if c["index"]]
+
+
+def test_migrations_not_atomic() -> None:
+    # CREATE INDEX CONCURRENTLY cannot be run inside a transaction
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    for (app_label, _), migration in loader.disk_migrations.items():
+        if app_label == APP_LABEL and any(
+            isinstance(op, (AddIndexConcurrently, AddBrinIndex))
+            or isinstance(op, migrations.SeparateDatabaseAndState)
+            and any(
+                isinstance(db_op, RemoveFieldIndexConcurrently)
+                for db_op in op.database_operations
+            )
+            for op in migration.operations
+        ):
+            assert migration.atomic is False, migration.name
+
+
+class TestAddIndexConcurrently:
+    def test_describe(self, index_op: AddIndexConcurrently) -> None:
+        assert index_op.describe() == (
+            "Create index test_method_idx on field(s) http_method of model requestlog"
+        )
+
+    def test_deconstruct(self, index_op: AddIndexConcurrently) -> None:
+        name, args, kwargs = index_op.deconstruct()
+        assert name == "AddIndexConcurrently"
+        assert args == []
+        assert kwargs == {"model_name": "requestlog", "index": index_op.index}
+
+    @pytest.mark.django_db(transaction=True)
+    def test_forwards_backwards(
+        self, index_op: AddIndexConcurrently, from_state: ProjectState
+    ) -> None:
+        to_state = from_state.clone()
+        index_op.state_forwards(APP_LABEL, to_state)
+        with connection.schema_editor() as schema_editor:
+            index_op.database_forwards(APP_LABEL, schema_editor, from_state, to_state)
+        assert "test_method_idx" in get_index_names()
+        with connection.schema_editor() as schema_editor:
+            index_op.database_backwards(APP_LABEL, schema_editor, to_state, from_state)
+        assert "test_method_idx" not in get_index_names()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sql(
+        self, index_op: AddIndexConcurrently, from_state: ProjectState
+    ) -> None:
+        forwards = collect_sql(index_op, from_state)
+        backwards = collect_sql(index_op, from_state, backwards=True)
+        assert len(forwards) == len(backwards) == 1
+        assert forwards[0].startswith("CREATE INDEX")
+        assert backwards[0].startswith("DROP INDEX")
+        if connection.vendor == "postgresql":
+            assert "CONCURRENTLY" in forwards[0]
+            assert "CONCURRENTLY" in backwards[0]
+        else:
+            assert "CONCURRENTLY" not in forwards[0] + backwards[0]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "table",
+    [
+        TABLE,
+        "request_logger_normalisedrequestlog",
+        "request_logger_compactrequestlog",
+    ],
+)
+def test_user_index(table: str) -> None:
+    # the user column is only indexed by the (user, timestamp) index
+    assert ["user_id"] not in get_index_columns(table)
+    assert ["user_id", "timestamp"] in get_index_columns(table)
+
+
+class TestRemoveFieldIndexConcurrently:
+    def test_describe(self, field_index_op: RemoveFieldIndexConcurrently) -> None:
+        assert field_index_op.describe() == (
+            "Drop index on field user of model requestlog"
+        )
+
+    def test_deconstruct(self, field_index_op: RemoveFieldIndexConcurrently) -> None:
+        name, args, kwargs = field_index_op.deconstruct()
+        assert name == "RemoveFieldIndexConcurrently"
+        assert (args, kwargs) == (
+            (),
+            {"model_name": "requestlog", "field_name": "user"},
+        )
+
+    @pytest.mark.django_db(transaction=True)
+    def test_backwards_forwards(
+        self, field_index_op: RemoveFieldIndexConcurrently, from_state: ProjectState
+    ) -> None:
+        # the index has been dropped by the migrations
+        to_state = from_state.clone()
+        field_index_op.state_forwards(APP_LABEL, to_state)
+        assert ["user_id"] not in get_index_columns(TABLE)
+        with connection.schema_editor() as schema_editor:
+            field_index_op.database_backwards(
+                APP_LABEL, schema_editor, to_state, from_state
+            )
+        assert ["user_id"] in get_index_columns(TABLE)
+        with connection.schema_editor() as schema_editor:
+            field_index_op.database_forwards(
+                APP_LABEL, schema_editor, from_state, to_state
+            )
+        assert ["user_id"] not in get_index_columns(TABLE)
+
+    @pytest.mark.django_db(transaction=True)
+    def test_sql(
+        self, field_index_op: RemoveFieldIndexConcurrently, from_state: ProjectState
+    ) -> None:
+        forwards = collect_sql(field_index_op, from_state)
+        assert len(forwards) == 1
+        assert forwards[0].startswith("DROP INDEX")
+        assert "request_logger_requestlog_user_id_" in forwards[0]
+        if connection.vendor == "postgresql":
+            assert "CONCURRENTLY" in forwards[0]
+        else:
+            assert "CONCURRENTLY" not in forwards[0]
+
+
+class TestAddBrinIndex:
+    def test_describe(self, brin_op: AddBrinIndex) -> None:
+        assert brin_op.describe() == "Create BRIN index test_brin_idx on requestlog"
+
+    def test_deconstruct(self, brin_op: AddBrinIndex) -> None:
+        name, args, kwargs = brin_op.deconstruct()
+        assert name == "AddBrinIndex"
+        assert (args, kwargs) == (
+            (),
+            {
+                "model_name": "requestlog",
+                "field_name": "timestamp",
+                "name": "test_brin_idx",
+            },
+        )
+
+    def test_state_forwards(
+        self, brin_op: AddBrinIndex, from_state: ProjectState
+    ) -> None:
+        # the index is not part of the model state
+        to_state = from_state.clone()
+        brin_op.state_forwards(APP_LABEL, to_state)
+        model_state = to_state.models[APP_LABEL, "requestlog"]
+        assert model_state.options == from_state.models[APP_LABEL, "requestlog"].options
+
+    @pytest.mark.django_db(transaction=True)
+    @pytest.mark.parametrize("brin_index", [True, False])
+    def test_sql__not_postgresql(
+        self, brin_op: AddBrinIndex, from_state: ProjectState, brin_index: bool
+    ) -> None:
+        if connection.vendor == "postgresql":
+            pytest.skip("Not PostgreSQL only")
+        with mock.patch.object(operations, "BRIN_INDEX", brin_index):
+            assert collect_sql(brin_op, from_state) == []
+            assert collect_sql(brin_op, from_state, backwards=True) == []
+
+    @postgresql
+    @pytest.mark.django_db(transaction=True)
+    def test_sql__postgresql(
+        self, brin_op: AddBrinIndex, from_state: ProjectState
+    ) -> None:
+        with mock.patch.object(operations, "BRIN_INDEX", True):
+            assert collect_sql(brin_op, from_state) == [
+                'CREATE INDEX CONCURRENTLY IF NOT EXISTS "test_brin_idx" '
+                f'ON "{TABLE}" USING brin ("timestamp");'
+            ]
+            assert collect_sql(brin_op, from_state, backwards=True) == [
+                'DROP INDEX IF EXISTS "test_brin_idx";'
+            ]
+        with mock.patch.object(operations, "BRIN_INDEX", False):
+            assert collect_sql(brin_op, from_state) == []
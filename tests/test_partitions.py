@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import datetime
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import connection
+
+from request_logger import models, partitions
+from request_logger.models import RequestLog
+from request_logger.partitions import Partition
+
+UTC = datetime.timezone.utc
+
+
+@pytest.mark.parametrize(
+    "day,interval,start,next_start",
+    [
+        (datetime.date(2024, 1, 15), "day", "2024-01-15", "2024-01-16"),
+        (datetime.date(2024, 1, 31), "day", "2024-01-31", "2024-02-01"),
+        (datetime.date(2024, 1, 15), "month", "2024-01-01", "2024-02-01"),
+        (datetime.date(2024, 1, 31), "month", "2024-01-01", "2024-02-01"),
+        (datetime.date(2024, 12, 31), "month", "2024-12-01", "2025-01-01"),
+    ],
+)
+def test_intervals(
+    day: datetime.date, interval: str, start: str, next_start: str
+) -> None:
+    lower = partitions.interval_start(day, interval)
+    assert lower.isoformat() == start
+    assert partitions.next_interval(lower, interval).isoformat() == next_start
+
+
+def test_intervals__invalid() -> None:
+    with pytest.raises(ValueError):
+        partitions.interval_start(datetime.date.today(), "week")
+
+
+def test_partition_ranges() -> None:
+    ranges = partitions.partition_ranges(datetime.date(2024, 11, 15), "month", 3)
+    assert ranges == [
+        (datetime.date(2024, 11, 1), datetime.date(2024, 12, 1)),
+        (datetime.date(2024, 12, 1), datetime.date(2025, 1, 1)),
+        (datetime.date(2025, 1, 1), datetime.date(2025, 2, 1)),
+    ]
+
+
+def test_create_partitions_sql() -> None:
+    ranges = [(datetime.date(2024, 11, 1), datetime.date(2024, 12, 1))]
+    assert partitions.create_partitions_sql(connection, "foo", ranges) == [
+        'CREATE TABLE IF NOT EXISTS "foo_p20241101" PARTITION OF "foo" '
+        "FOR VALUES FROM ('2024-11-01 00:00:00+00:00') "
+        "TO ('2024-12-01 00:00:00+00:00')"
+    ]
+
+
+def test_expired_partitions() -> None:
+    legacy = Partition("foo_legacy", datetime.date(2024, 1, 1))
+    jan = Partition("foo_p20240101", datetime.date(2024, 2, 1))
+    feb = Partition("foo_p20240201", datetime.date(2024, 3, 1))
+    default = Partition("foo_default", None)
+    cutoff = datetime.datetime(2024, 2, 15, tzinfo=UTC)
+    assert partitions.expired_partitions([legacy, jan, feb, default], cutoff) == [
+        legacy,
+        jan,
+    ]
+
+
+def test_convert_table_sql() -> None:
+    sql = partitions.convert_table_sql(
+        connection, RequestLog, datetime.date(2024, 1, 15), "month"
+    )
+    assert sql[0] == (
+        'ALTER TABLE "request_logger_requestlog" '
+        'RENAME TO "request_logger_requestlog_legacy"'
+    )
+    assert sql[-2] == (
+        'ALTER TABLE "request_logger_requestlog" '
+        'ATTACH PARTITION "request_logger_requestlog_legacy" '
+        "FOR VALUES FROM (MINVALUE) TO ('2024-02-01 00:00:00+00:00')"
+    )
+    assert '"request_logger_requestlog_p20240201"' in sql[-1]
+
+
+@pytest.mark.django_db
+def test_command__not_supported() -> None:
+    with pytest.raises(CommandError):
+        call_command("partition_request_logs")
+
+
+@pytest.mark.django_db
+def test_truncate__not_partitioned() -> None:
+    with pytest.raises(CommandError):
+        call_command("truncate_request_logs", drop_partitions=True)
+
+
+def test_uncovered_ranges() -> None:
+    legacy = Partition("foo_legacy", datetime.date(2024, 2, 1), None)
+    feb = Partition(
+        "foo_p20240201", datetime.date(2024, 3, 1), datetime.date(2024, 2, 1)
+    )
+    default = Partition("foo_default", None, None)
+    ranges = partitions.partition_ranges(datetime.date(2024, 1, 15), "month", 3)
+    assert partitions.uncovered_ranges(ranges, [legacy, feb, default]) == [
+        (datetime.date(2024, 3, 1), datetime.date(2024, 4, 1))
+    ]
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("convert", [True, False])
+def test_command__convert_then_premake(convert: bool) -> None:
+    # a run on the same day as the conversion must not create a partition
+    # overlapping the legacy partition (MINVALUE to the start of next month)
+    today = datetime.date.today()
+    boundary = partitions.convert_boundary(today, "month")
+    legacy = Partition("request_logger_requestlog_legacy", boundary, None)
+    out = StringIO()
+    with (
+        mock.patch.object(partitions, "check_connection"),
+        mock.patch.object(partitions, "is_partitioned", return_value=not convert),
+        mock.patch.object(
+            partitions, "list_partitions", return_value=[] if convert else [legacy]
+        ),
+    ):
+        call_command(
+            "partition_request_logs",
+            convert=convert,
+            interval="month",
+            dry_run=True,
+            stdout=out,
+        )
+    current = partitions.partition_name(
+        RequestLog._meta.db_table, partitions.interval_start(today, "month")
+    )
+    assert current not in out.getvalue()
+    assert partitions.partition_name(RequestLog._meta.db_table, boundary) in (
+        out.getvalue()
+    )
+
+
+def test_convert_table_sql__renames_indexes() -> None:
+    sql = partitions.convert_table_sql(
+        connection, RequestLog, datetime.date(2024, 1, 15), "month"
+    )
+    for index in RequestLog._meta.indexes:
+        assert (
+            f'ALTER INDEX IF EXISTS "{index.name}" ' f'RENAME TO "{index.name}_legacy"'
+        ) in sql
+
+
+@pytest.mark.django_db
+def test_command__request_log_model() -> None:
+    out = StringIO()
+    with (
+        mock.patch.object(partitions, "check_connection"),
+        mock.patch.object(partitions, "list_partitions", return_value=[]),
+        mock.patch.object(
+            models, "REQUEST_LOG_MODEL", "request_logger.CompactRequestLog"
+        ),
+    ):
+        call_command("partition_request_logs", convert=True, dry_run=True, stdout=out)
+    assert "request_logger_compactrequestlog_legacy" in out.getvalue()
+    assert "request_logger_requestlog" not in out.getvalue()
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.http import HttpRequest, HttpResponse
+from django.template import engines
+from django.template.response import SimpleTemplateResponse
+from django.test import RequestFactory
+
+from request_logger import decorators, middleware
+from request_logger.middleware import RequestLogMiddleware
+from request_logger.models import RequestLog
+from request_logger.queries import QueryCounter, fingerprint
+
+User = get_user_model()
+
+
+def query_view_func(request: HttpRequest) -> HttpResponse:
+    User.objects.filter(username="fred").exists()
+    User.objects.count()
+    return HttpResponse("OK")
+
+
+def template_view_func(request: HttpRequest) -> SimpleTemplateResponse:
+    User.objects.count()
+    template = engines["django"].from_string("{{ users.count }}{{ users.first }}")
+    return SimpleTemplateResponse(template, {"users": User.objects.all()})
+
+
+async def async_view_func(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("OK")
+
+
+@pytest.mark.parametrize(
+    "sql,expected",
+    [
+        ("SELECT 1", "SELECT ?"),
+        (
+            "SELECT * FROM t WHERE a = 'x''y' AND b = 2.5",
+            "SELECT * FROM t WHERE a = ? AND b = ?",
+        ),
+        ("SELECT * FROM t WHERE id IN (1, 2,  3)", "SELECT * FROM t WHERE id IN (...)"),
+        ("SELECT * FROM t WHERE id IN (%s, %s)", "SELECT * FROM t WHERE id IN (...)"),
+        ("SELECT a1\n  FROM t", "SELECT a1 FROM t"),
+    ],
+)
+def test_fingerprint(sql: str, expected: str) -> None:
+    assert fingerprint(sql) == expected
+
+
+@pytest.mark.django_db
+class TestQueryCounter:
+    def test_counter(self) -> None:
+        with QueryCounter() as queries:
+            User.objects.count()
+            User.objects.filter(pk__in=[1, 2]).exists()
+        assert queries.count == 2
+        assert queries.duration_ns > 0
+        assert queries.slowest_sql
+        # wrappers are removed on exit
+        User.objects.count()
+        assert queries.count == 2
+
+    def test_log_kwargs(self) -> None:
+        with QueryCounter() as queries:
+            pass
+        assert queries.log_kwargs() == {
+            "query_count": 0,
+            "query_duration": 0.0,
+            "slowest_query": "",
+        }
+
+
+@pytest.mark.django_db
+class TestCaptureQueries:
+    def test_decorator(self, rf: RequestFactory) -> None:
+        func = decorators.log_request(capture_queries=True)(query_view_func)
+        func(rf.get("/"))
+        log = RequestLog.objects.get()
+        assert log.query_count == 2
+        assert log.query_duration is not None
+        assert log.query_duration > 0
+        assert log.slowest_query.startswith("SELECT")
+        assert "fred" not in log.slowest_query
+
+    def test_decorator_disabled(self, rf: RequestFactory) -> None:
+        func = decorators.log_request()(query_view_func)
+        func(rf.get("/"))
+        log = RequestLog.objects.get()
+        assert log.query_count is None
+        assert log.slowest_query == ""
+
+    def test_decorator_setting(self, rf: RequestFactory) -> None:
+        with mock.patch.object(decorators, "CAPTURE_QUERIES", True):
+            func = decorators.log_request()(query_view_func)
+        func(rf.get("/"))
+        assert RequestLog.objects.get().query_count == 2
+
+    def test_middleware(self, rf: RequestFactory) -> None:
+        with mock.patch.object(middleware, "CAPTURE_QUERIES", True):
+            RequestLogMiddleware(query_view_func)(rf.get("/"))
+        assert RequestLog.objects.get().query_count == 2
+
+    def test_decorator_template_response(self, rf: RequestFactory) -> None:
+        func = decorators.log_request(capture_queries=True)(template_view_func)
+        func(rf.get("/")).render()
+        # the queries made while rendering the template are counted
+        assert RequestLog.objects.get().query_count == 3
+        assert not connection.execute_wrappers
+
+    def test_decorator_template_response__not_rendered(
+        self, rf: RequestFactory
+    ) -> None:
+        func = decorators.log_request(capture_queries=True)(template_view_func)
+        response = func(rf.get("/"))
+        assert connection.execute_wrappers
+        response.close()
+        assert not connection.execute_wrappers
+
+    def test_decorator_async(self) -> None:
+        with pytest.raises(ValueError):
+            decorators.log_request(capture_queries=True)(async_view_func)
+        with mock.patch.object(decorators, "CAPTURE_QUERIES", True):
+            decorators.log_request()(async_view_func)
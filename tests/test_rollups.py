@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import datetime
+from io import StringIO
+from unittest import mock
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from request_logger import models
+from request_logger.models import (
+    CompactRequestLog,
+    NormalisedRequestLog,
+    RequestLog,
+    RequestLogBase,
+    RequestLogCheckpoint,
+    RequestLogRollup,
+)
+from request_logger.rollups import rollup_request_logs
+
+HOUR = datetime.datetime(2024, 1, 1, 12, tzinfo=datetime.timezone.utc)
+
+
+def create_log(minutes: int = 0, **kwargs: object) -> RequestLog:
+    kwargs.setdefault("view_func", "foo")
+    kwargs.setdefault("http_method", "GET")
+    kwargs.setdefault("http_status_code", 200)
+    return RequestLog.objects.create(
+        timestamp=HOUR + datetime.timedelta(minutes=minutes), **kwargs
+    )
+
+
+@pytest.mark.django_db
+class TestRollupRequestLogs:
+    def test_rollup(self) -> None:
+        create_log(1, duration=1.0, content_length=10)
+        create_log(2, duration=3.0, content_length=20, sample_rate=0.5)
+        create_log(3, duration=2.0, http_status_code=503)
+        create_log(61, duration=2.0)
+        assert rollup_request_logs("hour") == (4, RequestLog.objects.last().pk)
+        rollups = RequestLogRollup.objects.order_by("bucket", "status_class")
+        assert [(r.bucket, r.status_class, r.count) for r in rollups] == [
+            (HOUR, 2, 2),
+            (HOUR, 5, 1),
+            (HOUR + datetime.timedelta(hours=1), 2, 1),
+        ]
+        rollup = rollups[0]
+        assert rollup.period == "hour"
+        assert rollup.source == "request_logger.RequestLog"
+        assert rollup.view_func == "foo"
+        assert rollup.http_method == "GET"
+        assert rollup.estimated_count == 3.0
+        assert rollup.content_length == 30
+        assert rollup.duration_sum == 4.0
+        assert rollup.duration_min == 1.0
+        assert rollup.duration_max == 3.0
+        assert rollup.duration_mean == 2.0
+
+    def test_rollup__incremental(self) -> None:
+        create_log(1, duration=1.0)
+        rollup_request_logs("hour", batch_size=1)
+        create_log(2, duration=3.0)
+        create_log(3, duration=None, http_status_code=None)
+        assert rollup_request_logs("hour", batch_size=1)[0] == 2
+        assert rollup_request_logs("hour")[0] == 0
+        rollups = RequestLogRollup.objects.order_by("status_class")
+        assert [(r.status_class, r.count) for r in rollups] == [(0, 1), (2, 2)]
+        assert rollups[1].duration_min == 1.0
+        assert rollups[1].duration_max == 3.0
+        assert rollups[0].duration_min is None
+        checkpoint = RequestLogCheckpoint.objects.get(name="rollup:hour")
+        assert checkpoint.position == RequestLog.objects.last().pk
+
+    def test_rollup__lag(self) -> None:
+        RequestLog.objects.create(timestamp=timezone.now())
+        assert rollup_request_logs("minute", lag=60)[0] == 0
+        assert rollup_request_logs("minute", lag=0)[0] == 1
+
+    def test_rollup__lag_interleaved(self) -> None:
+        # logs with later ids, but older timestamps, than a recent log
+        create_log(1)
+        recent = RequestLog.objects.create(timestamp=timezone.now())
+        create_log(2)
+        assert rollup_request_logs("hour", lag=60) == (1, recent.pk - 1)
+        assert RequestLogRollup.objects.get().count == 1
+        assert rollup_request_logs("hour", lag=0) == (2, recent.pk + 1)
+        assert sum(RequestLogRollup.objects.values_list("count", flat=True)) == 3
+
+    def test_command(self) -> None:
+        create_log(1)
+        out = StringIO()
+        call_command("rollup_request_logs", period="minute", stdout=out)
+        assert "Rolled up 1 records" in out.getvalue()
+        assert RequestLogRollup.objects.get().bucket == HOUR + datetime.timedelta(
+            minutes=1
+        )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("model", [NormalisedRequestLog, CompactRequestLog])
+def test_rollup__request_log_model(model: type[RequestLogBase]) -> None:
+    model.objects.create(
+        timestamp=HOUR, view_func="foo", http_method="GET", http_status_code=200
+    )
+    with mock.patch.object(models, "REQUEST_LOG_MODEL", model._meta.label):
+        assert rollup_request_logs("hour")[0] == 1
+    rollup = RequestLogRollup.objects.get()
+    assert (rollup.source, rollup.view_func, rollup.http_method) == (
+        model._meta.label,
+        "foo",
+        "GET",
+    )
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import datetime
+from io import StringIO
+from typing import Any, Iterator
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import models
+from django.utils import timezone
+
+from request_logger import routers
+from request_logger.models import (
+    CompactRequestLog,
+    RequestLog,
+    RequestLogCheckpoint,
+    RequestLogRollup,
+    RequestLogValue,
+)
+from request_logger.rollups import rollup_request_logs
+from request_logger.routers import RequestLoggerRouter
+
+User = get_user_model()
+
+
+@pytest.fixture
+def router() -> Iterator[RequestLoggerRouter]:
+    with (
+        mock.patch.object(routers, "DATABASE", "logs"),
+        mock.patch.object(routers, "READ_DATABASE", "replica"),
+    ):
+        yield RequestLoggerRouter()
+
+
+@pytest.mark.parametrize("model", [RequestLog, CompactRequestLog])
+def test_logs(router: RequestLoggerRouter, model: type[models.Model]) -> None:
+    assert router.db_for_write(model) == "logs"
+    assert router.db_for_read(model) == "replica"
+
+
+@pytest.mark.parametrize("model", [RequestLogValue, RequestLogCheckpoint])
+def test_other_models(router: RequestLoggerRouter, model: type[models.Model]) -> None:
+    # read back immediately after being written, so never read from a replica
+    assert router.db_for_write(model) == "logs"
+    assert router.db_for_read(model) == "logs"
+
+
+def test_other_apps(router: RequestLoggerRouter) -> None:
+    assert router.db_for_write(User) is None
+    assert router.db_for_read(User) is None
+    assert router.allow_relation(User(), User()) is None
+
+
+def test_allow_relation(router: RequestLoggerRouter) -> None:
+    assert router.allow_relation(RequestLog(), User()) is True
+    assert router.allow_relation(User(), RequestLog()) is True
+
+
+def test_not_configured() -> None:
+    router = RequestLoggerRouter()
+    assert router.db_for_write(RequestLog) is None
+    assert router.db_for_read(RequestLog) is None
+
+
+@pytest.fixture
+def routed(settings: Any) -> Iterator[None]:
+    # the "replica" alias does not exist, so any read from it raises an error
+    settings.DATABASE_ROUTERS = ["request_logger.routers.RequestLoggerRouter"]
+    with (
+        mock.patch.object(routers, "DATABASE", "default"),
+        mock.patch.object(routers, "READ_DATABASE", "replica"),
+    ):
+        assert RequestLog.objects.all().db == "replica"
+        yield
+
+
+@pytest.mark.django_db
+def test_run_in_batches(routed: None) -> None:
+    RequestLog.objects.using("default").bulk_create([RequestLog() for _ in range(3)])
+    call_command(
+        "copy_request_logs",
+        target="request_logger.CompactRequestLog",
+        batch_size=2,
+        stdout=StringIO(),
+    )
+    assert CompactRequestLog.objects.using("default").count() == 3
+    checkpoint = RequestLogCheckpoint.objects.get()
+    assert checkpoint.position == RequestLog.objects.using("default").last().pk
+
+
+@pytest.mark.django_db
+def test_rollups(routed: None) -> None:
+    RequestLog.objects.create(timestamp=timezone.now() - datetime.timedelta(hours=1))
+    assert rollup_request_logs("hour")[0] == 1
+    assert RequestLogRollup.objects.get().count == 1
@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.urls import ResolverMatch
+
+from request_logger.rules import RequestLogRules
+
+
+class TestRequestLogRules:
+    @pytest.mark.parametrize(
+        "rules,method,path,expected",
+        [
+            ({}, "GET", "/", True),
+            ({"paths": ["/api/"]}, "GET", "/api/foo", True),
+            ({"paths": ["/api/"]}, "GET", "/foo/api/", False),
+            ({"paths": ["/api/", "/v2/"]}, "GET", "/v2/foo", True),
+            ({"paths": ["/a.b"]}, "GET", "/aXb", False),
+            ({"path_regexes": [r"/users/\d+/$"]}, "GET", "/users/1/", True),
+            ({"path_regexes": [r"/users/\d+/$"]}, "GET", "/users/x/", False),
+            ({"paths": ["/api/"], "path_regexes": [r"/\d+"]}, "GET", "/1", True),
+            ({"methods": ["post"]}, "POST", "/", True),
+            ({"methods": ["post"]}, "GET", "/", False),
+            ({"exclude_paths": ["/healthz"]}, "GET", "/healthz", False),
+            ({"exclude_paths": ["/healthz"]}, "GET", "/", True),
+            (
+                {"paths": ["/api/"], "exclude_paths": ["/api/ping"]},
+                "GET",
+                "/api/ping",
+                False,
+            ),
+            ({"exclude_path_regexes": [r".*\.css$"]}, "GET", "/static/x.css", False),
+        ],
+    )
+    def test_match_request(
+        self, rf: RequestFactory, rules: dict, method: str, path: str, expected: bool
+    ) -> None:
+        request = rf.generic(method, path)
+        assert RequestLogRules(**rules).match_request(request) == expected
+
+    @pytest.mark.parametrize(
+        "rules,status_code,view_func,expected",
+        [
+            ({}, 200, "", True),
+            ({"status_codes": [404]}, 404, "", True),
+            ({"status_codes": [404]}, 200, "", False),
+            ({"status_codes": [(500, 599)]}, 503, "", True),
+            ({"status_codes": [(500, 599), 404]}, 400, "", False),
+            ({"view_funcs": ["demo.views.foo"]}, 200, "demo.views.foo", True),
+            ({"view_funcs": ["demo.views.foo"]}, 200, "demo.views.bar", False),
+            ({"view_funcs": ["demo.views.foo"]}, 200, None, False),
+            ({"exclude_view_funcs": ["demo.views.foo"]}, 200, "demo.views.foo", False),
+            ({"exclude_view_funcs": ["demo.views.foo"]}, 200, None, True),
+        ],
+    )
+    def test_match_response(
+        self,
+        rf: RequestFactory,
+        rules: dict,
+        status_code: int,
+        view_func: str | None,
+        expected: bool,
+    ) -> None:
+        request = rf.get("/")
+        if view_func is not None:
+            request.resolver_match = mock.MagicMock(
+                spec=ResolverMatch, _func_path=view_func
+            )
+        response = HttpResponse(status=status_code)
+        assert RequestLogRules(**rules).match_response(request, response) == expected
@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+from unittest import mock
+
+import pytest
+from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory
+
+from request_logger import decorators, sampling
+from request_logger.models import RequestLog
+from request_logger.sampling import SamplingPolicy, TokenBucket
+
+
+def view_func(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("OK")
+
+
+class TestTokenBucket:
+    def test_consume(self) -> None:
+        bucket = TokenBucket(rate=2)
+        assert bucket.consume()
+        assert bucket.consume()
+        assert not bucket.consume()
+
+    def test_refill(self) -> None:
+        bucket = TokenBucket(rate=1)
+        with mock.patch("time.monotonic", return_value=bucket.last_ts):
+            assert bucket.consume()
+            assert not bucket.consume()
+        with mock.patch("time.monotonic", return_value=bucket.last_ts + 1):
+            assert bucket.consume()
+
+    def test_acceptance_rate(self) -> None:
+        bucket = TokenBucket(rate=1)
+        assert bucket.acceptance_rate == 1.0
+        with mock.patch("time.monotonic", return_value=bucket.last_ts):
+            assert bucket.consume()
+            assert not bucket.consume()
+        assert bucket.acceptance_rate == 0.5
+        # older requests count for less
+        with mock.patch("time.monotonic", return_value=bucket.last_ts + 10):
+            assert bucket.consume()
+        assert bucket.acceptance_rate == pytest.approx(1.5 / 2)
+
+
+class TestSamplingPolicy:
+    def test_invalid_rate(self) -> None:
+        with pytest.raises(ValueError):
+            SamplingPolicy(rate=0)
+
+    @pytest.mark.parametrize(
+        "random,expected",
+        [(0.05, 0.1), (0.1, None), (0.5, None)],
+    )
+    def test_rate(self, rf: RequestFactory, random: float, expected: float) -> None:
+        policy = SamplingPolicy(rate=0.1)
+        with mock.patch("random.random", return_value=random):
+            assert policy.sample(rf.get("/"), HttpResponse(), 0.1) == expected
+
+    @pytest.mark.parametrize(
+        "always_log_errors,status_code,expected",
+        [(True, 500, 1.0), (True, 404, None), (False, 500, None)],
+    )
+    def test_errors(
+        self,
+        rf: RequestFactory,
+        always_log_errors: bool,
+        status_code: int,
+        expected: float | None,
+    ) -> None:
+        policy = SamplingPolicy(rate=0.1, always_log_errors=always_log_errors)
+        response = HttpResponse(status=status_code)
+        with mock.patch("random.random", return_value=0.5):
+            assert policy.sample(rf.get("/"), response, 0.1) == expected
+
+    @pytest.mark.parametrize("duration,expected", [(1.0, 1.0), (0.5, None)])
+    def test_slow(
+        self, rf: RequestFactory, duration: float, expected: float | None
+    ) -> None:
+        policy = SamplingPolicy(rate=0.1, slow_threshold=1.0)
+        with mock.patch("random.random", return_value=0.5):
+            assert policy.sample(rf.get("/"), HttpResponse(), duration) == expected
+
+    def test_max_per_second(self, rf: RequestFactory) -> None:
+        policy = SamplingPolicy(max_per_second=1)
+        assert policy.sample(rf.get("/"), HttpResponse(), 0.1) == 1.0
+        assert policy.sample(rf.get("/"), HttpResponse(), 0.1) is None
+        # server errors bypass the cap
+        assert policy.sample(rf.get("/"), HttpResponse(status=500), 0.1) == 1.0
+
+    def test_max_per_second__sample_rate(self, rf: RequestFactory) -> None:
+        policy = SamplingPolicy(rate=0.5, max_per_second=1)
+        with (
+            mock.patch("random.random", return_value=0.0),
+            mock.patch.object(sampling, "ACCEPTANCE_HALF_LIFE", float("inf")),
+        ):
+            assert policy.sample(rf.get("/"), HttpResponse(), 0.1) == 0.5
+            bucket = policy.get_bucket("")
+            with mock.patch("time.monotonic", return_value=bucket.last_ts):
+                for _ in range(3):
+                    assert policy.sample(rf.get("/"), HttpResponse(), 0.1) is None
+            with mock.patch("time.monotonic", return_value=bucket.last_ts + 1):
+                # 2 of the 5 requests were let through by the cap
+                sample_rate = policy.sample(rf.get("/"), HttpResponse(), 0.1)
+        assert sample_rate == pytest.approx(0.5 * 2 / 5)
+
+
+@pytest.mark.django_db
+class TestLogRequestSampling:
+    def test_sampled_in(self, rf: RequestFactory) -> None:
+        func = decorators.log_request(sampling=SamplingPolicy(rate=0.5))(view_func)
+        with mock.patch("random.random", return_value=0.1):
+            func(rf.get("/"))
+        assert RequestLog.objects.get().sample_rate == 0.5
+
+    def test_sampled_out(self, rf: RequestFactory) -> None:
+        func = decorators.log_request(sampling=SamplingPolicy(rate=0.5))(view_func)
+        with mock.patch("random.random", return_value=0.9):
+            func(rf.get("/"))
+        assert RequestLog.objects.count() == 0
+
+    def test_no_policy(self, rf: RequestFactory) -> None:
+        decorators.log_request()(view_func)(rf.get("/"))
+        assert RequestLog.objects.get().sample_rate == 1.0
+
+    def test_configured_policy(self, rf: RequestFactory) -> None:
+        request = rf.get("/")
+        policy = SamplingPolicy(rate=0.5)
+        with mock.patch.object(sampling, "_policies", {"": policy}):
+            with mock.patch("random.random", return_value=0.9):
+                decorators.log_request()(view_func)(request)
+        assert RequestLog.objects.count() == 0
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Iterator
+from unittest import mock
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory
+
+from request_logger import decorators, sinks
+from request_logger.models import LatencySketch, RequestLog
+from request_logger.serializers import prepare_record
+from request_logger.sinks import (
+    DatabaseSink,
+    FileSink,
+    LoggingSink,
+    RequestLogSink,
+    get_request_log_sink,
+    get_sink,
+)
+
+User = get_user_model()
+
+
+def view_func(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("OK")
+
+
+@pytest.fixture
+def record(rf: RequestFactory) -> dict:
+    return RequestLog.objects.parse(rf.get("/foo"), HttpResponse("OK"))
+
+
+@pytest.fixture
+def clear_sink() -> Iterator[None]:
+    get_request_log_sink.cache_clear()
+    yield
+    get_request_log_sink.cache_clear()
+
+
+@pytest.mark.django_db
+def test_prepare_record(record: dict) -> None:
+    record["user"] = User.objects.create(username="fred")
+    prepared = prepare_record(record)
+    assert prepared["user_id"] == record["user"].pk
+    assert "user" not in prepared
+    assert prepared["timestamp"] is not None
+
+
+def test_request_log_sink__abstract() -> None:
+    class IncompleteSink(RequestLogSink):
+        pass
+
+    with pytest.raises(TypeError):
+        IncompleteSink()  # type: ignore[abstract]
+
+
+@pytest.mark.django_db
+class TestDatabaseSink:
+    def test_write(self, record: dict) -> None:
+        DatabaseSink().write(RequestLog, [record])
+        DatabaseSink().write(RequestLog, [record, record])
+        assert RequestLog.objects.filter(path="/foo").count() == 3
+
+
+class TestFileSink:
+    def test_write(self, tmp_path: Path, record: dict) -> None:
+        sink = FileSink(str(tmp_path / "logs-{pid}.jsonl"))
+        sink.write(RequestLog, [record, record])
+        sink.close()
+        (path,) = tmp_path.iterdir()
+        lines = path.read_text().splitlines()
+        assert len(lines) == 2
+        assert json.loads(lines[0])["path"] == "/foo"
+
+    def test_rotate__size(self, tmp_path: Path, record: dict) -> None:
+        sink = FileSink(str(tmp_path / "logs.jsonl"), max_bytes=1)
+        for _ in range(3):
+            sink.write(RequestLog, [record])
+        sink.close()
+        assert len(list(tmp_path.iterdir())) == 3
+        assert len((tmp_path / "logs.jsonl").read_text().splitlines()) == 1
+
+    def test_rotate__age(self, tmp_path: Path, record: dict) -> None:
+        sink = FileSink(str(tmp_path / "logs.jsonl"), max_age=60)
+        sink.write(RequestLog, [record])
+        sink.write(RequestLog, [record])
+        assert len(list(tmp_path.iterdir())) == 1
+        sink._opened_at -= 60
+        sink.write(RequestLog, [record])
+        sink.close()
+        assert len(list(tmp_path.iterdir())) == 2
+
+
+class TestLoggingSink:
+    def test_write(self, caplog: pytest.LogCaptureFixture, record: dict) -> None:
+        with caplog.at_level(logging.INFO, logger="request_logger.requests"):
+            LoggingSink().write(RequestLog, [record])
+        (log_record,) = caplog.records
+        assert json.loads(log_record.getMessage())["path"] == "/foo"
+        assert log_record.request_log["path"] == "/foo"
+
+
+@pytest.mark.usefixtures("clear_sink")
+class TestGetSink:
+    def test_default(self) -> None:
+        assert isinstance(get_sink(RequestLog), DatabaseSink)
+
+    def test_configured(self, tmp_path: Path) -> None:
+        config = {
+            "BACKEND": "request_logger.sinks.FileSink",
+            "OPTIONS": {"path": str(tmp_path / "logs.jsonl")},
+        }
+        with mock.patch.object(sinks, "SINK", config):
+            assert isinstance(get_sink(RequestLog), FileSink)
+            # only request logs are written to the sink
+            assert isinstance(get_sink(LatencySketch), DatabaseSink)
+
+    @pytest.mark.django_db
+    def test_log_request(
+        self, rf: RequestFactory, caplog: pytest.LogCaptureFixture
+    ) -> None:
+        config = {"BACKEND": "request_logger.sinks.LoggingSink"}
+        with mock.patch.object(sinks, "SINK", config), caplog.at_level(logging.INFO):
+            decorators.log_request()(view_func)(rf.get("/foo"))
+        assert not RequestLog.objects.exists()
+        assert '"path":"/foo"' in caplog.text
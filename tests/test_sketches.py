@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import random
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.http import HttpRequest, HttpResponse
+from django.test import RequestFactory
+
+from request_logger import decorators, sketches
+from request_logger.histogram import LatencyHistogram
+from request_logger.models import LatencySketch
+from request_logger.sketches import LatencySketchRecorder
+
+
+def view_func(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("OK")
+
+
+async def async_view_func(request: HttpRequest) -> HttpResponse:
+    return HttpResponse("OK")
+
+
+class TestLatencyHistogram:
+    def test_invalid_accuracy(self) -> None:
+        with pytest.raises(ValueError):
+            LatencyHistogram(1)
+
+    def test_empty(self) -> None:
+        histogram = LatencyHistogram()
+        assert histogram.quantile(0.5) is None
+        assert histogram.mean is None
+
+    @pytest.mark.parametrize("q", [0, 0.5, 0.9, 0.99, 1])
+    def test_quantile(self, q: float) -> None:
+        values = sorted(random.lognormvariate(-3, 1) for _ in range(1000))
+        histogram = LatencyHistogram(relative_accuracy=0.01)
+        for value in values:
+            histogram.add(value)
+        expected = values[int(q * (len(values) - 1))]
+        assert histogram.quantile(q) == pytest.approx(expected, rel=0.01)
+
+    def test_zero(self) -> None:
+        histogram = LatencyHistogram()
+        histogram.add(0)
+        histogram.add(0)
+        histogram.add(1)
+        assert histogram.quantile(0.5) == 0
+        assert histogram.quantile(1) == 1
+
+    def test_merge(self) -> None:
+        a = LatencyHistogram()
+        b = LatencyHistogram()
+        for value in (0.1, 0.2, 0.3):
+            a.add(value)
+        for value in (0.4, 0.5):
+            b.add(value)
+        a.merge(b)
+        assert len(a) == 5
+        assert a.min == 0.1
+        assert a.max == 0.5
+        assert a.mean == pytest.approx(0.3)
+        assert a.quantile(0.5) == pytest.approx(0.3, rel=0.01)
+
+    def test_merge__accuracy(self) -> None:
+        with pytest.raises(ValueError):
+            LatencyHistogram(0.01).merge(LatencyHistogram(0.02))
+
+    def test_dict(self) -> None:
+        histogram = LatencyHistogram()
+        for value in (0, 0.1, 0.2):
+            histogram.add(value)
+        clone = LatencyHistogram.from_dict(histogram.to_dict())
+        assert clone.to_dict() == histogram.to_dict()
+        assert clone.quantile(0.5) == histogram.quantile(0.5)
+
+
+@pytest.mark.django_db
+class TestLatencySketchRecorder:
+    def test_record(self) -> None:
+        recorder = LatencySketchRecorder(flush_interval=60)
+        recorder.record("foo", 0.1)
+        recorder.record("foo", 0.2)
+        recorder.record("bar", 0.3)
+        assert LatencySketch.objects.count() == 0
+        assert recorder.flush(buffered=False) == 2
+        sketch = LatencySketch.objects.get(view_func="foo")
+        assert sketch.count == 2
+        assert sketch.window_start < sketch.window_end
+        assert sketch.to_histogram().max == 0.2
+        assert recorder.flush(buffered=False) == 0
+
+    @pytest.mark.django_db(transaction=True)
+    def test_record__flush_interval(self) -> None:
+        recorder = LatencySketchRecorder(flush_interval=0)
+        recorder.record("foo", 0.1)
+        # flushed from a background thread
+        assert recorder._flush_thread
+        recorder._flush_thread.join()
+        assert LatencySketch.objects.count() == 1
+
+    def test_record__flush_interval_buffered(self) -> None:
+        recorder = LatencySketchRecorder(flush_interval=0)
+        with (
+            mock.patch.object(sketches, "BUFFER_ENABLED", True),
+            mock.patch.object(sketches.buffer, "add") as mock_add,
+        ):
+            recorder.record("foo", 0.1)
+        assert recorder._flush_thread is None
+        mock_add.assert_called_once()
+
+    @pytest.mark.django_db(transaction=True)
+    def test_async_view(self, rf: RequestFactory) -> None:
+        """Test that flushing from the event loop does not lose histograms."""
+        recorder = LatencySketchRecorder(flush_interval=0)
+        func = decorators.log_request(exclude=lambda r: True)(async_view_func)
+        with (
+            mock.patch.object(sketches, "LATENCY_SKETCHES_ENABLED", True),
+            mock.patch.object(sketches, "BUFFER_ENABLED", False),
+            mock.patch.object(sketches, "recorder", recorder),
+        ):
+            async_to_sync(func)(rf.get("/"))
+        assert recorder._flush_thread
+        recorder._flush_thread.join()
+        assert LatencySketch.objects.get().count == 1
+
+    def test_flush__buffered(self) -> None:
+        recorder = LatencySketchRecorder(flush_interval=60)
+        recorder.record("foo", 0.1)
+        with mock.patch.object(sketches.buffer, "add") as mock_add:
+            recorder.flush(buffered=True)
+        model, record = mock_add.call_args[0]
+        assert model == LatencySketch
+        assert record["view_func"] == "foo"
+
+    def test_merge(self) -> None:
+        recorder = LatencySketchRecorder(flush_interval=60)
+        recorder.record("foo", 0.1)
+        recorder.flush(buffered=False)
+        recorder.record("foo", 0.3)
+        recorder.record("bar", 1.0)
+        recorder.flush(buffered=False)
+        histogram = LatencySketch.objects.filter(view_func="foo").merge()
+        assert histogram.count == 2
+        assert histogram.max == 0.3
+        assert LatencySketch.objects.none().merge().count == 0
+
+    def test_log_request(self, rf: RequestFactory) -> None:
+        """Test that requests are recorded even if they are not logged."""
+        func = decorators.log_request(exclude=lambda r: True)(view_func)
+        with mock.patch.object(sketches, "LATENCY_SKETCHES_ENABLED", True):
+            with mock.patch.object(sketches.recorder, "record") as mock_record:
+                func(rf.get("/"))
+        view, duration = mock_record.call_args[0]
+        assert view == ""
+        assert duration > 0
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from io import StringIO
+from pathlib import Path
+from typing import Iterator
+from unittest import mock
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from request_logger import sinks
+from request_logger.management.commands import drain_request_log_spool
+from request_logger.models import (
+    NormalisedRequestLog,
+    RequestLog,
+    RequestLogCheckpoint,
+)
+from request_logger.sinks import DatabaseSink, write_records
+from request_logger.spool import CircuitBreaker, RequestLogSpool
+
+
+@pytest.fixture
+def spool(tmp_path: Path) -> Iterator[RequestLogSpool]:
+    spool = RequestLogSpool(str(tmp_path / "spool.sqlite3"))
+    with (
+        mock.patch.object(sinks, "get_spool", return_value=spool),
+        mock.patch.object(drain_request_log_spool, "get_spool", return_value=spool),
+    ):
+        yield spool
+    spool.close()
+
+
+@pytest.fixture
+def breaker() -> Iterator[CircuitBreaker]:
+    breaker = CircuitBreaker(cooldown=30)
+    with mock.patch.object(sinks, "breaker", breaker):
+        yield breaker
+
+
+@pytest.fixture
+def record(rf: RequestFactory) -> dict:
+    return RequestLog.objects.parse(rf.get("/foo"), HttpResponse("OK"))
+
+
+class TestCircuitBreaker:
+    def test_trip(self) -> None:
+        breaker = CircuitBreaker(cooldown=30)
+        assert not breaker.is_open
+        breaker.trip()
+        assert breaker.is_open
+        breaker.reset()
+        assert not breaker.is_open
+
+    def test_cooldown(self) -> None:
+        breaker = CircuitBreaker(cooldown=0)
+        breaker.trip()
+        assert not breaker.is_open
+
+
+class TestRequestLogSpool:
+    def test_add_read_delete(self, spool: RequestLogSpool) -> None:
+        assert len(spool) == 0
+        spool.add(RequestLog, [{"path": "/foo"}, {"path": "/bar"}])
+        assert len(spool) == 2
+        rows = spool.read(0, 10)
+        assert [(label, r["path"]) for _, label, r in rows] == [
+            ("request_logger.RequestLog", "/foo"),
+            ("request_logger.RequestLog", "/bar"),
+        ]
+        assert spool.read(rows[0][0], 10) == rows[1:]
+        spool.delete(rows[0][0])
+        assert len(spool) == 1
+
+    def test_spool_id(self, spool: RequestLogSpool) -> None:
+        spool_id = spool.spool_id
+        spool.close()
+        # the id is stored in the file
+        assert RequestLogSpool(spool.path).spool_id == spool_id
+
+
+@pytest.mark.django_db
+class TestWriteRecords:
+    def test_no_spool(self, record: dict) -> None:
+        with mock.patch.object(DatabaseSink, "write") as write:
+            write_records(RequestLog, [record])
+        write.assert_called_once_with(RequestLog, [record])
+
+    def test_write(
+        self, spool: RequestLogSpool, breaker: CircuitBreaker, record: dict
+    ) -> None:
+        write_records(RequestLog, [record])
+        assert RequestLog.objects.count() == 1
+        assert len(spool) == 0
+        assert not breaker.is_open
+
+    def test_write__error(
+        self, spool: RequestLogSpool, breaker: CircuitBreaker, record: dict
+    ) -> None:
+        with mock.patch.object(DatabaseSink, "write", side_effect=DatabaseError):
+            write_records(RequestLog, [record])
+        assert len(spool) == 1
+        assert breaker.is_open
+
+    def test_write__breaker_open(
+        self, spool: RequestLogSpool, breaker: CircuitBreaker, record: dict
+    ) -> None:
+        breaker.trip()
+        with mock.patch.object(DatabaseSink, "write") as write:
+            write_records(RequestLog, [record])
+        write.assert_not_called()
+        assert len(spool) == 1
+
+    def test_write__latency_budget(
+        self, spool: RequestLogSpool, breaker: CircuitBreaker, record: dict
+    ) -> None:
+        with mock.patch.object(sinks, "SPOOL_LATENCY_BUDGET", 1e-9):
+            write_records(RequestLog, [record])
+        # the slow write succeeded, but subsequent writes are spooled
+        assert RequestLog.objects.count() == 1
+        assert len(spool) == 0
+        assert breaker.is_open
+
+
+@pytest.mark.django_db
+class TestDrainCommand:
+    def test_drain(self, spool: RequestLogSpool, record: dict) -> None:
+        spool.add(RequestLog, [record] * 3)
+        spool.add(NormalisedRequestLog, [record])
+        out = StringIO()
+        call_command("drain_request_log_spool", batch_size=2, stdout=out)
+        assert "Drained 4 records (0 remaining)" in out.getvalue()
+        assert RequestLog.objects.filter(path="/foo").count() == 3
+        assert NormalisedRequestLog.objects.get().path == "/foo"
+        assert len(spool) == 0
+        checkpoint = RequestLogCheckpoint.objects.get()
+        assert checkpoint.name == f"spool:{spool.spool_id}"
+        assert checkpoint.position == 4
+
+    def test_drain__resume(self, spool: RequestLogSpool, record: dict) -> None:
+        spool.add(RequestLog, [record] * 3)
+        # records loaded, but not deleted from the spool, are skipped
+        RequestLogCheckpoint.objects.create(name=f"spool:{spool.spool_id}", position=2)
+        call_command("drain_request_log_spool", stdout=StringIO())
+        assert RequestLog.objects.count() == 1
+        assert len(spool) == 0
+
+    def test_drain__deleted_user(
+        self, spool: RequestLogSpool, record: dict, django_user_model: type
+    ) -> None:
+        user = django_user_model.objects.create(username="fred")
+        spool.add(RequestLog, [record | {"user_id": user.pk}, record])
+        user.delete()
+        call_command("drain_request_log_spool", stdout=StringIO())
+        assert RequestLog.objects.filter(user__isnull=True).count() == 2
+        assert len(spool) == 0
+
+    def test_drain__no_spool(self) -> None:
+        with pytest.raises(CommandError):
+            call_command("drain_request_log_spool")
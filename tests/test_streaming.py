@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import io
+from typing import AsyncIterator, Iterator
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.http import FileResponse, HttpRequest, StreamingHttpResponse
+from django.test import RequestFactory
+
+from request_logger import decorators
+from request_logger.models import RequestLog
+from request_logger.streaming import (
+    STREAM_ATTR,
+    SyncStreamCounter,
+    is_unstreamed,
+    wrap_streaming_content,
+)
+
+
+def content() -> Iterator[bytes]:
+    yield b"foo,bar\n"
+    yield b"1,2\n"
+
+
+async def async_content() -> AsyncIterator[bytes]:
+    yield b"foo,bar\n"
+    yield b"1,2\n"
+
+
+def streaming_view_func(request: HttpRequest) -> StreamingHttpResponse:
+    return StreamingHttpResponse(content())
+
+
+async def async_streaming_view_func(request: HttpRequest) -> StreamingHttpResponse:
+    return StreamingHttpResponse(async_content())
+
+
+@pytest.fixture
+def streaming_enabled() -> Iterator[None]:
+    with mock.patch.object(decorators, "STREAMING_ENABLED", True):
+        yield
+
+
+class TestIsUnstreamed:
+    def test_streaming(self, rf: RequestFactory) -> None:
+        assert is_unstreamed(rf.get("/"), StreamingHttpResponse(content()))
+
+    def test_already_wrapped(self, rf: RequestFactory) -> None:
+        response = StreamingHttpResponse(content())
+        setattr(response, STREAM_ATTR, True)
+        assert not is_unstreamed(rf.get("/"), response)
+
+    def test_file_wrapper(self, rf: RequestFactory) -> None:
+        request = rf.get("/")
+        response = FileResponse(io.BytesIO(b"data"))
+        assert is_unstreamed(request, response)
+        request.META["wsgi.file_wrapper"] = object()
+        assert not is_unstreamed(request, response)
+
+
+@pytest.mark.django_db
+@pytest.mark.usefixtures("streaming_enabled")
+class TestStreamingResponse:
+    def test_sync(self, rf: RequestFactory) -> None:
+        func = decorators.log_request()(streaming_view_func)
+        response = func(rf.get("/"))
+        assert not RequestLog.objects.exists()
+        assert b"".join(response.streaming_content) == b"foo,bar\n1,2\n"
+        response.close()
+        log = RequestLog.objects.get()
+        assert log.content_length == 12
+        assert log.stream_duration is not None
+        assert log.duration is not None
+
+    def test_aborted(self, rf: RequestFactory) -> None:
+        func = decorators.log_request()(streaming_view_func)
+        response = func(rf.get("/"))
+        next(iter(response.streaming_content))
+        response.close()
+        response.close()
+        log = RequestLog.objects.get()
+        assert log.content_length == 8
+        assert log.stream_duration is not None
+
+    def test_async(self, rf: RequestFactory) -> None:
+        func = decorators.log_request()(async_streaming_view_func)
+
+        async def consume() -> tuple[StreamingHttpResponse, bytes]:
+            response = await func(rf.get("/"))
+            body = b"".join([chunk async for chunk in response.streaming_content])
+            return response, body
+
+        response, body = async_to_sync(consume)()
+        assert body == b"foo,bar\n1,2\n"
+        assert not RequestLog.objects.exists()
+        response.close()
+        assert RequestLog.objects.get().content_length == 12
+
+    def test_disabled(self, rf: RequestFactory) -> None:
+        func = decorators.log_request()(streaming_view_func)
+        with mock.patch.object(decorators, "STREAMING_ENABLED", False):
+            response = func(rf.get("/"))
+        log = RequestLog.objects.get()
+        assert log.content_length is None
+        assert log.stream_duration is None
+        assert not hasattr(response, STREAM_ATTR)
+
+
+def test_wrap_streaming_content__no_is_async() -> None:
+    # StreamingHttpResponse.is_async was added in Django 4.2
+    response = mock.Mock(spec=["streaming_content"], streaming_content=content())
+    counter = wrap_streaming_content(response, mock.Mock())
+    assert isinstance(counter, SyncStreamCounter)
+    assert b"".join(response.streaming_content) == b"foo,bar\n1,2\n"